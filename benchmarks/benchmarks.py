@@ -0,0 +1,177 @@
+"""
+asv benchmarks of parsing, merging, interval averaging and plotting on
+synthetic data. Run from the repository root with
+
+    asv run
+
+Synthetic files are generated once per size into ECMS_BENCH_DATA_DIR
+(default a directory in the system temp dir). Sizes above
+ECMS_BENCH_MAX_ROWS (default 10**7) are skipped.
+"""
+import os
+import shutil
+import tempfile
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from ixdat import Measurement
+
+from ecms_np_analysis import FaradaicEfficiencyECMS
+from ecms_np_analysis.alignment import align_ec_ms
+from ecms_np_analysis.analysis import all_step_numbers, combine_ec_ms
+from ecms_np_analysis.plotting import plot_ecms_data
+from ecms_np_analysis.rendering import ecms_plot_spec, render_ecms_plot
+from ecms_np_analysis.utils import tsv_reader
+from ecms_np_analysis.utils.mpt_reader import read_mpt_set
+from ecms_np_analysis.utils.intervals import interval_means
+from ecms_np_analysis.utils.tsv_cache import read_tsv_cached
+
+from .synthetic import write_biologic_mpt, write_zilien_tsv
+
+DATA_DIR = os.environ.get(
+    "ECMS_BENCH_DATA_DIR",
+    os.path.join(tempfile.gettempdir(), "ecms_np_benchmarks"),
+)
+MAX_ROWS = int(os.environ.get("ECMS_BENCH_MAX_ROWS", 10**7))
+ROWS = [10**4, 10**5, 10**6, 10**7]
+N_STEPS = 100
+STEP_DURATION = 300.0
+
+
+def synthetic_files(n_rows):
+    """
+    paths of the synthetic tsv file and mpt file prefix with n_rows rows,
+    generated if they do not exist yet.
+    """
+    if n_rows > MAX_ROWS:
+        raise NotImplementedError("skipped, above ECMS_BENCH_MAX_ROWS")
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    tsv_file = os.path.join(DATA_DIR, "ms_{}.tsv".format(n_rows))
+    mpt_prefix = os.path.join(DATA_DIR, "ec_{}_CP".format(n_rows))
+
+    if not os.path.exists(tsv_file):
+        write_zilien_tsv(tsv_file + ".tmp", n_rows, n_steps=N_STEPS, step_duration=STEP_DURATION)
+        os.replace(tsv_file + ".tmp", tsv_file)
+    if not os.path.exists(mpt_prefix + "_C01.mpt"):
+        write_biologic_mpt(mpt_prefix + ".tmp", n_rows, n_steps=N_STEPS, step_duration=STEP_DURATION)
+        os.replace(mpt_prefix + ".tmp", mpt_prefix + "_C01.mpt")
+
+    return tsv_file, mpt_prefix
+
+
+class Parsing:
+    params = ROWS
+    param_names = ["rows"]
+    timeout = 1800
+
+    def setup(self, n_rows):
+        self.tsv_file, self.mpt_prefix = synthetic_files(n_rows)
+        self.cache_dir = tempfile.mkdtemp()
+        read_tsv_cached(self.tsv_file, cache_dir=self.cache_dir)
+
+    def teardown(self, n_rows):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def time_read_tsv(self, n_rows):
+        tsv_reader.read_tsv(self.tsv_file)
+
+    def time_read_tsv_M2_float32(self, n_rows):
+        tsv_reader.read_tsv(self.tsv_file, masses=["M2"], dtype="float32")
+
+    def time_iter_tsv_chunks_M2(self, n_rows):
+        for _ in tsv_reader.iter_tsv_chunks(self.tsv_file, masses=["M2"]):
+            pass
+
+    def time_read_tsv_cached(self, n_rows):
+        read_tsv_cached(self.tsv_file, cache_dir=self.cache_dir)
+
+    def time_ixdat_zilien(self, n_rows):
+        Measurement.read(self.tsv_file, reader="zilien", technique="MS")
+
+    def time_ixdat_biologic(self, n_rows):
+        Measurement.read_set(self.mpt_prefix, suffix=".mpt")
+
+    def time_read_mpt_set(self, n_rows):
+        read_mpt_set(self.mpt_prefix)
+
+    def peakmem_read_tsv(self, n_rows):
+        tsv_reader.read_tsv(self.tsv_file)
+
+    def peakmem_read_tsv_M2_float32(self, n_rows):
+        tsv_reader.read_tsv(self.tsv_file, masses=["M2"], dtype="float32")
+
+
+class ECMS:
+    """
+    benchmarks on the merged ECMS measurement
+    """
+    params = ROWS
+    param_names = ["rows"]
+    timeout = 1800
+
+    def setup(self, n_rows):
+        tsv_file, mpt_prefix = synthetic_files(n_rows)
+        self.ms = Measurement.read(tsv_file, reader="zilien", technique="MS")
+        self.ec = Measurement.read_set(mpt_prefix, suffix=".mpt")
+        self.ecms = combine_ec_ms(self.ec, self.ms)
+        self.steps = all_step_numbers(self.ecms)
+        self.intervals = [
+            (STEP_DURATION * x - 100, STEP_DURATION * x) for x in self.steps
+        ]
+        self.t, self.v = self.ecms.grab("M2 [A]")
+        self.aligned = align_ec_ms(self.ec, self.ms)
+
+    def teardown(self, n_rows):
+        plt.close("all")
+
+    def time_combine_ec_ms(self, n_rows):
+        combine_ec_ms(self.ec, self.ms)
+
+    def time_align_ec_ms(self, n_rows):
+        align_ec_ms(self.ec, self.ms)
+
+    def time_grab_intervals(self, n_rows):
+        for interval in self.intervals:
+            self.ecms.grab("M2 [A]", tspan=interval)
+
+    def time_grab_intervals_aligned(self, n_rows):
+        for interval in self.intervals:
+            self.aligned.grab("M2 [A]", tspan=interval)
+
+    def time_interval_means(self, n_rows):
+        interval_means(self.t, self.v, self.intervals)
+
+    def _faradaic_efficiencies(self, batched):
+        FE_calculator = FaradaicEfficiencyECMS(
+            self.ecms,
+            start_time=0,
+            step_duration=STEP_DURATION,
+            duration_averaged=100,
+            batched=batched,
+        )
+        background = FE_calculator.calc_HER_background_current([1])
+        coefs = FE_calculator.linear_fit_HER_MS_to_cell_current_conversion([2, 3, 4], background)
+        FE_calculator.calculate_CO2RR_faradaic_efficiencies(self.steps, coefs, background)
+
+    def time_faradaic_efficiencies_batched(self, n_rows):
+        self._faradaic_efficiencies(batched=True)
+
+    def time_faradaic_efficiencies_per_interval(self, n_rows):
+        self._faradaic_efficiencies(batched=False)
+
+    def time_plot_ecms(self, n_rows):
+        fig, _ = plot_ecms_data(self.ecms, use_species=True)
+        fig.savefig(os.devnull, format="png", dpi=300)
+
+    def time_plot_ecms_decimated(self, n_rows):
+        fig, _ = plot_ecms_data(self.ecms, use_species=True, decimate=True)
+        fig.savefig(os.devnull, format="png", dpi=300)
+
+    def time_plot_spec(self, n_rows):
+        ecms_plot_spec(self.ecms, dpi=300)
+
+    def time_render_plot_spec(self, n_rows):
+        render_ecms_plot(ecms_plot_spec(self.ecms, dpi=300))
@@ -0,0 +1,195 @@
+import io
+import time
+
+import numpy as np
+
+DEFAULT_TSTAMP = 1700000000.0
+DEFAULT_MASSES = ("M2", "M28", "M44")
+
+# MS signal per mA of HER current and baselines of the mass channels
+M2_SENSITIVITY = 1e-8
+MASS_BASELINES = {"M2": 1e-11, "M28": 2e-10, "M32": 5e-11, "M44": 1e-9}
+
+
+def step_profile(n_steps: int, HER_only_steps=(2, 3, 4), seed: int = 0):
+    """
+    cell current (mA) and H2 faradaic efficiency of each step of a synthetic
+    ECMS experiment. The first step is at open circuit for the background,
+    the HER only steps have 100% H2 faradaic efficiency.
+
+    Returns:
+        currents (np.ndarray), H2_efficiencies (np.ndarray)
+    """
+    rng = np.random.default_rng(seed)
+    currents = -np.linspace(0.5, 5.0, n_steps)
+    currents[0] = 0.0
+    H2_efficiencies = rng.uniform(0.3, 0.9, n_steps)
+    H2_efficiencies[np.asarray(HER_only_steps, dtype=int) - 1] = 1.0
+
+    return currents, H2_efficiencies
+
+
+def write_zilien_tsv(
+        fpath: str,
+        n_rows: int = 10_000,
+        n_steps: int = 10,
+        step_duration: float = 300.0,
+        masses=DEFAULT_MASSES,
+        HER_only_steps=(2, 3, 4),
+        tstamp: float = DEFAULT_TSTAMP,
+        seed: int = 0,
+        mass_rows=None,
+):
+    """
+    write a synthetic Zilien MS tsv file with the 3 line section header,
+    metadata grouped by series, the two line data header and n_rows rows of
+    an iongauge pressure series and a time and current column per mass.
+    The M2 signal follows the HER current of step_profile.
+
+    Args:
+        fpath (str): path of file to write
+        n_rows (int): number of data rows
+        n_steps (int): number of steps of step_duration covered by the data
+        step_duration (float): length of steps in seconds
+        masses (list[str]): mass channels, e.g. ["M2", "M44"]
+        HER_only_steps (list[int]): steps with 100% H2 faradaic efficiency
+        tstamp (float): unix time of t=0
+        seed (int): random seed
+        mass_rows (dict): number of rows of the masses with fewer than
+            n_rows, their remaining cells are left empty as Zilien does
+    """
+    rng = np.random.default_rng(seed)
+    mass_rows = mass_rows or {}
+    currents, H2_efficiencies = step_profile(n_steps, HER_only_steps, seed=seed)
+
+    t = np.linspace(0, n_steps * step_duration, n_rows, endpoint=False)
+    steps = np.minimum((t // step_duration).astype(int), n_steps - 1)
+
+    series = ["iongauge value"] + ["C0{}".format(mass) for mass in masses]
+
+    metadata = [
+        ("num_header_lines", "", "", "int", None),
+        ("num_data_header_lines", "", "", "int", "2"),
+        ("data_start", "", "", "int", None),
+        ("name", "", "", "string", "synthetic"),
+        ("start_time_unix", "", "", "double", repr(float(tstamp))),
+        ("start_time", "", "", "string", time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(tstamp))),
+    ]
+    for name in series:
+        count = mass_rows.get(name[2:], n_rows) if name.startswith("C0") else n_rows
+        metadata.append(("{}_count".format(name), "", name, "int", str(count)))
+        metadata.append(("{}_color".format(name), "", name, "string", "#000000"))
+    num_header_lines = len(metadata)
+    metadata[0] = metadata[0][:4] + (str(num_header_lines),)
+    metadata[2] = metadata[2][:4] + (str(num_header_lines + 2),)
+
+    series_header, column_header = [], []
+    columns = [t, 1e-6 * (1 + 1e-3 * rng.standard_normal(n_rows))]
+    series_header += ["iongauge value", ""]
+    column_header += ["Time [s]", "Pressure [mbar]"]
+
+    for i, mass in enumerate(masses):
+        baseline = MASS_BASELINES.get(mass, 1e-11)
+        if mass == "M2":
+            signal = baseline - M2_SENSITIVITY * currents[steps] * H2_efficiencies[steps]
+        else:
+            signal = np.full(n_rows, baseline)
+        signal = signal + 1e-2 * baseline * rng.standard_normal(n_rows)
+
+        series_header += ["C0{}".format(mass), ""]
+        column_header += ["Time [s]", "{} [A]".format(mass)]
+        columns += [t + 0.01 * (i + 1), signal]
+
+    with open(fpath, "w") as f:
+        for line in metadata:
+            f.write("\t".join(line) + "\n")
+        f.write("\t".join(series_header) + "\n")
+        f.write("\t".join(column_header) + "\n")
+        if not mass_rows:
+            np.savetxt(f, np.column_stack(columns), delimiter="\t", fmt="%.6e")
+            return
+
+        cells = np.char.mod("%.6e", np.column_stack(columns))
+        for i, mass in enumerate(masses):
+            cells[mass_rows.get(mass, n_rows):, 2 * i + 2:2 * i + 4] = ""
+        for row in cells:
+            f.write("\t".join(row) + "\n")
+
+
+def write_biologic_mpt(
+        fpath: str,
+        n_rows: int = 10_000,
+        n_steps: int = 10,
+        step_duration: float = 300.0,
+        ca: bool = False,
+        HER_only_steps=(2, 3, 4),
+        tstamp: float = DEFAULT_TSTAMP,
+        decimal: str = ".",
+        seed: int = 0,
+):
+    """
+    write a synthetic BioLogic EC-Lab CP (or CA) .mpt file with n_rows rows
+    of a step sequence following step_profile. CP files have a "<Ewe/V>"
+    potential column and CA files an "Ewe/V" column, as exported by EC-Lab.
+
+    Args:
+        fpath (str): path of file to write
+        n_rows (int): number of data rows
+        n_steps (int): number of steps of step_duration covered by the data
+        step_duration (float): length of steps in seconds
+        ca (bool): write a chronoamperometry file instead of chronopotentiometry
+        HER_only_steps (list[int]): steps with 100% H2 faradaic efficiency
+        tstamp (float): unix time of t=0
+        decimal (str): decimal separator, "," as written on some locales
+        seed (int): random seed
+    """
+    rng = np.random.default_rng(seed)
+    currents, _ = step_profile(n_steps, HER_only_steps, seed=seed)
+
+    t = np.linspace(0, n_steps * step_duration, n_rows, endpoint=False)
+    steps = np.minimum((t // step_duration).astype(int), n_steps - 1)
+
+    current = currents[steps] + 1e-3 * rng.standard_normal(n_rows)
+    potential = -0.2 + 0.1 * currents[steps] + 1e-3 * rng.standard_normal(n_rows)
+    potential_col = "Ewe/V" if ca else "<Ewe/V>"
+    control = potential if ca else current
+
+    col_names = [
+        "mode", "ox/red", "error", "control changes", "Ns changes",
+        "counter inc.", "Ns", "time/s", "control/V" if ca else "control/mA",
+        potential_col, "I/mA", "cycle number",
+    ]
+    columns = [
+        np.full(n_rows, 2 if ca else 1),
+        np.zeros(n_rows),
+        np.zeros(n_rows),
+        np.zeros(n_rows),
+        np.r_[0, np.diff(steps) != 0],
+        np.zeros(n_rows),
+        steps,
+        t,
+        control,
+        potential,
+        current,
+        np.zeros(n_rows),
+    ]
+
+    header = [
+        "EC-Lab ASCII FILE",
+        "Nb header lines : 7",
+        "",
+        "Chronoamperometry" if ca else "Chronopotentiometry",
+        "Acquisition started on : {}.000".format(
+            time.strftime("%m/%d/%Y %H:%M:%S", time.localtime(tstamp))
+        ),
+        "",
+        "\t".join(col_names),
+    ]
+
+    with open(fpath, "w", encoding="ISO-8859-1") as f:
+        f.write("\n".join(header) + "\n")
+        data = np.column_stack(columns)
+        for start in range(0, n_rows, 100_000):
+            buf = io.StringIO()
+            np.savetxt(buf, data[start:start + 100_000], delimiter="\t", fmt="%.6E")
+            f.write(buf.getvalue().replace(".", decimal))
@@ -0,0 +1,130 @@
+import os
+
+from ecms_np_analysis.background import BACKGROUND_MODELS
+from ecms_np_analysis.export import TABLE_FORMATS, write_table
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="recalculate CO2RR faradaic efficiencies from a saved analysis session, "
+        "any parameter not given is taken from the session"
+    )
+
+    parser.add_argument(
+        "session",
+        type=str,
+        help="session file written by CO2RR_faradaic_efficiencies_analysis.py --session",
+    )
+
+    parser.add_argument(
+        "-her",
+        "--her-only-steps",
+        type=int,
+        nargs="+",
+        help="HER are only step numbers (steps start from 1)",
+    )
+
+    parser.add_argument(
+        "-s",
+        "--step-length",
+        type=float,
+        help="length of steps in ECMS experiment",
+    )
+
+    parser.add_argument(
+        "-bg",
+        "--ms-background-step",
+        type=int,
+        nargs="+",
+        help="steps for calculating HER MS background current",
+    )
+
+    parser.add_argument(
+        "-ave",
+        "--time-averaged-over",
+        type=float,
+        help="time duration to average currents over",
+    )
+
+    parser.add_argument(
+        "-st",
+        "--start-time",
+        type=float,
+        help="set t=0 of step sequence if desired",
+    )
+
+    parser.add_argument(
+        "-b",
+        "--bootstrap",
+        type=int,
+        help="number of bootstrap replicates for FE uncertainties",
+    )
+
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        type=str,
+        default=".",
+        help="directory to write the faradaic efficiency and step averages tables to",
+    )
+
+    parser.add_argument(
+        "-f",
+        "--table-formats",
+        type=str,
+        nargs="+",
+        choices=TABLE_FORMATS,
+        default=["csv"],
+        help="formats to write the faradaic efficiency and step averages tables in",
+    )
+
+    parser.add_argument(
+        "--save",
+        action="store_true",
+        default=False,
+        help="update the session file with the new parameters and results",
+    )
+
+    parser.add_argument(
+        "-bgm",
+        "--background-model",
+        type=str,
+        choices=BACKGROUND_MODELS,
+        default=None,
+        help="HER MS background model, constant or interpolated between the background steps",
+    )
+
+    args = parser.parse_args()
+
+    from ecms_np_analysis.session import load_session
+
+    session = load_session(args.session)
+
+    parameters = {
+        "her_only_steps": args.her_only_steps,
+        "ms_background_steps": args.ms_background_step,
+        "step_length": args.step_length,
+        "time_averaged_over": args.time_averaged_over,
+        "start_time": args.start_time,
+        "bootstrap": args.bootstrap,
+        "background_model": args.background_model,
+    }
+    data, step_averages = session.analyze(
+        **{key: value for key, value in parameters.items() if value is not None}
+    )
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for fmt in args.table_formats:
+        with open(os.path.join(args.output_dir, "CO2RR_faradaic_efficiencies." + fmt), "wb") as f:
+            write_table(data, f, fmt)
+        with open(os.path.join(args.output_dir, "step_averages." + fmt), "wb") as f:
+            write_table(step_averages, f, fmt)
+
+    if args.save:
+        session.save(args.session)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+from ecms_np_analysis import cli
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="calculate and plot CO2RR faradaic efficiencies for a batch of ecms experiments"
+    )
+
+    parser.add_argument(
+        "manifest",
+        type=str,
+        help="CSV or TOML manifest of experiments and their parameters",
+    )
+
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        type=str,
+        default="results",
+        help="directory for per-experiment results and the summary table",
+    )
+
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="number of worker processes (default number of CPUs)",
+    )
+
+    cli.add_tsv_cache_argument(parser)
+    cli.add_alignment_argument(parser)
+
+    args = parser.parse_args()
+
+    from ecms_np_analysis.batch import read_manifest, run_batch
+
+    experiments = read_manifest(args.manifest)
+    for experiment in experiments:
+        experiment["tsv_cache"] = args.tsv_cache
+        experiment["alignment"] = args.align
+
+    def progress(name, error):
+        if error is None:
+            print("finished {}".format(name))
+        else:
+            print("FAILED {}: {}".format(name, error.strip().splitlines()[-1]))
+
+    summary, failures = run_batch(
+        experiments,
+        output_dir=args.output_dir,
+        max_workers=args.jobs,
+        progress=progress,
+    )
+
+    print(
+        "{} of {} experiments succeeded".format(
+            len(experiments) - len(failures), len(experiments),
+        )
+    )
+
+    if len(failures):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
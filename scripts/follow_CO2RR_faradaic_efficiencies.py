@@ -0,0 +1,147 @@
+from ecms_np_analysis.background import BACKGROUND_MODELS
+import os
+import time
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="calculate CO2RR faradaic efficiencies as steps complete while ecms data is being recorded"
+    )
+
+    parser.add_argument(
+        "tsv_file",
+        type=str,
+        help="Mass spec tsv data file being written",
+    )
+
+    parser.add_argument(
+        "mpt_files_path_prefix",
+        type=str,
+        help="EC potentiostat mpt data files path prefix, e.g. .../03__02_CP",
+    )
+
+    parser.add_argument(
+        "-her",
+        "--her-only-steps",
+        type=int,
+        nargs="+",
+        required=True,
+        help="HER are only step numbers (steps start from 1)",
+    )
+
+    parser.add_argument(
+        "-s",
+        "--step-length",
+        default=300,
+        type=float,
+        help="length of steps in ECMS experiment",
+    )
+
+    parser.add_argument(
+        "-bg",
+        "--ms-background-step",
+        type=int,
+        nargs="+",
+        default=None,
+        help="step for calculating HER MS background current (steps start from 1)",
+    )
+
+    parser.add_argument(
+        "-bgc",
+        "--her-background-current",
+        type=float,
+        default=None,
+        help="HER MS background current (A) to subtract instead of that of the background steps",
+    )
+
+    parser.add_argument(
+        "-ave",
+        "--time-averaged-over",
+        type=float,
+        default=100,
+        help="time duration to average currents over",
+    )
+
+    parser.add_argument(
+        "-st",
+        "--start-time",
+        type=float,
+        default=0,
+        help="set t=0 of step sequence if desired",
+    )
+
+    parser.add_argument(
+        "-i",
+        "--poll-interval",
+        type=float,
+        default=5,
+        help="seconds between checking the data files for new rows",
+    )
+
+    parser.add_argument(
+        "-n",
+        "--num-steps",
+        type=int,
+        default=None,
+        help="stop after this many steps have been reported (default follow until interrupted)",
+    )
+
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        default="CO2RR_faradaic_efficiencies.csv",
+        help="csv file to append completed steps to",
+    )
+
+    parser.add_argument(
+        "-bgm",
+        "--background-model",
+        type=str,
+        choices=BACKGROUND_MODELS,
+        default="constant",
+        help="subtract a constant HER MS background, or one interpolated between the background steps for a drifting M2 baseline",
+    )
+
+    args = parser.parse_args()
+
+    if args.ms_background_step is None and args.her_background_current is None:
+        parser.error("one of -bg/--ms-background-step or -bgc/--her-background-current is required")
+
+    from ecms_np_analysis.live import LiveFaradaicEfficiency
+
+    live = LiveFaradaicEfficiency(
+        args.tsv_file,
+        args.mpt_files_path_prefix,
+        start_time=args.start_time,
+        step_duration=args.step_length,
+        duration_averaged=args.time_averaged_over,
+        HER_only_steps=args.her_only_steps,
+        background_steps=args.ms_background_step,
+        HER_background_current=args.her_background_current,
+        background_model=args.background_model,
+    )
+
+    write_header = not os.path.exists(args.output)
+    reported = 0
+
+    try:
+        while args.num_steps is None or reported < args.num_steps:
+            data = live.update()
+            if len(data):
+                if args.num_steps is not None:
+                    data = data[data["step"] <= args.num_steps]
+                print(data.to_string(index=False, header=reported == 0))
+                data.to_csv(args.output, mode="a", header=write_header, index=False)
+                write_header = False
+                reported = data["step"].iloc[-1]
+            else:
+                time.sleep(args.poll_interval)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
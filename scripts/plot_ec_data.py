@@ -1,30 +1,15 @@
-from ixdat import Measurement
-import matplotlib.pyplot as plt
-from ecms_np_analysis import MASS_TO_SPECIES_PLOT
+from ecms_np_analysis import cli
 
 def main():
     import argparse
     
     parser = argparse.ArgumentParser()
     
-    parser.add_argument("mpt_file", type=str)
-    
-    parser.add_argument("-s", "--save-plot", type=str, default=None, help="save plot to filename", metavar="filename")
+    cli.add_plot_ec_arguments(parser)
     
     args = parser.parse_args()
     
-    ec = Measurement.read_set(
-        args.mpt_file,
-        suffix=".mpt",
-    )
-    
-    axes = ec.plot()
-    fig = axes[0].get_figure()
-
-    if args.save_plot is not None:
-        fig.savefig(args.save_plot + ".png", dpi=300, bbox_inches='tight',)
-    else:
-        plt.show()
+    cli.plot_ec(args)
     
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
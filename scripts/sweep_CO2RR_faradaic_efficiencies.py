@@ -0,0 +1,139 @@
+from ecms_np_analysis import cli, profiling
+from ecms_np_analysis.profiling import PROFILE_FORMATS
+
+
+def step_set(value):
+    """
+    parse a space or comma separated set of step numbers, e.g. "2 3 4"
+    """
+    return [int(x) for x in value.replace(",", " ").split()]
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="calculate CO2RR faradaic efficiencies over a grid of analysis parameters"
+    )
+
+    parser.add_argument(
+        "tsv_file",
+        type=str,
+        help="Mass spec tsv data file",
+    )
+
+    parser.add_argument(
+        "mpt_files_path_prefix",
+        type=str,
+        help="EC potentiostat mpt data files path prefix, e.g. .../03__02_CP",
+    )
+
+    parser.add_argument(
+        "-her",
+        "--her-only-steps",
+        type=step_set,
+        nargs="+",
+        required=True,
+        help='sets of HER only step numbers, each quoted, e.g. "2 3 4" "2 3"',
+    )
+
+    parser.add_argument(
+        "-s",
+        "--step-length",
+        default=[300],
+        type=float,
+        nargs="+",
+        help="lengths of steps in ECMS experiment",
+    )
+
+    parser.add_argument(
+        "-bg",
+        "--ms-background-steps",
+        type=step_set,
+        nargs="+",
+        required=True,
+        help='sets of steps for calculating HER MS background current, each quoted, e.g. "1"',
+    )
+
+    parser.add_argument(
+        "-ave",
+        "--time-averaged-over",
+        type=float,
+        default=[100],
+        nargs="+",
+        help="time durations to average currents over",
+    )
+
+    parser.add_argument(
+        "-st",
+        "--start-time",
+        type=float,
+        default=[0],
+        nargs="+",
+        help="t=0 of step sequence values",
+    )
+
+    parser.add_argument(
+        "-ca",
+        "--ca",
+        action="store_true",
+        default=False,
+        help="data is from CA experiment instead of CP",
+    )
+
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        default="CO2RR_faradaic_efficiencies_sweep.csv",
+        help="csv file to write the long form table to",
+    )
+
+    parser.add_argument(
+        "--profile",
+        type=str,
+        default=None,
+        help="record profiling spans and write them to this file",
+    )
+
+    parser.add_argument(
+        "--profile-format",
+        type=str,
+        choices=PROFILE_FORMATS,
+        default="chrome",
+        help="format of the profile file, a Chrome trace (open in ui.perfetto.dev) or JSON",
+    )
+
+    cli.add_tsv_cache_argument(parser)
+    cli.add_alignment_argument(parser)
+
+    args = parser.parse_args()
+
+    from ecms_np_analysis.analysis import load_ecms
+    from ecms_np_analysis.sweep import sweep_faradaic_efficiencies
+
+    if args.profile:
+        profiling.enable()
+
+    ecms = load_ecms(
+        args.tsv_file, args.mpt_files_path_prefix, ca=args.ca, tsv_cache=args.tsv_cache, alignment=args.align,
+    )
+
+    data = sweep_faradaic_efficiencies(
+        ecms,
+        start_times=args.start_time,
+        step_durations=args.step_length,
+        durations_averaged=args.time_averaged_over,
+        HER_only_step_sets=args.her_only_steps,
+        background_step_sets=args.ms_background_steps,
+    )
+
+    data.to_csv(args.output, index=False)
+
+    if args.profile:
+        profiling.write(args.profile, args.profile_format)
+        print(profiling.summary().to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -10,4 +10,7 @@ setup(
     packages = find_packages(where="src"),
     package_dir={"": "src"},
     install_requires=requirements,
+    entry_points={
+        "console_scripts": ["ecms-np-analysis = ecms_np_analysis.cli:main"],
+    },
 )
@@ -1,2 +1,37 @@
-from .faradaic_efficiency import FaradaicEfficiencyECMS
-from .utils.mass_to_species import MASS_TO_SPECIES, MASS_TO_SPECIES_PLOT
\ No newline at end of file
+"""
+Submodules and the names exported here are imported on first use, so
+importing the package, e.g. by the command line interface, does not import
+numpy, pandas or ixdat until they are needed.
+"""
+import importlib
+
+# exported name: submodule defining it
+_EXPORTS = {
+    "FaradaicEfficiencyECMS": ".faradaic_efficiency",
+    "StepIndex": ".step_index",
+    "MASS_TO_SPECIES": ".utils.mass_to_species",
+    "MASS_TO_SPECIES_PLOT": ".utils.mass_to_species",
+    "PRODUCTS": ".utils.mass_to_species",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    else:
+        try:
+            value = importlib.import_module("." + name, __name__)
+        except ModuleNotFoundError as e:
+            if e.name != __name__ + "." + name:
+                raise
+            raise AttributeError("module {} has no attribute {}".format(__name__, name)) from None
+
+    globals()[name] = value
+
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,285 @@
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+EC_POTENTIAL_SERIES = ["<Ewe/V>", "Ewe/V", "<Ewe>/V"]
+
+ALIGNMENT_METHODS = ("metadata", "xcorr")
+
+# EC series resampled to the previous sample instead of interpolated
+EC_STEP_SERIES = ["selector"]
+
+# the default MS signal correlated with the EC current to find the offset
+XCORR_MS_SERIES = "M2 [A]"
+
+
+def timezone_offset(tz_name, local_tz_name=None):
+    """
+    seconds to subtract from times parsed in the local timezone to get the
+    times of a file written in timezone tz_name, e.g. for EC-Lab timestamps
+    of data acquired in Copenhagen parsed on a server in UTC.
+    """
+    now = datetime.now(timezone.utc)
+    local = now.astimezone() if local_tz_name is None else now.astimezone(ZoneInfo(local_tz_name))
+
+    return (now.astimezone(ZoneInfo(tz_name)).utcoffset() - local.utcoffset()).total_seconds()
+
+
+def _unix_series(measurement, item):
+    t, v = measurement.grab(item)
+    return np.asarray(t, dtype=float) + measurement.tstamp, np.asarray(v, dtype=float)
+
+
+def _uniform(t, v, dt):
+    """
+    v linearly interpolated onto a uniform grid of spacing dt over the span of t
+    """
+    grid = np.arange(t[0], t[-1], dt)
+    return grid, np.interp(grid, t, v)
+
+
+def _previous(grid, t, v):
+    """
+    v at the last sample of t at or before each grid time, for series of
+    step numbers that must not be interpolated
+    """
+    return v[np.clip(np.searchsorted(t, grid, side="right") - 1, 0, len(t) - 1)]
+
+
+def cross_correlation_offset(t_ec, current, t_ms, ms_signal, dt=1.0, max_lag=7200.0):
+    """
+    time offset of the EC data relative to the MS data found from the peak
+    of the cross correlation of the magnitude of the cell current and the MS
+    signal, e.g. of H2, both resampled onto grids of spacing dt.
+
+    Args:
+        t_ec, current (np.ndarray): EC time (unix time) and cell current
+        t_ms, ms_signal (np.ndarray): MS time (unix time) and signal
+        dt (float): resolution of the offset in seconds
+        max_lag (float): largest offset to consider in seconds
+
+    Returns:
+        offset (float): seconds to add to the EC times to align them with the MS
+    """
+    grid_ec, a = _uniform(t_ec, np.abs(current), dt)
+    grid_ms, b = _uniform(t_ms, ms_signal, dt)
+    a = (a - a.mean()) / (a.std() or 1.0)
+    b = (b - b.mean()) / (b.std() or 1.0)
+
+    # full cross correlation through the FFT, zero padded to avoid wrap around
+    n = len(a) + len(b) - 1
+    n_fft = 1 << (n - 1).bit_length()
+    corr = np.fft.irfft(np.fft.rfft(b, n_fft) * np.conj(np.fft.rfft(a, n_fft)), n_fft)
+
+    # corr[k] is the overlap with the EC signal shifted k samples later,
+    # negative shifts wrap around to the end of the array
+    lags = np.arange(n_fft)
+    lags[lags > n_fft // 2] -= n_fft
+    shifts = grid_ms[0] - grid_ec[0] + lags * dt
+
+    valid = np.abs(shifts) <= max_lag
+    if not valid.any():
+        raise ValueError("no overlap of EC and MS data within max_lag")
+
+    return shifts[valid][np.argmax(corr[valid])]
+
+
+class AlignedECMS():
+    """
+    EC and MS channels resampled onto one uniform time grid, stored as a
+    contiguous 2-D array with one row per channel. Selecting a time span is
+    an index calculation on the grid and returns views, so repeated queries
+    do not interpolate.
+
+    Can be used in place of the combined ECMS measurement by the faradaic
+    efficiency analysis, sessions and ecms_plot_spec: it has grab,
+    mass_list, the selector channel and calibrate, which adds the
+    "potential" and "current" channels as ixdat does. The ixdat plots and
+    ecms_calibration_curve are not available.
+
+    Times are in seconds from tstamp, which follows the combined ECMS
+    measurement of the scripts: t=0 one second before the first EC sample.
+    """
+
+    def __init__(self, t0, dt, data, columns, tstamp, offset=0.0):
+        self.t0 = float(t0)
+        self.dt = float(dt)
+        self.data = np.ascontiguousarray(data)
+        self.columns = list(columns)
+        self.tstamp = tstamp
+        self.offset = offset
+        self._index = {name: i for i, name in enumerate(self.columns)}
+        self._names = {}
+
+    def __len__(self):
+        return self.data.shape[1]
+
+    @property
+    def t(self):
+        return self.t0 + self.dt * np.arange(len(self))
+
+    @property
+    def series_names(self):
+        return list(self.columns)
+
+    @property
+    def mass_list(self):
+        return [name[:-4] for name in self.columns if name.startswith("M") and name.endswith(" [A]")]
+
+    @property
+    def U_name(self):
+        return self._names.get("potential", "raw_potential")
+
+    @property
+    def J_name(self):
+        return self._names.get("current", "raw_current")
+
+    def calibrate(self, RE_vs_RHE=None, A_el=None, R_Ohm=None):
+        """
+        set the "potential" and "current" channels from the raw potential and
+        current, as the ixdat EC calibration: the potential on the RHE scale
+        corrected for the ohmic drop, and the current density in mA/cm^2.
+        They can also be grabbed by the names U_name and J_name, which are
+        those of the ixdat calibrated series. Replaces any earlier calibration.
+        """
+        from ixdat.techniques.ec import EC_FANCY_NAMES
+
+        U = self.data[self._index["raw_potential"]].copy()
+        J = self.data[self._index["raw_current"]].copy()
+        U_name, J_name = "raw_potential", "raw_current"
+
+        if RE_vs_RHE is not None:
+            U += RE_vs_RHE
+            U_name = EC_FANCY_NAMES["potential"]
+        if R_Ohm is not None:
+            # [V] = [Ohm*mA*(A/mA)]
+            U -= R_Ohm * self.data[self._index["raw_current"]] * 1e-3
+            U_name = U_name + " $_{ohm. corr.}$"
+        if A_el is not None:
+            J /= A_el
+            J_name = EC_FANCY_NAMES["current"]
+
+        if "potential" not in self.columns:
+            self.columns += ["potential", "current"]
+            self.data = np.concatenate((self.data, np.empty((2, len(self)))))
+
+        self._names = {"potential": U_name, "current": J_name}
+        self._index = {name: i for i, name in enumerate(self.columns)}
+        for channel, name in self._names.items():
+            self._index.setdefault(name, self._index[channel])
+
+        self.data[self._index["potential"]] = U
+        self.data[self._index["current"]] = J
+
+    def _slice(self, tspan):
+        if tspan is None:
+            return slice(0, len(self))
+
+        start = int(np.ceil((tspan[0] - self.t0) / self.dt - 1e-9))
+        stop = int(np.floor((tspan[-1] - self.t0) / self.dt + 1e-9)) + 1
+
+        return slice(min(max(start, 0), len(self)), min(max(stop, 0), len(self)))
+
+    def grab(self, item, tspan=None):
+        """
+        time and values of a channel, within tspan if given, as views of the
+        aligned data
+        """
+        try:
+            row = self.data[self._index[item]]
+        except KeyError:
+            raise KeyError(
+                "no channel {} in aligned data, channels are {}".format(item, self.columns)
+            )
+
+        sl = self._slice(tspan)
+
+        return self.t0 + self.dt * np.arange(sl.start, sl.stop), row[sl]
+
+
+def align_ec_ms(
+        ec,
+        ms,
+        masses=None,
+        dt=None,
+        method="metadata",
+        offset=0.0,
+        max_lag=7200.0,
+        potential_item=None,
+):
+    """
+    align EC and MS measurements and resample the cell current and potential,
+    the step selector and the MS signals onto a common uniform time grid over
+    their overlap. The selector takes the value of the previous sample, the
+    other channels are interpolated.
+
+    Args:
+        ec (ixdat.techniques.ec.ECMeasurement): EC measurement
+        ms (ixdat.techniques.ms.MSMeasurement): MS measurement
+        masses (list[str]): masses to include, e.g. ["M2", "M44"], default all
+        dt (float): grid spacing in seconds, default the median sample spacing
+            of the MS data
+        method (str): "metadata" to align on the file timestamps, or "xcorr"
+            to correct them by the cross correlation of current and M2 signal
+        offset (float): seconds added to the EC times, e.g. a timezone_offset,
+            before any cross correlation correction
+        max_lag (float): largest cross correlation correction in seconds
+        potential_item (str): EC series of the raw potential, default the
+            first of EC_POTENTIAL_SERIES in the measurement
+
+    Returns:
+        aligned (AlignedECMS): with channels "raw_current", "raw_potential",
+            "selector" and "<mass> [A]" for each mass, uncalibrated
+    """
+    if method not in ALIGNMENT_METHODS:
+        raise ValueError(
+            "unknown alignment method {}, expected one of {}".format(method, ALIGNMENT_METHODS)
+        )
+
+    masses = masses or ms.mass_list
+    if potential_item is None:
+        potential_item = next(x for x in EC_POTENTIAL_SERIES + ["raw_potential"] if x in ec.series_names)
+
+    ec_series = {
+        "raw_current": _unix_series(ec, "raw_current"),
+        "raw_potential": _unix_series(ec, potential_item),
+        "selector": _unix_series(ec, "selector"),
+    }
+    ms_series = {
+        mass + " [A]": _unix_series(ms, mass + " [A]") for mass in masses
+    }
+
+    if method == "xcorr":
+        t_ec, current = ec_series["raw_current"]
+        t_ms, signal = _unix_series(ms, XCORR_MS_SERIES)
+        offset += cross_correlation_offset(
+            t_ec + offset, current, t_ms, signal, dt=dt or 1.0, max_lag=max_lag,
+        )
+
+    for item, (t, v) in ec_series.items():
+        ec_series[item] = (t + offset, v)
+
+    series = {**ec_series, **ms_series}
+
+    if dt is None:
+        dt = float(np.median(np.diff(next(iter(ms_series.values()))[0])))
+
+    start = max(t[0] for t, _ in series.values())
+    end = min(t[-1] for t, _ in series.values())
+    if end <= start:
+        raise ValueError("EC and MS data do not overlap")
+
+    grid = np.arange(start, end, dt)
+    data = np.empty((len(series), len(grid)))
+    for row, (item, (t, v)) in zip(data, series.items()):
+        row[:] = _previous(grid, t, v) if item in EC_STEP_SERIES else np.interp(grid, t, v)
+
+    tstamp = ec_series["raw_current"][0][0] - 1
+
+    aligned = AlignedECMS(
+        grid[0] - tstamp, dt, data, list(series), tstamp=tstamp, offset=offset,
+    )
+    aligned.calibrate()
+
+    return aligned
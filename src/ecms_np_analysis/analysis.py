@@ -0,0 +1,305 @@
+import os
+import time
+
+from . import profiling
+from .alignment import align_ec_ms
+from .background import BACKGROUND_MODELS
+from .export import write_table
+from .faradaic_efficiency import FaradaicEfficiencyECMS
+from .loading import load_ec_ms
+from .rendering import ecms_plot_spec, render_ecms_plot
+from .session import save_session
+from .step_index import StepIndex
+from .utils.reference_electrodes import silver_silver_chloride_to_RHE
+
+RE_VS_RHE = 0.0
+ELECTRODE_AREA = 0.196
+OHMIC_DROP = 0.0
+
+
+def load_ecms(tsv_file, mpt_files_path_prefix, ca=False, timings=None, tsv_cache=False, alignment=None):
+    """
+    read the MS tsv file and EC mpt files concurrently and combine them into
+    an ECMS measurement, applying the raw_potential and tstamp fixes, or
+    align them onto a common time grid with alignment.align_ec_ms.
+
+    Args:
+        tsv_file (str): Mass spec tsv data file
+        mpt_files_path_prefix (str): EC potentiostat mpt data files path prefix
+        ca (bool): data is from CA experiment instead of CP
+        timings (dict): if given, updated with the seconds taken to read each
+            file and to merge them
+        tsv_cache (bool): read the MS file through the on-disk cache of
+            utils.tsv_cache, so it is only parsed the first time
+        alignment (str): if given, "metadata" or "xcorr", the EC and MS data
+            are resampled onto a common uniform time grid, aligned on the file
+            timestamps or corrected by the cross correlation of current and M2
+            signal, instead of combined by ixdat
+
+    Returns:
+        ecms (ixdat.techniques.ec_ms.ECMSMeasurement), or
+            alignment.AlignedECMS if aligned
+    """
+    ec, ms, read_timings = load_ec_ms(tsv_file, mpt_files_path_prefix, tsv_cache=tsv_cache)
+
+    start = time.perf_counter()
+    if alignment is None:
+        ecms = combine_ec_ms(ec, ms, ca=ca)
+    else:
+        with profiling.span("align"):
+            ecms = align_ec_ms(ec, ms, method=alignment, potential_item="Ewe/V" if ca else "<Ewe/V>")
+
+    if timings is not None:
+        timings.update(read_timings)
+        timings["merge"] = time.perf_counter() - start
+
+    return ecms
+
+
+@profiling.profiled("merge")
+def combine_ec_ms(ec, ms, ca=False):
+    """
+    combine EC and MS measurements, applying the raw_potential and tstamp fixes.
+    """
+    ecms = ec + ms
+
+    # fix for raw_potential being always 0 (not read correctly)
+    if not ca:
+        ecms["raw_potential"]._data = ecms["<Ewe/V>"]._data
+    else:
+        ecms["raw_potential"]._data = ecms["Ewe/V"]._data
+
+    ecms.tstamp += ecms.t[0] - 1
+
+    return ecms
+
+
+def all_step_numbers(ecms):
+    """
+    step numbers of all steps in the measurement (steps start from 1)
+    """
+    return StepIndex.from_selector(ecms).step_numbers
+
+
+def run_CO2RR_analysis(
+        tsv_file,
+        mpt_files_path_prefix,
+        her_only_steps,
+        ms_background_steps,
+        output_dir=".",
+        step_length=300,
+        time_averaged_over=100,
+        start_time=0,
+        pH=None,
+        ca=False,
+        measured_steps=False,
+        timings=None,
+        table_formats=("csv",),
+        bootstrap=0,
+        background_model="constant",
+        session=None,
+        renderer=None,
+        tsv_cache=False,
+        alignment=None,
+):
+    """
+    run the CO2RR faradaic efficiency analysis for one experiment, writing
+    the ECMS plot(s) and faradaic efficiency table to output_dir.
+
+    Args:
+        tsv_file (str): Mass spec tsv data file
+        mpt_files_path_prefix (str): EC potentiostat mpt data files path prefix
+        her_only_steps (list[int]): HER only step numbers (steps start from 1)
+        ms_background_steps (list[int]): steps for calculating HER MS background current
+        output_dir (str): directory to write results to
+        step_length (float): length of steps in ECMS experiment
+        time_averaged_over (float): time duration to average currents over
+        start_time (float): t=0 of step sequence
+        pH (float): pH of Ag/AgCl reference electrode, if given also plot
+            against Ag/AgCl
+        ca (bool): data is from CA experiment instead of CP
+        measured_steps (bool): average over the end of each step as found from
+            the step numbers of the EC data, for steps of irregular length,
+            instead of steps of step_length from start_time
+        timings (dict): if given, updated with the seconds taken to read each
+            file and to merge them
+        table_formats (list[str]): formats to write the faradaic efficiency
+            and step averages tables in, any of "csv", "parquet" and "feather"
+        bootstrap (int): if non zero, number of bootstrap replicates used to add
+            the FE mean, std and 95% confidence interval to the table
+        background_model (str): "constant" to subtract the mean M2 current of
+            the background steps, or "interpolated" to interpolate it between
+            them for a drifting baseline
+        session (str): if given, save the calibrated ECMS data, the parameters
+            and the results as a session file, see session.save_session
+        renderer (rendering.FigureRenderer): if given, the plots are rendered
+            in its worker processes while the faradaic efficiencies are
+            calculated, otherwise they are rendered before
+        tsv_cache (bool): read the MS file through the on-disk cache of
+            utils.tsv_cache, so it is only parsed the first time
+        alignment (str): align the EC and MS data on a common time grid, see
+            load_ecms
+
+    Returns:
+        data (pd.DataFrame): the faradaic efficiencies of all steps
+    """
+    name = os.path.basename(tsv_file)[:-4]
+
+    ecms = load_ecms(
+        tsv_file, mpt_files_path_prefix, ca=ca, timings=timings, tsv_cache=tsv_cache, alignment=alignment,
+    )
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    with profiling.span("calibrate"):
+        ecms.calibrate(
+            RE_vs_RHE=RE_VS_RHE,
+            A_el=ELECTRODE_AREA,
+            R_Ohm=OHMIC_DROP,
+        )
+    figures = [save_ecms_plot(ecms, name, os.path.join(output_dir, "ecms_plot.png"), renderer)]
+
+    if pH is not None:
+        ecms.calibrate(
+            RE_vs_RHE=silver_silver_chloride_to_RHE(pH),
+            A_el=ELECTRODE_AREA,
+            R_Ohm=OHMIC_DROP,
+        )
+        figures.append(
+            save_ecms_plot(ecms, name, os.path.join(output_dir, "ecms_plot_Ag_AgCl.png"), renderer)
+        )
+
+    data, step_averages = calculate_CO2RR_results(
+        ecms,
+        her_only_steps,
+        ms_background_steps,
+        step_length=step_length,
+        time_averaged_over=time_averaged_over,
+        start_time=start_time,
+        measured_steps=measured_steps,
+        bootstrap=bootstrap,
+        background_model=background_model,
+    )
+
+    for fmt in table_formats:
+        with open(os.path.join(output_dir, "CO2RR_faradaic_efficiencies." + fmt), "wb") as f:
+            write_table(data, f, fmt)
+        with open(os.path.join(output_dir, "step_averages." + fmt), "wb") as f:
+            write_table(step_averages, f, fmt)
+
+    if session is not None:
+        save_session(
+            session,
+            ecms,
+            parameters=dict(
+                name=name,
+                her_only_steps=list(her_only_steps),
+                ms_background_steps=list(ms_background_steps),
+                step_length=step_length,
+                time_averaged_over=time_averaged_over,
+                start_time=start_time,
+                pH=pH,
+                ca=ca,
+                measured_steps=measured_steps,
+                bootstrap=bootstrap,
+                background_model=background_model,
+            ),
+            results={"CO2RR_faradaic_efficiencies": data, "step_averages": step_averages},
+        )
+
+    if renderer is not None:
+        with profiling.span("wait for figures"):
+            for figure in figures:
+                figure.result()
+
+    return data
+
+
+def calculate_CO2RR_results(
+        ecms,
+        her_only_steps,
+        ms_background_steps,
+        step_length=300,
+        time_averaged_over=100,
+        start_time=0,
+        measured_steps=False,
+        bootstrap=0,
+        background_model="constant",
+        FE_calculator=None,
+):
+    """
+    calculate the CO2RR faradaic efficiencies and step averages of all steps
+    of a calibrated ECMS measurement, see run_CO2RR_analysis for the
+    parameters. An existing FE_calculator of the measurement can be passed
+    to reuse its series, its step parameters are updated. With the
+    "interpolated" background_model the HER background is interpolated
+    between the background steps to follow a drifting M2 baseline.
+
+    Returns:
+        data (pd.DataFrame): the faradaic efficiencies of all steps
+        step_averages (pd.DataFrame): the averages of each series of all steps
+    """
+    step_index = StepIndex.from_selector(ecms)
+
+    if FE_calculator is None:
+        FE_calculator = FaradaicEfficiencyECMS(
+            ecms,
+            start_time=start_time,
+            step_duration=step_length,
+            duration_averaged=time_averaged_over,
+        )
+    FE_calculator.start_time = start_time
+    FE_calculator.step_duration = step_length
+    FE_calculator.duration_averaged = time_averaged_over
+    FE_calculator.step_index = step_index if measured_steps else None
+
+    if background_model == "interpolated":
+        HER_background = FE_calculator.calc_HER_background_model(ms_background_steps)
+    elif background_model == "constant":
+        HER_background = FE_calculator.calc_HER_background_current(ms_background_steps)
+    else:
+        raise ValueError(
+            "unknown background model {}, expected one of {}".format(background_model, BACKGROUND_MODELS)
+        )
+
+    coefs = FE_calculator.linear_fit_HER_MS_to_cell_current_conversion(
+        step_nums=her_only_steps,
+        background_current=HER_background,
+    )
+
+    if bootstrap:
+        data = FE_calculator.bootstrap_CO2RR_faradaic_efficiencies(
+            step_index.step_numbers,
+            her_only_steps,
+            background_steps=ms_background_steps if background_model == "constant" else None,
+            background_MS_current=None if background_model == "constant" else HER_background,
+            n_boot=bootstrap,
+        )
+    else:
+        data = FE_calculator.calculate_CO2RR_faradaic_efficiencies(
+            step_index.step_numbers,
+            coefs,
+            HER_background,
+        )
+
+    step_averages = FE_calculator.step_averages(step_index.step_numbers)
+
+    return data, step_averages
+
+
+def save_ecms_plot(ecms, title, fpath, renderer=None):
+    """
+    plot the ECMS data with species labels and save to fpath, in the worker
+    processes of renderer if given
+
+    Returns:
+        fpath (str), or its future if rendered by renderer
+    """
+    with profiling.span("plot spec", file=fpath):
+        spec = ecms_plot_spec(ecms, title=title, use_species=True, dpi=300)
+
+    if renderer is not None:
+        return renderer.submit(spec, fpath)
+
+    with profiling.span("savefig", file=fpath):
+        return render_ecms_plot(spec, fpath)
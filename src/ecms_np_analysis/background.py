@@ -0,0 +1,99 @@
+import numpy as np
+
+from .utils.intervals import IntervalAverager, interval_bounds
+
+BACKGROUND_METHODS = ("mean", "median")
+
+# a constant background averaged over all background steps, or one
+# interpolated between the background steps
+BACKGROUND_MODELS = ("constant", "interpolated")
+
+
+class HERBackground():
+    """
+    Time-varying HER MS background current for a drifting M2 baseline. The
+    background is measured in background segments, e.g. the averaged window
+    of each background step, and linearly interpolated between the segment
+    midpoints, held constant before the first and after the last. With one
+    segment it is the usual constant background.
+    """
+
+    def __init__(self, times, values):
+        self.times = np.asarray(times, dtype=float)
+        self.values = np.asarray(values, dtype=float)
+
+        if self.times.shape != self.values.shape:
+            raise ValueError("times and values must have the same length")
+        if self.times.size == 0:
+            raise ValueError("at least one background segment required")
+        if np.any(self.times[1:] < self.times[:-1]):
+            order = np.argsort(self.times, kind="stable")
+            self.times, self.values = self.times[order], self.values[order]
+
+    @classmethod
+    def from_intervals(cls, t, v, intervals, method="mean"):
+        """
+        build the background from the mean or median of an MS series in each
+        background segment. Means of all segments are found in one pass over
+        the cumulative sum of the series.
+
+        Args:
+            t (np.ndarray): time values
+            v (np.ndarray): MS current values, e.g. of M2
+            intervals (list[tuple[float, float]]): (start, end) times of each
+                background segment
+            method (str): "mean" or "median" of each segment
+
+        Returns:
+            background (HERBackground)
+        """
+        return cls.from_averager(IntervalAverager(t, v), intervals, method)
+
+    @classmethod
+    def from_averager(cls, averager, intervals, method="mean"):
+        """
+        build the background from an IntervalAverager of the MS series, see
+        from_intervals
+        """
+        intervals = np.asarray(intervals, dtype=float).reshape(-1, 2)
+
+        if method == "mean":
+            values = averager.means(intervals)
+        elif method == "median":
+            lo, hi = interval_bounds(averager.t, intervals)
+            values = np.array([
+                np.median(averager.v[i:j]) if j > i else np.nan for i, j in zip(lo, hi)
+            ])
+        else:
+            raise ValueError(
+                "unknown background method {}, expected one of {}".format(method, BACKGROUND_METHODS)
+            )
+
+        keep = np.isfinite(values)
+
+        return cls(intervals[keep].mean(axis=1), values[keep])
+
+    def __call__(self, t):
+        """
+        background at times t
+        """
+        return np.interp(t, self.times, self.values)
+
+    def interval_values(self, intervals):
+        """
+        background of each interval, taken at its midpoint
+        """
+        intervals = np.asarray(intervals, dtype=float)
+
+        return self(intervals.mean(axis=-1))
+
+
+def background_at(background, intervals):
+    """
+    background MS current of each interval: a constant background as is, an
+    HERBackground evaluated at each interval
+    """
+    if isinstance(background, HERBackground):
+        return background.interval_values(intervals)
+
+    return background
@@ -0,0 +1,216 @@
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+MANIFEST_PARAMETERS = {
+    "step_length": float,
+    "time_averaged_over": float,
+    "start_time": float,
+    "pH": float,
+}
+
+
+def read_manifest(fpath: str):
+    """
+    read a batch manifest of experiments from a CSV or TOML file.
+
+    CSV manifests have one row per experiment with the columns name, tsv_file,
+    mpt_files_path_prefix, her_only_steps, ms_background_steps and optionally
+    step_length, time_averaged_over, start_time, pH and ca. Step numbers are
+    given as space separated lists (e.g. "2 3 4").
+
+    TOML manifests have an [[experiment]] table per experiment with the same
+    keys, and an optional [defaults] table applied to every experiment.
+
+    Relative file paths are taken relative to the manifest directory.
+
+    Args:
+        fpath (str): path to manifest file
+
+    Returns:
+        experiments (list[dict]): the parameters of each experiment
+    """
+    if fpath.endswith(".toml"):
+        import tomllib
+
+        with open(fpath, "rb") as f:
+            manifest = tomllib.load(f)
+        defaults = manifest.get("defaults", {})
+        rows = [{**defaults, **row} for row in manifest.get("experiment", [])]
+    else:
+        rows = pd.read_csv(fpath, dtype=str, keep_default_na=False).to_dict("records")
+
+    base_dir = os.path.dirname(os.path.abspath(fpath))
+    experiments = [_parse_experiment(row, base_dir) for row in rows]
+    check_experiment_names(experiments)
+
+    return experiments
+
+
+def check_experiment_names(experiments):
+    """
+    check each experiment name can name its own output directory: names
+    must be unique and a single path component, so no experiment writes
+    outside the output directory or into that of another.
+    """
+    names = [x["name"] for x in experiments]
+
+    for name in names:
+        if name in ("", ".", "..") or os.path.basename(name) != name:
+            raise ValueError(
+                "experiment name {!r} must be a single path component".format(name)
+            )
+
+    duplicates = {x for x in names if names.count(x) > 1}
+    if duplicates:
+        raise ValueError("duplicate experiment names in manifest: {}".format(sorted(duplicates)))
+
+
+def _parse_experiment(row: dict, base_dir: str):
+    """
+    convert a manifest row to run_CO2RR_analysis keyword arguments
+    """
+    try:
+        experiment = {
+            "tsv_file": os.path.join(base_dir, row["tsv_file"]),
+            "mpt_files_path_prefix": os.path.join(base_dir, row["mpt_files_path_prefix"]),
+        }
+    except KeyError as e:
+        raise ValueError("manifest entry missing field {}: {}".format(e, row))
+
+    for key in ("her_only_steps", "ms_background_steps"):
+        if key not in row:
+            raise ValueError("manifest entry missing field '{}': {}".format(key, row))
+        try:
+            experiment[key] = _parse_steps(row[key])
+        except (TypeError, ValueError):
+            raise ValueError(
+                "manifest field {} must be step numbers, got {!r}: {}".format(key, row[key], row)
+            )
+
+    experiment["name"] = row.get("name") or os.path.basename(row["tsv_file"])[:-4]
+
+    for key, cast in MANIFEST_PARAMETERS.items():
+        if row.get(key, "") != "":
+            experiment[key] = cast(row[key])
+
+    ca = row.get("ca", False)
+    if isinstance(ca, str):
+        ca = ca.strip().lower() in ("1", "true", "yes", "ca")
+    experiment["ca"] = bool(ca)
+
+    return experiment
+
+
+def _parse_steps(steps):
+    """
+    step numbers from a space separated string, a list or a single number
+    """
+    if isinstance(steps, str):
+        steps = steps.split()
+    elif not isinstance(steps, (list, tuple)):
+        steps = [steps]
+
+    return [int(x) for x in steps]
+
+
+def run_experiment(experiment: dict, output_dir: str):
+    """
+    run the CO2RR analysis of one manifest experiment into its own output
+    directory. Errors are caught and returned so one failing experiment does
+    not abort the batch.
+
+    Returns:
+        name (str), data (pd.DataFrame or None), error (str or None)
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    from .analysis import run_CO2RR_analysis
+
+    kwargs = dict(experiment)
+    name = kwargs.pop("name")
+
+    try:
+        data = run_CO2RR_analysis(output_dir=os.path.join(output_dir, name), **kwargs)
+    except Exception:
+        return name, None, traceback.format_exc()
+
+    return name, data, None
+
+
+def run_batch(experiments: list[dict], output_dir: str, max_workers: int = None, progress=None):
+    """
+    run the CO2RR analysis of each experiment across a process pool, writing
+    results to output_dir/<experiment name>/, a combined summary table to
+    output_dir/summary.csv and any failures to output_dir/failures.csv.
+
+    Args:
+        experiments (list[dict]): experiments as returned by read_manifest
+        output_dir (str): directory to write results to
+        max_workers (int): number of worker processes, default number of CPUs
+        progress (callable): if given, called with the name and the error
+            traceback, None on success, as each experiment finishes
+
+    Returns:
+        summary (pd.DataFrame): faradaic efficiencies of all successful
+            experiments with an "experiment" column
+        failures (pd.DataFrame): name and error of each failed experiment
+    """
+    check_experiment_names(experiments)
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    results, errors = {}, {}
+
+    def record(name, data, error):
+        if error is None:
+            results[name] = data
+        else:
+            errors[name] = error
+        if progress is not None:
+            progress(name, error)
+
+    broken = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(run_experiment, experiment, output_dir): experiment
+            for experiment in experiments
+        }
+        for future in as_completed(futures):
+            try:
+                record(*future.result())
+            except BrokenProcessPool:
+                broken.append(futures[future])
+            except Exception:
+                record(futures[future]["name"], None, traceback.format_exc())
+
+    # a worker that died, e.g. out of memory, broke the pool and every
+    # experiment not finished by then. Rerun each in its own process so only
+    # the experiment killing its worker fails.
+    for experiment in broken:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            try:
+                record(*executor.submit(run_experiment, experiment, output_dir).result())
+            except Exception:
+                record(experiment["name"], None, traceback.format_exc())
+
+    # keep manifest order in the combined tables
+    order = [x["name"] for x in experiments]
+
+    frames = [results[name].assign(experiment=name) for name in order if name in results]
+    summary = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    if not summary.empty:
+        summary = summary[["experiment"] + [c for c in summary.columns if c != "experiment"]]
+
+    failures = pd.DataFrame(
+        [[name, errors[name]] for name in order if name in errors],
+        columns=["experiment", "error"],
+    )
+
+    summary.to_csv(os.path.join(output_dir, "summary.csv"), index=False)
+    failures.to_csv(os.path.join(output_dir, "failures.csv"), index=False)
+
+    return summary, failures
@@ -0,0 +1,471 @@
+"""
+Command line interface with a subcommand for each script and the analysis
+server:
+
+    ecms-np-analysis plot-ec 03__02_CP -s ec_plot
+    ecms-np-analysis plot-ms data.tsv -s ms_plot
+    ecms-np-analysis plot-ecms data.tsv 03__02_CP
+    ecms-np-analysis fe data.tsv 03__02_CP -her 2 3 4 -bg 1
+    ecms-np-analysis serve --port 8765
+
+Only argparse and the standard library are imported at start up. Each
+subcommand imports numpy, pandas, ixdat and matplotlib when it is run, so
+parsing the arguments and printing help is fast.
+"""
+import argparse
+import os
+import signal
+
+from .export import TABLE_FORMATS
+from .profiling import PROFILE_FORMATS
+
+
+def _background_model(value):
+    from .background import BACKGROUND_MODELS
+
+    if value not in BACKGROUND_MODELS:
+        raise argparse.ArgumentTypeError(
+            "unknown background model {}, expected one of {}".format(value, BACKGROUND_MODELS)
+        )
+
+    return value
+
+
+def _alignment_method(value):
+    from .alignment import ALIGNMENT_METHODS
+
+    if value not in ALIGNMENT_METHODS:
+        raise argparse.ArgumentTypeError(
+            "unknown alignment method {}, expected one of {}".format(value, ALIGNMENT_METHODS)
+        )
+
+    return value
+
+
+def _save_or_show(fig, save_plot):
+    from .plotting import decimate_figure
+
+    if save_plot is not None:
+        decimate_figure(fig, dpi=300)
+        fig.savefig(save_plot + ".png", dpi=300, bbox_inches='tight',)
+    else:
+        import matplotlib.pyplot as plt
+
+        plt.show()
+
+
+def add_tsv_cache_argument(parser):
+    parser.add_argument(
+        "--tsv-cache",
+        action="store_true",
+        default=False,
+        help="keep the parsed tsv file in an on-disk cache and memory-map it in later runs "
+        "(in ECMS_NP_CACHE_DIR, default ~/.cache/ecms_np_analysis/tsv)",
+    )
+
+
+def add_alignment_argument(parser):
+    parser.add_argument(
+        "--align",
+        type=_alignment_method,
+        default=None,
+        help="resample the EC and MS data onto a common time grid, aligned on the file timestamps "
+        "or corrected by the cross correlation of current and M2 signal, instead of combining "
+        "them with ixdat (metadata or xcorr)",
+    )
+
+
+def add_plot_ec_arguments(parser):
+    parser.add_argument(
+        "mpt_file",
+        type=str,
+        help="EC potentiostat mpt data files path prefix, e.g. .../03__02_CP",
+    )
+
+    parser.add_argument("-s", "--save-plot", type=str, default=None, help="save plot to filename", metavar="filename")
+
+
+def plot_ec(args):
+    """
+    plot the EC data of a set of mpt files
+    """
+    from .utils.mpt_reader import read_mpt_set
+
+    ec = read_mpt_set(args.mpt_file)
+
+    axes = ec.plot()
+    _save_or_show(axes[0].get_figure(), args.save_plot)
+
+
+def add_plot_ms_arguments(parser):
+    parser.add_argument("tsv_file", type=str, help="Mass spec tsv data file")
+
+    parser.add_argument("-s", "--save-plot", type=str, default=None, help="save plot to filename", metavar="filename")
+
+    add_tsv_cache_argument(parser)
+
+
+def plot_ms(args):
+    """
+    plot the MS data of a tsv file with species labels
+    """
+    from ixdat import Measurement
+
+    from .utils.mass_to_species import MASS_TO_SPECIES_PLOT
+    from .utils.tsv_cache import ms_measurement
+
+    if args.tsv_cache:
+        ms = ms_measurement(args.tsv_file)
+    else:
+        ms = Measurement.read(
+            args.tsv_file,
+            reader="zilien",
+            technique="MS",
+        )
+
+    axes = ms.plot()
+    _, labels = axes.get_legend_handles_labels()
+    new_labels = [MASS_TO_SPECIES_PLOT[x] for x in labels]
+
+    axes.legend(
+        loc=(1.05, 0.5) if args.save_plot is not None else None,
+        labels=new_labels,
+    )
+    _save_or_show(axes.get_figure(), args.save_plot)
+
+
+def add_plot_ecms_arguments(parser):
+    parser.add_argument(
+        "tsv_file",
+        type=str,
+        help="Mass spec tsv data file",
+    )
+
+    parser.add_argument(
+        "mpt_files_path_prefix",
+        type=str,
+        help="EC potentiostat mpt data files path prefix, e.g. .../03__02_CP",
+    )
+
+    parser.add_argument(
+        "-pH",
+        "--pH",
+        type=float,
+        default=None,
+        help="pH of Ag/AgCl reference electrode, the potential is plotted vs RHE if not given",
+    )
+
+    parser.add_argument(
+        "-ca",
+        "--ca",
+        action="store_true",
+        default=False,
+        help="data is from CA experiment instead of CP",
+    )
+
+    parser.add_argument(
+        "-s",
+        "--save-plot",
+        type=str,
+        default="ecms_plot",
+        help="save plot to filename (default ecms_plot)",
+        metavar="filename",
+    )
+
+    add_tsv_cache_argument(parser)
+    add_alignment_argument(parser)
+
+
+def plot_ecms(args):
+    """
+    plot the calibrated ECMS data with species labels and save it
+    """
+    from .analysis import ELECTRODE_AREA, OHMIC_DROP, RE_VS_RHE, load_ecms, save_ecms_plot
+    from .utils.reference_electrodes import silver_silver_chloride_to_RHE
+
+    ecms = load_ecms(
+        args.tsv_file, args.mpt_files_path_prefix, ca=args.ca, tsv_cache=args.tsv_cache, alignment=args.align,
+    )
+
+    ecms.calibrate(
+        RE_vs_RHE=RE_VS_RHE if args.pH is None else silver_silver_chloride_to_RHE(args.pH),
+        A_el=ELECTRODE_AREA,
+        R_Ohm=OHMIC_DROP,
+    )
+
+    save_ecms_plot(ecms, os.path.basename(args.tsv_file)[:-4], args.save_plot + ".png")
+
+
+def add_fe_arguments(parser):
+    parser.add_argument(
+        "tsv_file",
+        type=str,
+        help="Mass spec tsv data file",
+    )
+
+    parser.add_argument(
+        "mpt_files_path_prefix",
+        type=str,
+        help="EC potentiostat mpt data files path prefix, e.g. .../03__02_CP",
+    )
+
+    parser.add_argument(
+        "-her",
+        "--her-only-steps",
+        type=int,
+        nargs="+",
+        required=True,
+        help="HER are only step numbers (steps start from 1)",
+    )
+
+    parser.add_argument(
+        "-s",
+        "--step-length",
+        default=300,
+        type=float,
+        help="length of steps in ECMS experiment",
+    )
+
+    parser.add_argument(
+        "-bg",
+        "--ms-background-step",
+        type=int,
+        nargs="+",
+        required=True,
+        help="step for calculating HER MS background current (steps start from 1)",
+    )
+
+    parser.add_argument(
+        "-ave",
+        "--time-averaged-over",
+        type=float,
+        default=100,
+        help="time duration to average currents over",
+    )
+
+    parser.add_argument(
+        "-st",
+        "--start-time",
+        type=float,
+        default=0,
+        help="set t=0 of step sequence if desired",
+    )
+
+    parser.add_argument(
+        "-pH",
+        "--pH",
+        type=float,
+        default=None,
+        help="pH of Ag/AgCl reference electrode",
+    )
+
+    parser.add_argument(
+        "-ca",
+        "--ca",
+        action="store_true",
+        default=False,
+        help="data is from CA experiment instead of CP",
+    )
+
+    parser.add_argument(
+        "-ms",
+        "--measured-steps",
+        action="store_true",
+        default=False,
+        help="average over the end of each step as recorded in the EC data, for steps of irregular length",
+    )
+
+    parser.add_argument(
+        "-t",
+        "--timings",
+        action="store_true",
+        default=False,
+        help="print the time taken to read each file",
+    )
+
+    parser.add_argument(
+        "-f",
+        "--table-formats",
+        type=str,
+        nargs="+",
+        choices=TABLE_FORMATS,
+        default=["csv"],
+        help="formats to write the faradaic efficiency and step averages tables in",
+    )
+
+    parser.add_argument(
+        "-b",
+        "--bootstrap",
+        type=int,
+        default=0,
+        help="number of bootstrap replicates for FE uncertainties (default none)",
+    )
+
+    parser.add_argument(
+        "--session",
+        type=str,
+        default=None,
+        help="save the calibrated ECMS data, parameters and results to this .npz session file",
+    )
+
+    parser.add_argument(
+        "--profile",
+        type=str,
+        default=None,
+        help="record profiling spans and write them to this file",
+    )
+
+    parser.add_argument(
+        "--profile-format",
+        type=str,
+        choices=PROFILE_FORMATS,
+        default="chrome",
+        help="format of the profile file, a Chrome trace (open in ui.perfetto.dev) or JSON",
+    )
+
+    # no string default, argparse would convert it with _background_model,
+    # importing numpy, before reporting missing arguments
+    parser.add_argument(
+        "-bgm",
+        "--background-model",
+        type=_background_model,
+        default=None,
+        help="subtract a constant HER MS background, or one interpolated between the background steps "
+        "for a drifting M2 baseline (constant or interpolated, default constant)",
+    )
+
+    add_tsv_cache_argument(parser)
+    add_alignment_argument(parser)
+
+
+def fe(args):
+    """
+    calculate and plot the CO2RR faradaic efficiencies, writing the plots and
+    tables to the working directory
+    """
+    from . import profiling
+    from .analysis import run_CO2RR_analysis
+    from .rendering import FigureRenderer
+
+    if args.profile:
+        profiling.enable()
+
+    timings = {}
+
+    # the RHE and Ag/AgCl plots render in the background during the FE calculation
+    with FigureRenderer(max_workers=2) as renderer:
+        run_CO2RR_analysis(
+            args.tsv_file,
+            args.mpt_files_path_prefix,
+            her_only_steps=args.her_only_steps,
+            ms_background_steps=args.ms_background_step,
+            output_dir=".",
+            step_length=args.step_length,
+            time_averaged_over=args.time_averaged_over,
+            start_time=args.start_time,
+            pH=args.pH,
+            ca=args.ca,
+            measured_steps=args.measured_steps,
+            timings=timings,
+            table_formats=args.table_formats,
+            bootstrap=args.bootstrap,
+            background_model=args.background_model or "constant",
+            session=args.session,
+            renderer=renderer,
+            tsv_cache=args.tsv_cache,
+            alignment=args.align,
+        )
+
+    if args.timings:
+        for key, seconds in timings.items():
+            print("{:8.3f} s  {}".format(seconds, key))
+
+    if args.profile:
+        profiling.write(args.profile, args.profile_format)
+        print(profiling.summary().to_string(index=False))
+
+
+def add_serve_arguments(parser):
+    parser.add_argument(
+        "--host",
+        type=str,
+        default=None,
+        help="address to listen on (default 127.0.0.1, only this machine)",
+    )
+
+    parser.add_argument(
+        "-p",
+        "--port",
+        type=int,
+        default=None,
+        help="port to listen on (default 8765)",
+    )
+
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="number of worker processes (default number of CPUs)",
+    )
+
+    parser.add_argument(
+        "--cache-size",
+        type=float,
+        default=None,
+        help="memory in MB of the cached measurements before the least recently used are freed (default 2048)",
+    )
+
+
+def serve(args):
+    """
+    run the analysis server until interrupted
+    """
+    from .server import AnalysisServer
+
+    options = dict(host=args.host, port=args.port, max_workers=args.jobs)
+    if args.cache_size is not None:
+        options["max_cache_bytes"] = int(args.cache_size * 2**20)
+
+    with AnalysisServer(**{x: v for x, v in options.items() if v is not None}) as server:
+        # stop as on ctrl-c when terminated, e.g. by a job runner
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        print("serving on http://{}:{}".format(*server.address), flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+# subcommand: arguments, function run and help
+COMMANDS = {
+    "plot-ec": (add_plot_ec_arguments, plot_ec, "plot EC data from mpt files"),
+    "plot-ms": (add_plot_ms_arguments, plot_ms, "plot MS data from a tsv file"),
+    "plot-ecms": (add_plot_ecms_arguments, plot_ecms, "plot calibrated ECMS data"),
+    "fe": (add_fe_arguments, fe, "calculate and plot CO2RR faradaic efficiencies from ecms data"),
+    "serve": (add_serve_arguments, serve, "run a resident server calculating faradaic efficiencies of cached measurements"),
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="ecms-np-analysis",
+        description="analysis of ECMS data of nanoparticle CO2RR experiments",
+    )
+    subparsers = parser.add_subparsers(dest="command", metavar="command", required=True)
+
+    for command, (add_arguments, run, help) in COMMANDS.items():
+        subparser = subparsers.add_parser(command, help=help, description=help)
+        add_arguments(subparser)
+        subparser.set_defaults(run=run)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import importlib.util
+import io
+import time
+import zipfile
+
+TABLE_FORMATS = ("csv", "parquet", "feather")
+
+
+def available_table_formats():
+    """
+    table formats that can be written, parquet and feather need pyarrow
+    """
+    if importlib.util.find_spec("pyarrow") is None:
+        return ("csv",)
+
+    return TABLE_FORMATS
+
+
+def write_table(data, file_obj, fmt="csv"):
+    """
+    write a DataFrame to a binary file object as csv, parquet or feather
+    """
+    if fmt == "csv":
+        text = io.TextIOWrapper(file_obj, encoding="utf-8", newline="")
+        data.to_csv(text, index=False)
+        text.flush()
+        text.detach()
+    elif fmt == "parquet":
+        data.to_parquet(file_obj, index=False)
+    elif fmt == "feather":
+        data.reset_index(drop=True).to_feather(file_obj)
+    else:
+        raise ValueError(
+            "unknown table format {}, expected one of {}".format(fmt, TABLE_FORMATS)
+        )
+
+
+class ResultsArchive():
+    """
+    Zip archive of results built lazily: rendered figures and tables are
+    only registered when added, and the tables are written one entry at a
+    time into the archive file when it is written, so no table is held in
+    memory in every format at once.
+    """
+
+    def __init__(self, table_formats=("csv",)):
+        for fmt in table_formats:
+            if fmt not in TABLE_FORMATS:
+                raise ValueError(
+                    "unknown table format {}, expected one of {}".format(fmt, TABLE_FORMATS)
+                )
+
+        self.table_formats = tuple(table_formats)
+        self._entries = []
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def names(self):
+        return [name for name, _, _ in self._entries]
+
+    def add_png(self, name, data):
+        """
+        add an already rendered PNG image, e.g. from a FigureRenderer, saved
+        as name.png
+        """
+        self._entries.append((
+            name + ".png",
+            zipfile.ZIP_STORED,
+            lambda f: f.write(data),
+        ))
+
+    def add_table(self, name, data):
+        """
+        add a DataFrame, saved as name.<format> in each of the table formats
+        when the archive is written
+        """
+        for fmt in self.table_formats:
+            self._entries.append((
+                name + "." + fmt,
+                zipfile.ZIP_DEFLATED if fmt == "csv" else zipfile.ZIP_STORED,
+                lambda f, fmt=fmt: write_table(data, f, fmt),
+            ))
+
+    def write(self, file_obj):
+        """
+        render each entry and stream it into a zip archive written to file_obj
+        """
+        with zipfile.ZipFile(file_obj, mode="w") as zf:
+            for name, compress_type, write in self._entries:
+                info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+                info.compress_type = compress_type
+                with zf.open(info, mode="w") as f:
+                    write(f)
@@ -1,6 +1,12 @@
 import numpy as np
 import pandas as pd
 
+from . import profiling
+from .background import HERBackground, background_at
+from .utils.calibration_factor import convert_MS_current_by_calibration_factor
+from .utils.intervals import IntervalAverager
+from .utils.mass_to_species import PRODUCTS
+
 
 class FaradaicEfficiencyECMS():
     """
@@ -14,19 +20,30 @@ class FaradaicEfficiencyECMS():
             start_time,
             step_duration,
             duration_averaged,
+            batched=True,
+            step_index=None,
     ):
 
         self._ecms = ecms_data
         self.start_time = start_time
         self.step_duration = step_duration
         self.duration_averaged = duration_averaged
+        self.batched = batched
+        self.step_index = step_index
+        self._series = {}
+        self._window_bounds = {}
 
 
     def interval_times_from_step_numbers(self, steps):
         """
         convert ordinal number of each step to the corresponding time intervals
-        required for calculations
+        required for calculations. With a step index the intervals end at the
+        measured end of each step, otherwise steps are assumed to be
+        step_duration long from start_time.
         """
+        if self.step_index is not None:
+            return self.step_index.averaging_intervals(steps, self.duration_averaged)
+
         return [
             (
                 self.start_time + self.step_duration*(x)-self.duration_averaged,
@@ -35,17 +52,87 @@ class FaradaicEfficiencyECMS():
             for x in steps
         ]
 
+    def grab_series(self, item):
+        """
+        grab the full time and value arrays of a series once and keep them,
+        with their cumulative sum, for subsequent interval calculations. Call
+        clear_series_cache if the underlying measurement is modified.
+        """
+        if item not in self._series:
+            t, v = self._ecms.grab(item=item)
+            self._series[item] = IntervalAverager(t, v)
+
+        return self._series[item]
+
+    def clear_series_cache(self):
+        """
+        discard the series arrays kept by grab_series
+        """
+        self._series = {}
+        self._window_bounds = {}
+
+    def interval_means(self, item, intervals):
+        """
+        average value of a series in each of the time intervals. In batched
+        mode all intervals are reduced at once from the full series, otherwise
+        each interval is grabbed from the measurement separately.
+        """
+        if self.batched:
+            return self.grab_series(item).means(intervals)
+
+        return np.array([
+            _nanmean(self._ecms.grab(item=item, tspan=interval)[1])
+            for interval in intervals
+        ])
+
+    def window_bounds(self, item):
+        """
+        sample index boundaries of the averaging window of every step of the
+        step index in a series, found once per series, step index and
+        duration_averaged and kept with the series arrays
+        """
+        step_index, duration_averaged, bounds = self._window_bounds.get(item, (None, None, None))
+        if step_index is not self.step_index or duration_averaged != self.duration_averaged:
+            bounds = self.step_index.window_bounds(self.grab_series(item).t, self.duration_averaged)
+            self._window_bounds[item] = (self.step_index, self.duration_averaged, bounds)
+
+        return bounds
+
+    def step_means(self, item, steps):
+        """
+        average value of a series over the averaged interval of each step.
+        With a step index in batched mode the windows of the steps are sliced
+        by their sample boundaries from window_bounds, otherwise the means
+        are those of interval_means.
+        """
+        if self.step_index is None or not self.batched:
+            return self.interval_means(item, self.interval_times_from_step_numbers(steps))
+
+        lo, hi = self.window_bounds(item)
+        i = self.step_index._index(steps)
+
+        return self.grab_series(item).bounded_means(lo[i], hi[i])
+
+    @profiling.profiled("HER background")
     def calc_HER_background_current(self, step_nums):
         """
         calculate HER background current as average current between
         start and end times.
         """
+        currents = self.step_means("M2 [A]", step_nums)
+
+        return currents.mean()
+
+    @profiling.profiled("HER background model")
+    def calc_HER_background_model(self, step_nums, method="mean"):
+        """
+        time-varying HER background current from the mean or median M2
+        current of each background step, interpolated between steps. Can be
+        used in place of the constant background current.
+        """
         intervals = self.interval_times_from_step_numbers(step_nums)
-        currents = []
-        for interval in intervals:
-            currents.append(self._ecms.grab(item="M2 [A]", tspan=interval)[1].mean())
 
-        return np.array(currents).mean()
+        return HERBackground.from_averager(self.grab_series("M2 [A]"), intervals, method)
 
 
 
@@ -55,18 +142,30 @@ class FaradaicEfficiencyECMS():
         calculate the HER calibration factor (in units C/mol) by fitting curve to
         HER only steps.
         """
-        HER_calibration_intervals = self.interval_times_from_step_numbers(step_nums)
+        return self.calibration_curve(step_nums, "H2")
 
-        cal_result_H2, _ = self._ecms.ecms_calibration_curve(
-            mol="H2",
-            mass="M2",
-            n_el=-2,
-            tspan_list=HER_calibration_intervals,
+    @profiling.profiled("calibration curve")
+    def calibration_curve(self, step_nums, product, faradaic_efficiency=1):
+        """
+        calculate the calibration factor (in units C/mol) of a product in
+        PRODUCTS by fitting curve to steps producing it with the given
+        faradaic efficiency.
+        """
+        mass, n_el = PRODUCTS[product]
+        calibration_intervals = self.interval_times_from_step_numbers(step_nums)
+
+        cal_result, _ = self._ecms.ecms_calibration_curve(
+            mol=product,
+            mass=mass,
+            n_el=n_el,
+            faradaic_efficiency=faradaic_efficiency,
+            tspan_list=calibration_intervals,
             ax="new",
         )
-        return cal_result_H2.F
+        return cal_result.F
 
 
+    @profiling.profiled("HER fit")
     def linear_fit_HER_MS_to_cell_current_conversion(self, step_nums, background_current):
         """
         conversion from MS current to cell current by linearly fitting HER current
@@ -74,72 +173,309 @@ class FaradaicEfficiencyECMS():
         """
         HER_calibration_intervals = self.interval_times_from_step_numbers(step_nums)
 
-        raw_currents, HER_currents = [], []
-
-        for interval in HER_calibration_intervals:
-            raw_currents.append(
-                self._ecms.grab(item="raw_current", tspan=interval)[1].mean(),
-            )
-            HER_currents.append(
-                self._ecms.grab(item="M2 [A]", tspan=interval)[1].mean(),
-            )
-        
-        raw_currents = np.array(raw_currents)
-        HER_currents = np.array(HER_currents) - background_current
-
-        m, b = np.polyfit(
-            HER_currents,
-            raw_currents,
-            1
+        raw_currents = self.step_means("raw_current", step_nums)
+        HER_currents = (
+            self.step_means("M2 [A]", step_nums)
+            - background_at(background_current, HER_calibration_intervals)
         )
 
-        return m, b
+        return linear_fit_HER_MS_to_cell_current(HER_currents, raw_currents)
 
 
+    @profiling.profiled("CO2RR faradaic efficiencies")
     def calculate_CO2RR_faradaic_efficiencies(self, step_nums, fit_coefs, background_MS_current):
         """
         calculate faradaic efficiency for CO2RR as total cell current less HER current,
         with the total cell current estimated from the fitting of the HER only steps.
         """
-        data = []
+        CO2RR_intervals = self.interval_times_from_step_numbers(step_nums)
 
-        m, b = fit_coefs
+        return CO2RR_faradaic_efficiencies_from_means(
+            CO2RR_intervals,
+            self.step_means("raw_current", step_nums),
+            self.step_means("M2 [A]", step_nums),
+            fit_coefs,
+            background_at(background_MS_current, CO2RR_intervals),
+        )
+
+
+    @profiling.profiled("bootstrap faradaic efficiencies")
+    def bootstrap_CO2RR_faradaic_efficiencies(
+            self,
+            step_nums,
+            HER_only_steps,
+            background_steps=None,
+            background_MS_current=None,
+            n_boot=1000,
+            confidence=0.95,
+            seed=None,
+    ):
+        """
+        faradaic efficiencies with bootstrap uncertainties. Each replicate
+        resamples the samples in the averaged window of every step with
+        replacement, recalculates the background and refits the HER
+        calibration, with all replicates calculated at once as arrays.
+        Samples are resampled independently, so correlated noise within a
+        window is not accounted for.
+
+        Returns:
+            data (pd.DataFrame): the calculate_CO2RR_faradaic_efficiencies table
+                with the FE mean, std and confidence interval over the replicates
+        """
+        if background_MS_current is None and not background_steps:
+            raise ValueError("HER background current or background steps required")
+
+        steps = np.unique(np.concatenate(
+            [step_nums, HER_only_steps, background_steps or []]
+        ).astype(int))
+        column = {step: i for i, step in enumerate(steps)}
+        intervals = self.interval_times_from_step_numbers(steps)
+
+        rng = np.random.default_rng(seed)
+        raw_currents = self.grab_series("raw_current").bootstrap_means(intervals, n_boot, rng)
+        MS_currents = self.grab_series("M2 [A]").bootstrap_means(intervals, n_boot, rng)
+
+        # background of each replicate and step
+        if background_MS_current is None:
+            background = MS_currents[:, [column[x] for x in background_steps]].mean(axis=1, keepdims=True)
+        else:
+            background = background_at(background_MS_current, intervals)
+        background = np.broadcast_to(background, MS_currents.shape)
+
+        HER_columns = [column[x] for x in HER_only_steps]
+        m, b = linear_fits(
+            MS_currents[:, HER_columns] - background[:, HER_columns],
+            raw_currents[:, HER_columns],
+        )
+
+        output = [column[x] for x in step_nums]
+        FE = CO2RR_faradaic_efficiency_columns(
+            raw_currents[:, output],
+            MS_currents[:, output],
+            (m[:, None], b[:, None]),
+            background[:, output],
+        )["Faradaic Efficiency (%)"]
+
+        if background_MS_current is None:
+            background_MS_current = self.calc_HER_background_current(background_steps)
+        data = self.calculate_CO2RR_faradaic_efficiencies(
+            step_nums,
+            self.linear_fit_HER_MS_to_cell_current_conversion(HER_only_steps, background_MS_current),
+            background_MS_current,
+        )
+
+        alpha = (1 - confidence) / 2
+        data["FE mean (%)"] = np.nanmean(FE, axis=0)
+        data["FE std (%)"] = np.nanstd(FE, axis=0, ddof=1)
+        data["FE CI low (%)"] = np.nanquantile(FE, alpha, axis=0)
+        data["FE CI high (%)"] = np.nanquantile(FE, 1 - alpha, axis=0)
+
+        return data
+
+    @profiling.profiled("product faradaic efficiencies")
+    def calculate_product_faradaic_efficiencies(
+            self,
+            step_nums,
+            calibration_factors,
+            background_steps=None,
+            background_MS_currents=None,
+    ):
+        """
+        calculate the faradaic efficiency of each product from its MS current
+        and calibration factor, for all products and steps at once.
+
+        Args:
+            step_nums (list[int]): steps to calculate faradaic efficiencies of
+            calibration_factors (dict): calibration factor (C/mol) of each
+                product in PRODUCTS, e.g. from calibration_curve
+            background_steps (list[int]): steps to average the MS background
+                currents over
+            background_MS_currents (dict): MS background current of each
+                product's mass, used instead of background_steps
+
+        Returns:
+            data (pd.DataFrame): MS current, cell current and faradaic efficiency
+                of each product and the total faradaic efficiency of each step
+        """
+        if background_MS_currents is None and not background_steps:
+            raise ValueError("MS background currents or background steps required")
+
+        products = list(calibration_factors)
+        items = [PRODUCTS[product][0] + " [A]" for product in products]
+
+        intervals = self.interval_times_from_step_numbers(step_nums)
+        MS_currents = np.stack([self.step_means(item, step_nums) for item in items])
+
+        if background_MS_currents is None:
+            background = np.stack([
+                self.step_means(item, background_steps) for item in items
+            ]).mean(axis=1)
+        else:
+            background = np.array([background_MS_currents[product] for product in products])
+
+        return product_faradaic_efficiencies_from_means(
+            intervals,
+            self.step_means("raw_current", step_nums),
+            MS_currents,
+            products,
+            [calibration_factors[product] for product in products],
+            background,
+        )
+
+    def step_averages(self, step_nums, items=None):
+        """
+        average of each series over the averaged interval of each step, by
+        default the raw potential and current and the MS signal of each mass.
+        """
+        if items is None:
+            items = ["raw_potential", "raw_current"] + [
+                mass + " [A]" for mass in sorted(self._ecms.mass_list, key=lambda x: int(x[1:]))
+            ]
+
+        data = pd.DataFrame({
+            "step": step_nums,
+            **_interval_columns(self.interval_times_from_step_numbers(step_nums)),
+        })
+        for item in items:
+            data[item] = self.step_means(item, step_nums)
+
+        return data
+
+
+def _nanmean(v):
+    """
+    mean ignoring nan samples, nan if there are none, as IntervalAverager
+    """
+    v = v[~np.isnan(v)]
+
+    return v.mean() if v.size else np.nan
+
+
+def _interval_columns(intervals):
+    """
+    start and end time columns of the intervals, integer if the step times
+    are integers, as in the tables calculated one interval at a time
+    """
+    intervals = np.array(intervals).reshape(-1, 2)
+
+    return {"start (s)": intervals[:, 0], "end (s)": intervals[:, 1]}
 
-        CO2RR_intervals = self.interval_times_from_step_numbers(step_nums)
 
-        for interval in CO2RR_intervals:
-            raw_current = self._ecms.grab(item="raw_current", tspan=interval)[1].mean()
-            HER_MS_current = self._ecms.grab(item="M2 [A]", tspan=interval)[1].mean() - background_MS_current
-
-            HER_cell_current = HER_MS_current * m + b
-            CO2RR_cell_current = raw_current - HER_cell_current
-
-            if (
-                HER_MS_current < background_MS_current or
-                np.isclose(HER_MS_current, background_MS_current, rtol=0.10, atol=1e-14)
-            ):
-                CO2RR_cell_current = 0.00
-                faradaic_efficiency = 0.0
-            else:
-                faradaic_efficiency = (CO2RR_cell_current / raw_current) * 100
-
-            data.append([
-                interval[0], interval[1],
-                raw_current,
-                HER_MS_current,
-                HER_cell_current,
-                CO2RR_cell_current,
-                faradaic_efficiency
-            ])
-
-        return pd.DataFrame(
-            data,
-            columns=[
-                "start (s)", "end (s)",
-                "total cell current (A)",
-                "HER MS current (A)",
-                "HER cell current (A)",
-                "CO2RR cell current (A)",
-                "Faradaic Efficiency (%)"]
+def CO2RR_faradaic_efficiencies_from_means(intervals, raw_currents, MS_currents, fit_coefs, background_MS_current):
+    """
+    calculate faradaic efficiency for CO2RR from the mean total cell current and
+    mean M2 MS current (before background subtraction) of each interval.
+    """
+    return pd.DataFrame(
+        {
+            **_interval_columns(intervals),
+            **CO2RR_faradaic_efficiency_columns(
+                raw_currents, MS_currents, fit_coefs, background_MS_current,
+            ),
+        }
+    )
+
+
+def product_faradaic_efficiencies_from_means(
+        intervals,
+        raw_currents,
+        MS_currents,
+        products,
+        calibration_factors,
+        background_MS_currents,
+):
+    """
+    calculate the faradaic efficiency of each product from the mean total cell
+    current (mA) of each interval and a (products, intervals) matrix of mean
+    MS currents (A) before background subtraction. The cell currents in the
+    table are in A.
+    """
+    n_el = np.array([PRODUCTS[product][1] for product in products])[:, None]
+
+    # the raw current is in mA
+    total_current = 1e-3 * np.asarray(raw_currents, dtype=float)
+    MS_current = (
+        np.asarray(MS_currents, dtype=float)
+        - np.asarray(background_MS_currents, dtype=float)[:, None]
+    )
+    cell_current = convert_MS_current_by_calibration_factor(
+        np.asarray(calibration_factors, dtype=float)[:, None], MS_current, n_el,
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        faradaic_efficiency = cell_current / total_current * 100
+
+    data = pd.DataFrame({
+        **_interval_columns(intervals),
+        "total cell current (A)": total_current,
+    })
+    for i, product in enumerate(products):
+        data[product + " MS current (A)"] = MS_current[i]
+        data[product + " cell current (A)"] = cell_current[i]
+        data[product + " Faradaic Efficiency (%)"] = faradaic_efficiency[i]
+    data["total Faradaic Efficiency (%)"] = faradaic_efficiency.sum(axis=0)
+
+    return data
+
+
+def CO2RR_faradaic_efficiency_columns(raw_currents, MS_currents, fit_coefs, background_MS_current):
+    """
+    currents and faradaic efficiency columns of the CO2RR faradaic efficiency
+    table. All arguments are broadcast, so many parameter sets can be
+    calculated at once, e.g. with currents of shape (sets, steps) and fit
+    coefficients and background of shape (sets, 1).
+    """
+    m, b = fit_coefs
+
+    raw_current = np.asarray(raw_currents, dtype=float)
+    HER_MS_current = np.asarray(MS_currents, dtype=float) - background_MS_current
+
+    HER_cell_current = HER_MS_current * m + b
+    CO2RR_cell_current = raw_current - HER_cell_current
+
+    no_CO2RR = np.logical_or(
+        HER_MS_current < background_MS_current,
+        np.isclose(HER_MS_current, background_MS_current, rtol=0.10, atol=1e-14),
+    )
+    CO2RR_cell_current = np.where(no_CO2RR, 0.00, CO2RR_cell_current)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        faradaic_efficiency = np.where(
+            no_CO2RR, 0.0, (CO2RR_cell_current / raw_current) * 100,
         )
 
+    return {
+        "total cell current (A)": raw_current,
+        "HER MS current (A)": HER_MS_current,
+        "HER cell current (A)": HER_cell_current,
+        "CO2RR cell current (A)": CO2RR_cell_current,
+        "Faradaic Efficiency (%)": faradaic_efficiency,
+    }
+
+
+def linear_fit_HER_MS_to_cell_current(HER_MS_currents, raw_currents):
+    """
+    linear fit of cell current against background subtracted HER MS current,
+    returns slope and intercept.
+    """
+    m, b = np.polyfit(
+        HER_MS_currents,
+        raw_currents,
+        1
+    )
+
+    return m, b
+
+
+def linear_fits(x, y):
+    """
+    least squares slope and intercept of each row of y against the same row
+    of x, the same fit as np.polyfit(x[i], y[i], 1) for every row at once.
+    """
+    x_mean = x.mean(axis=1, keepdims=True)
+    y_mean = y.mean(axis=1, keepdims=True)
+    dx = x - x_mean
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        m = (dx * (y - y_mean)).sum(axis=1) / (dx * dx).sum(axis=1)
+    b = y_mean[:, 0] - m * x_mean[:, 0]
+
+    return m, b
@@ -0,0 +1,335 @@
+import abc
+import glob
+import io
+
+import numpy as np
+import pandas as pd
+
+from .background import BACKGROUND_MODELS, HERBackground, background_at
+from .faradaic_efficiency import (
+    CO2RR_faradaic_efficiencies_from_means,
+    linear_fit_HER_MS_to_cell_current,
+)
+from .utils.mpt_reader import MPT_ENCODING, parse_mpt_header
+from .utils.tsv_reader import _read_tsv_header, select_columns
+
+MPT_CURRENT_COLUMNS = ["I/mA", "<I>/mA"]
+
+
+class _FileFollower(abc.ABC):
+    """
+    Follows a file that is being appended to, remembering the byte offset
+    of the last complete row parsed so each poll only parses new rows.
+    """
+
+    encoding = "utf-8"
+
+    def __init__(self, fpath, sep='\t'):
+        self.fpath = fpath
+        self.sep = sep
+        self.offset = None
+        self.metadata = None
+        self.col_names = None
+        self.usecols = None
+
+    @abc.abstractmethod
+    def _parse_header(self, file_obj):
+        """
+        return metadata, column names and number of lines before the data
+        """
+
+    def _read_csv_kwargs(self, data):
+        return {}
+
+    def poll(self):
+        """
+        parse the rows appended since the last poll
+
+        Returns:
+            data (pd.DataFrame): new rows, None if the header is not complete yet
+        """
+        if self.offset is None:
+            # a partly written header can fail to parse in many ways
+            try:
+                with open(self.fpath, encoding=self.encoding) as f:
+                    metadata, col_names, num_lines = self._parse_header(f)
+            except (OSError, ValueError, StopIteration, IndexError, KeyError):
+                return None
+
+            # or parse with the column names line cut short
+            with open(self.fpath, "rb") as f:
+                lines = [f.readline() for _ in range(num_lines)]
+                if lines and not lines[-1].endswith(b"\n"):
+                    return None
+                self.offset = f.tell()
+
+            self.metadata, self.col_names = metadata, col_names
+
+        with open(self.fpath, "rb") as f:
+            f.seek(self.offset)
+            data = f.read()
+
+        # only parse complete rows, a partially written row is parsed next poll
+        end = data.rfind(b"\n") + 1
+        self.offset += end
+
+        if not data[:end].strip():
+            return pd.DataFrame(columns=self.usecols or self.col_names, dtype=float)
+
+        return pd.read_csv(
+            io.BytesIO(data[:end]),
+            sep=self.sep,
+            names=self.col_names,
+            usecols=self.usecols,
+            index_col=False,
+            encoding=self.encoding,
+            **self._read_csv_kwargs(data[:end]),
+        )
+
+
+class TSVFollower(_FileFollower):
+    """
+    Follows a Zilien tsv file that is still being written.
+    """
+
+    def __init__(self, fpath, masses=None, sep='\t'):
+        super().__init__(fpath, sep=sep)
+        self.masses = masses
+
+    def _parse_header(self, file_obj):
+        metadata, col_names = _read_tsv_header(file_obj, sep=self.sep)
+        self.usecols = select_columns(col_names, masses=self.masses)
+
+        num_lines = int(metadata.get(
+            "data_start",
+            int(metadata["num_header_lines"]) + int(metadata["num_data_header_lines"]),
+        ))
+
+        return metadata, col_names, num_lines
+
+
+class MPTFollower(_FileFollower):
+    """
+    Follows a BioLogic .mpt file that is still being written.
+    """
+
+    encoding = MPT_ENCODING
+
+    def __init__(self, fpath, columns=None, sep='\t'):
+        super().__init__(fpath, sep=sep)
+        self.columns = columns
+        self.decimal = None
+
+    def _parse_header(self, file_obj):
+        metadata, col_names = parse_mpt_header(file_obj, sep=self.sep)
+        if self.columns is not None:
+            self.usecols = [col for col in col_names if col in self.columns]
+
+        return metadata, col_names, metadata["num_header_lines"]
+
+    def _read_csv_kwargs(self, data):
+        # EC-Lab writes the decimal separator of the acquisition computer's
+        # locale, found once from the first data row as by read_mpt
+        if self.decimal is None:
+            self.decimal = "," if b"," in data[:data.find(b"\n")] else "."
+
+        return {"decimal": self.decimal}
+
+
+class LiveFaradaicEfficiency():
+    """
+    Calculates CO2RR faradaic efficiencies of an ECMS experiment while the MS
+    tsv file and EC mpt files are still being written. Each update parses only
+    the newly appended rows, accumulates them into the averaging windows of
+    their steps, and returns the faradaic efficiencies of the steps completed
+    since the last update.
+
+    Times follow the combined ECMS measurement used by the scripts, with t=0
+    one second before the first EC data point.
+    """
+
+    def __init__(
+            self,
+            tsv_file,
+            mpt_files_path_prefix,
+            start_time,
+            step_duration,
+            duration_averaged,
+            HER_only_steps,
+            background_steps=None,
+            HER_background_current=None,
+            background_model="constant",
+    ):
+        if duration_averaged > step_duration:
+            raise ValueError("duration averaged cannot be longer than the step duration")
+        if HER_background_current is None and not background_steps:
+            raise ValueError("HER background current or background steps required")
+        if background_model not in BACKGROUND_MODELS:
+            raise ValueError(
+                "unknown background model {}, expected one of {}".format(background_model, BACKGROUND_MODELS)
+            )
+
+        self.mpt_files_path_prefix = mpt_files_path_prefix
+        self.start_time = start_time
+        self.step_duration = step_duration
+        self.duration_averaged = duration_averaged
+        self.HER_only_steps = list(HER_only_steps)
+        self.background_steps = list(background_steps or [])
+
+        self.background_MS_current = HER_background_current
+        self.background_model = background_model if HER_background_current is None else "constant"
+        self._background_steps_used = 0
+        self.fit_coefs = None
+
+        self._ms = TSVFollower(tsv_file, masses=["M2"])
+        self._ec = {}
+        self._t_zero = None
+        self._pending = {"M2": [], "raw_current": []}
+        self._latest = {"M2": -np.inf, "raw_current": -np.inf}
+        self._sums = {"M2": {}, "raw_current": {}}
+        self._counts = {"M2": {}, "raw_current": {}}
+        self._completed = 0
+        self._reported = 0
+
+    def _poll_ec(self):
+        for fpath in sorted(glob.glob(self.mpt_files_path_prefix + "*.mpt")):
+            if fpath not in self._ec:
+                self._ec[fpath] = MPTFollower(
+                    fpath, columns=["time/s"] + MPT_CURRENT_COLUMNS,
+                )
+
+        for follower in self._ec.values():
+            data = follower.poll()
+            if data is None or data.empty:
+                continue
+
+            current_col = next(x for x in MPT_CURRENT_COLUMNS if x in data.columns)
+            t = data["time/s"].to_numpy(dtype=float) + follower.metadata["tstamp"]
+            if self._t_zero is None:
+                self._t_zero = t[0] - 1
+            self._pending["raw_current"].append(
+                (t, data[current_col].to_numpy(dtype=float))
+            )
+
+    def _poll_ms(self):
+        data = self._ms.poll()
+        if data is None or data.empty:
+            return
+
+        time_col, value_col = self._ms.usecols
+        tstamp = float(self._ms.metadata["start_time_unix"])
+        self._pending["M2"].append(
+            (data[time_col].to_numpy(dtype=float) + tstamp, data[value_col].to_numpy(dtype=float))
+        )
+
+    def _accumulate(self, item, t, v):
+        """
+        add samples (in unix time) to the sums and counts of their step windows
+        """
+        t = t - self._t_zero
+        valid = ~(np.isnan(t) | np.isnan(v))
+        t, v = t[valid], v[valid]
+        if t.size == 0:
+            return
+
+        self._latest[item] = max(self._latest[item], t.max())
+
+        # window of step k is (start + k*step - averaged, start + k*step)
+        steps = np.ceil((t - self.start_time) / self.step_duration).astype(int)
+        in_window = np.logical_and(
+            steps >= 1,
+            t >= self.start_time + steps*self.step_duration - self.duration_averaged,
+        )
+        steps, v = steps[in_window], v[in_window]
+        if steps.size == 0:
+            return
+
+        first = steps.min()
+        sums = np.bincount(steps - first, weights=v)
+        counts = np.bincount(steps - first)
+        for i in np.flatnonzero(counts):
+            step = first + i
+            self._sums[item][step] = self._sums[item].get(step, 0.0) + sums[i]
+            self._counts[item][step] = self._counts[item].get(step, 0) + counts[i]
+
+    def _intervals(self, steps):
+        return [
+            (
+                self.start_time + self.step_duration*x - self.duration_averaged,
+                self.start_time + self.step_duration*x,
+            )
+            for x in steps
+        ]
+
+    def _step_means(self, item, steps):
+        return np.array([
+            self._sums[item].get(step, np.nan) / self._counts[item].get(step, 1)
+            for step in steps
+        ])
+
+    def update(self):
+        """
+        parse newly appended data and calculate the faradaic efficiencies of
+        steps completed since the last update. Steps completed before the HER
+        calibration steps are reported once the calibration is available.
+
+        Returns:
+            data (pd.DataFrame): faradaic efficiencies of newly reported steps
+                with a "step" column
+        """
+        self._poll_ec()
+        self._poll_ms()
+
+        if self._t_zero is not None:
+            for item, pending in self._pending.items():
+                for t, v in pending:
+                    self._accumulate(item, t, v)
+                pending.clear()
+
+        latest = min(self._latest.values())
+        if np.isfinite(latest):
+            self._completed = max(
+                self._completed,
+                int(np.floor((latest - self.start_time) / self.step_duration)),
+            )
+
+        if self.background_model == "interpolated":
+            # the model gains a segment as each background step completes,
+            # steps are reported with the model available at the time
+            completed = [x for x in self.background_steps if x <= self._completed]
+            if len(completed) > self._background_steps_used:
+                self._background_steps_used = len(completed)
+                self.background_MS_current = HERBackground(
+                    np.mean(self._intervals(completed), axis=1),
+                    self._step_means("M2", completed),
+                )
+        elif self.background_MS_current is None and self._completed >= max(self.background_steps):
+            self.background_MS_current = self._step_means("M2", self.background_steps).mean()
+
+        if (
+            self.fit_coefs is None and self.background_MS_current is not None
+            and self._completed >= max(self.HER_only_steps)
+        ):
+            self.fit_coefs = linear_fit_HER_MS_to_cell_current(
+                self._step_means("M2", self.HER_only_steps)
+                - background_at(self.background_MS_current, self._intervals(self.HER_only_steps)),
+                self._step_means("raw_current", self.HER_only_steps),
+            )
+
+        if self.fit_coefs is None or self._completed <= self._reported:
+            return pd.DataFrame()
+
+        steps = list(range(self._reported + 1, self._completed + 1))
+        self._reported = self._completed
+
+        intervals = self._intervals(steps)
+        data = CO2RR_faradaic_efficiencies_from_means(
+            intervals,
+            self._step_means("raw_current", steps),
+            self._step_means("M2", steps),
+            self.fit_coefs,
+            background_at(self.background_MS_current, intervals),
+        )
+        data.insert(0, "step", steps)
+
+        return data
@@ -0,0 +1,112 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ixdat import Measurement
+
+from . import profiling
+from .utils.mpt_reader import mpt_file_list, mpt_measurement
+from .utils.tsv_cache import ms_measurement
+
+
+class ConcurrentLoader():
+    """
+    Schedules reading the input files of an experiment on a thread pool and
+    records how long each read took. Parsing is dominated by I/O and C code
+    that releases the GIL, so the MS and EC files are read side by side and
+    the total load time approaches that of the largest file.
+
+    Use as a context manager, submitting each read and joining the returned
+    futures with result() before merging.
+    """
+
+    def __init__(self, max_workers=None, initializer=None):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, initializer=initializer)
+        self.timings = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+    def submit(self, key, read, *args, **kwargs):
+        """
+        schedule read(*args, **kwargs), recording its duration in seconds in
+        timings under key
+
+        Returns:
+            future (concurrent.futures.Future): future of the result of read
+        """
+        def timed_read():
+            start = time.perf_counter()
+            try:
+                with profiling.span("load", file=str(key)):
+                    return read(*args, **kwargs)
+            finally:
+                self.timings[key] = time.perf_counter() - start
+
+        return self._pool.submit(profiling.with_context(timed_read))
+
+    def read_ms(self, tsv_file, tsv_cache=False):
+        """
+        schedule reading a Zilien MS tsv file, through the on-disk cache of
+        utils.tsv_cache if tsv_cache
+        """
+        if tsv_cache:
+            return self.submit(tsv_file, ms_measurement, tsv_file)
+
+        return self.submit(
+            tsv_file, Measurement.read, tsv_file, reader="zilien", technique="MS",
+        )
+
+    def read_ec_set(self, mpt_files_path_prefix):
+        """
+        schedule reading each of the .mpt files starting with the prefix
+
+        Returns:
+            futures (list[concurrent.futures.Future]): futures of the EC
+                measurement of each file, in the order of mpt_file_list
+        """
+        return [
+            self.submit(fpath, mpt_measurement, fpath)
+            for fpath in mpt_file_list(mpt_files_path_prefix)
+        ]
+
+
+def append_measurements(futures):
+    """
+    join the futures of the measurements of a file set and append them
+    """
+    measurement = None
+    for future in futures:
+        measurement = measurement + future.result() if measurement else future.result()
+
+    return measurement
+
+
+def load_ec_ms(tsv_file, mpt_files_path_prefix, max_workers=None, tsv_cache=False):
+    """
+    read the MS tsv file and EC mpt files of an experiment concurrently
+
+    Args:
+        tsv_file (str): Mass spec tsv data file
+        mpt_files_path_prefix (str): EC potentiostat mpt data files path prefix
+        max_workers (int): number of reading threads, default from ThreadPoolExecutor
+        tsv_cache (bool): read the MS file through the on-disk cache of
+            utils.tsv_cache, so it is only parsed the first time
+
+    Returns:
+        ec (ixdat.techniques.ec.ECMeasurement), ms (ixdat.techniques.ms.MSMeasurement),
+        timings (dict): seconds taken to read each file
+    """
+    with ConcurrentLoader(max_workers=max_workers) as loader:
+        ms = loader.read_ms(tsv_file, tsv_cache=tsv_cache)
+        ec = loader.read_ec_set(mpt_files_path_prefix)
+
+        ec = append_measurements(ec)
+        ms = ms.result()
+
+    return ec, ms, loader.timings
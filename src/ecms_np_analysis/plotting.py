@@ -1,4 +1,4 @@
-import ixdat
+import numpy as np
 
 MASS_TO_SPECIES = {
     "M2": "H$_{2}$",
@@ -29,11 +29,75 @@ def plot_ecms_data(ecms, **kwargs):
         labels=labels,
     )
 
+    if kwargs.get("decimate", False):
+        decimate_figure(fig, dpi=kwargs.get("dpi", 300))
+
     if kwargs.get("save_figure", False) or kwargs.get("save_figure_path", False):
         fig.savefig(
             kwargs.get("save_figure_path", "ecms_plot.png"), 
-            dpi=300, 
+            dpi=kwargs.get("dpi", 300),
             bbox_inches='tight',
         )
 
-    return fig, axes
\ No newline at end of file
+    return fig, axes
+
+
+def decimate_minmax(x, y, n_buckets):
+    """
+    reduce a line to the first and last points and the minimum and maximum
+    point in each of n_buckets equal width x buckets, keeping the points in
+    their original order. Peaks are preserved, so drawn at a width of
+    n_buckets pixels the line looks the same as the full data.
+
+    Args:
+        x (np.ndarray): x values, sorted
+        y (np.ndarray): y values
+        n_buckets (int): number of buckets, e.g. the axes width in pixels
+
+    Returns:
+        x, y (np.ndarray, np.ndarray): the decimated line
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    n_buckets = max(int(n_buckets), 1)
+
+    if x.size <= 4 * n_buckets or not np.issubdtype(y.dtype, np.number):
+        return x, y
+
+    keep = np.logical_and(np.isfinite(x), np.isfinite(y))
+    if not keep.all():
+        x, y = x[keep], y[keep]
+    if x.size <= 4 * n_buckets or np.any(x[1:] < x[:-1]) or x[-1] == x[0]:
+        return x, y
+
+    bucket = np.minimum(
+        ((x - x[0]) * (n_buckets / (x[-1] - x[0]))).astype(int),
+        n_buckets - 1,
+    )
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    segment = np.repeat(np.arange(starts.size), np.diff(np.r_[starts, x.size]))
+
+    def first_in_segment(mask):
+        candidates = np.flatnonzero(mask)
+        seg = segment[candidates]
+        return candidates[np.r_[True, seg[1:] != seg[:-1]]]
+
+    i_min = first_in_segment(y == np.minimum.reduceat(y, starts)[segment])
+    i_max = first_in_segment(y == np.maximum.reduceat(y, starts)[segment])
+
+    idx = np.unique(np.concatenate([i_min, i_max, [0, x.size - 1]]))
+
+    return x[idx], y[idx]
+
+
+def decimate_figure(fig, dpi=300):
+    """
+    decimate every line in the figure to the pixel width of its axes when
+    rendered at dpi, bounding drawing and saving time regardless of the
+    number of data points. Call after the figure size has been set.
+    """
+    for ax in fig.axes:
+        n_buckets = ax.get_position().width * fig.get_figwidth() * dpi
+        for line in ax.get_lines():
+            x, y = decimate_minmax(line.get_xdata(), line.get_ydata(), n_buckets)
+            line.set_data(x, y)
@@ -0,0 +1,281 @@
+"""
+Lightweight profiling spans for the analysis pipeline. Spans record wall
+time, peak RSS of the process and optionally a row count, and are written
+as JSON or as a Chrome trace (open in chrome://tracing or ui.perfetto.dev).
+
+Profiling is off by default, in which case span() returns a shared no-op
+object and costs a function call and a flag check.
+
+The switch and the spans are kept per context in a context variable, so
+concurrent runs in one process, e.g. the sessions of the GUI, each enable
+and record their own. Functions run on other threads record into the
+profile of their caller when wrapped with with_context.
+
+    from ecms_np_analysis import profiling
+
+    profiling.enable()
+    with profiling.span("read", file=fpath) as s:
+        data = read(fpath)
+        s.rows = len(data)
+    profiling.write_chrome_trace("trace.json")
+"""
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+class Profile():
+    """
+    the switch and the spans recorded of one context
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.spans = []
+        self.lock = threading.Lock()
+        self.t0 = time.perf_counter()
+
+
+_profile = contextvars.ContextVar("ecms_np_analysis_profile", default=None)
+
+
+def _current():
+    """
+    profile of the current context, created on first use
+    """
+    profile = _profile.get()
+    if profile is None:
+        profile = Profile()
+        _profile.set(profile)
+
+    return profile
+
+
+def enable(enabled=True):
+    """
+    switch recording of spans on (or off) in the current context
+    """
+    _current().enabled = enabled
+
+
+def is_enabled():
+    profile = _profile.get()
+
+    return profile is not None and profile.enabled
+
+
+def reset():
+    """
+    discard the spans recorded in the current context
+    """
+    profile = _current()
+    with profile.lock:
+        profile.spans.clear()
+        profile.t0 = time.perf_counter()
+
+
+def with_context(func):
+    """
+    wrap func to run in a copy of the current context, e.g. on a thread
+    pool, so the spans it records go to the profile of the caller
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # a context can only be entered by one thread at a time
+        return context.copy().run(func, *args, **kwargs)
+
+    return wrapper
+
+
+def peak_rss_MiB():
+    """
+    peak resident set size of the process so far in MiB, None if unavailable
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KiB elsewhere
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+class _NullSpan():
+    """
+    span returned while profiling is disabled
+    """
+
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span():
+    """
+    a timed section of the pipeline, recorded when the context exits. Set
+    rows inside the context to record the number of rows processed.
+    """
+
+    def __init__(self, name, rows=None, **args):
+        self.name = name
+        self.rows = rows
+        self.args = args
+        self.start = None
+        self.duration = None
+        self._profile = _current()
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.duration = time.perf_counter() - self.start
+        record = {
+            "name": self.name,
+            "start (s)": self.start - self._profile.t0,
+            "duration (s)": self.duration,
+            "peak RSS (MiB)": peak_rss_MiB(),
+            "rows": self.rows,
+            "thread": threading.get_ident(),
+            **self.args,
+        }
+        with self._profile.lock:
+            self._profile.spans.append(record)
+
+        return False
+
+
+def span(name, rows=None, **args):
+    """
+    context manager timing a section of the pipeline if profiling is enabled
+
+    Args:
+        name (str): name of the span, e.g. "read tsv"
+        rows (int): number of rows processed, can also be set on the span
+        args: further values to record with the span, e.g. the file name
+    """
+    if not is_enabled():
+        return _NULL_SPAN
+
+    return Span(name, rows=rows, **args)
+
+
+def profiled(name=None):
+    """
+    decorator recording a span for each call of the function
+    """
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not is_enabled():
+                return func(*args, **kwargs)
+            with Span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def spans():
+    """
+    copies of the spans recorded in the current context, in the order they
+    finished
+    """
+    profile = _profile.get()
+    if profile is None:
+        return []
+
+    with profile.lock:
+        return [dict(x) for x in profile.spans]
+
+
+def summary():
+    """
+    recorded spans as a DataFrame sorted by start time
+    """
+    import pandas as pd
+
+    data = pd.DataFrame(spans())
+    if data.empty:
+        return data
+
+    return data.sort_values("start (s)", ignore_index=True)
+
+
+def chrome_trace():
+    """
+    recorded spans in the Chrome trace event format
+    """
+    pid = os.getpid()
+    events = []
+    for record in spans():
+        args = {
+            key: value for key, value in record.items()
+            if key not in ("name", "start (s)", "duration (s)", "thread") and value is not None
+        }
+        events.append({
+            "name": record["name"],
+            "ph": "X",
+            "ts": record["start (s)"] * 1e6,
+            "dur": record["duration (s)"] * 1e6,
+            "pid": pid,
+            "tid": record["thread"],
+            "args": args,
+        })
+
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def write_json(fpath):
+    """
+    write the recorded spans as a JSON list
+    """
+    with open(fpath, "w") as f:
+        json.dump(spans(), f, indent=1, default=str)
+
+
+def write_chrome_trace(fpath):
+    """
+    write the recorded spans as a Chrome trace JSON file
+    """
+    with open(fpath, "w") as f:
+        json.dump(chrome_trace(), f, default=str)
+
+
+PROFILE_FORMATS = ("chrome", "json")
+
+
+def write(fpath, fmt="chrome"):
+    """
+    write the recorded spans as a Chrome trace or a JSON list
+    """
+    if fmt == "chrome":
+        write_chrome_trace(fpath)
+    elif fmt == "json":
+        write_json(fpath)
+    else:
+        raise ValueError(
+            "unknown profile format {}, expected one of {}".format(fmt, PROFILE_FORMATS)
+        )
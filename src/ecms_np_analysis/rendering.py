@@ -0,0 +1,189 @@
+"""
+Background rendering of ECMS figures. A plot spec holds the decimated
+series arrays and the plot options, so it is cheap to send to a worker
+process, where the figure is drawn with the Agg canvas and returned as PNG
+bytes or written to a file. FigureRenderer returns a future for each figure
+so numeric results can be used while the figures are still rendering.
+
+    with FigureRenderer() as renderer:
+        figure = renderer.submit(ecms_plot_spec(ecms, title="exp1"), "ecms_plot.png")
+        data = FE_calculator.calculate_CO2RR_faradaic_efficiencies(...)
+        figure.result()
+"""
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .utils.mass_to_species import MASS_TO_SPECIES_PLOT
+
+# as the ixdat ECMS plot
+MIN_SIGNAL = 1e-14
+U_COLOR = "k"
+J_COLOR = "r"
+
+
+def ecms_plot_spec(
+        ecms,
+        title=None,
+        use_species=True,
+        width=7,
+        height=8,
+        legend_position=(1.05, 0.5),
+        dpi=300,
+        tspan=None,
+        species=MASS_TO_SPECIES_PLOT,
+):
+    """
+    plot spec of the ixdat ECMS plot of a measurement: the MS signal of each
+    mass on a log scale above the calibrated potential and current, with the
+    axis labels, colors and mass order of the ixdat plot. As in ixdat, the EC
+    axes are labelled with the U_name and J_name of the measurement. The
+    series are decimated to the pixel width of the figure at dpi, so the spec
+    size does not grow with the number of data points.
+
+    Args:
+        ecms (ixdat.techniques.ec_ms.ECMSMeasurement): calibrated measurement
+        title (str): figure title
+        use_species (bool): label the masses with their species
+        width, height (float): figure size in inches
+        legend_position (tuple): legend location in axes coordinates
+        dpi (int): resolution the figure is rendered at
+        tspan (list[float]): time span to plot, default that of the EC data
+        species (dict): plot label of the species of each mass
+
+    Returns:
+        spec (dict): picklable plot spec for render_ecms_plot
+    """
+    from ixdat.plotters.ms_plotter import STANDARD_COLORS
+
+    from .plotting import decimate_minmax
+
+    if tspan is None:
+        tspan = [ecms.t[0], ecms.t[-1]]
+
+    n_buckets = width * dpi
+
+    def series(item):
+        t, v = ecms.grab(item, tspan=tspan)
+        return decimate_minmax(t, v, n_buckets)
+
+    ms = []
+    for mass in ecms.mass_list:
+        t, v = series(mass + " [A]")
+        label = species.get(mass, mass) if use_species else mass
+        ms.append((label, STANDARD_COLORS.get(mass, "k"), t, np.maximum(v, MIN_SIGNAL)))
+
+    return {
+        "title": title,
+        "width": width,
+        "height": height,
+        "legend_position": tuple(legend_position),
+        "dpi": dpi,
+        "ms": ms,
+        "potential": (ecms.U_name, *series(ecms.U_name)),
+        "current": (ecms.J_name, *series(ecms.J_name)),
+    }
+
+
+def _color_axis(ax, color, lr):
+    ax.spines[lr].set_color(color)
+    ax.tick_params(axis="y", color=color, labelcolor=color)
+    ax.yaxis.label.set_color(color)
+
+
+def render_ecms_plot(spec, fpath=None):
+    """
+    draw the figure of a plot spec on the Agg canvas and save it as PNG,
+    without pyplot so it is safe in any thread or process
+
+    Returns:
+        fpath (str) if given, otherwise the PNG bytes
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from matplotlib.gridspec import GridSpec
+
+    fig = Figure(figsize=(spec["width"], spec["height"]))
+    FigureCanvasAgg(fig)
+    gs = GridSpec(5, 1, figure=fig)
+    ax_ms = fig.add_subplot(gs[0:3, 0])
+    ax_u = fig.add_subplot(gs[3:5, 0])
+    ax_j = ax_u.twinx()
+
+    ax_ms.xaxis.set_label_position("top")
+    ax_ms.tick_params(axis="x", top=True, bottom=False, labeltop=True, labelbottom=False)
+
+    for label, color, t, v in spec["ms"]:
+        ax_ms.plot(t, v, color=color, label=label)
+    ax_ms.set_yscale("log")
+    ax_ms.set_ylabel("signal / [A]")
+    ax_ms.set_xlabel("time / [s]")
+    ax_ms.legend(loc=spec["legend_position"])
+
+    for ax, (name, t, v), color, lr in (
+            (ax_u, spec["potential"], U_COLOR, "left"),
+            (ax_j, spec["current"], J_COLOR, "right"),
+    ):
+        ax.plot(t, v, "-", color=color, label=name)
+        ax.set_ylabel(name)
+        _color_axis(ax, color, lr)
+    ax_u.set_xlabel("time / [s]")
+    ax_u.set_xlim(ax_ms.get_xlim())
+
+    if spec["title"]:
+        fig.suptitle(spec["title"])
+
+    if fpath is None:
+        with io.BytesIO() as f:
+            fig.savefig(f, format="png", dpi=spec["dpi"], bbox_inches="tight")
+            return f.getvalue()
+
+    fig.savefig(fpath, format="png", dpi=spec["dpi"], bbox_inches="tight")
+
+    return fpath
+
+
+class FigureRenderer():
+    """
+    Renders plot specs in a pool of worker processes, returning a future of
+    each figure. Figures are drawn without pyplot, so the workers do not
+    depend on the matplotlib state of the caller. Use as a context manager,
+    leaving it waits for the figures.
+
+    The workers are started on demand, or all at once by start. In a
+    process that already runs other threads, e.g. a web server, pass
+    mp_context=multiprocessing.get_context("spawn"): a forked worker can
+    inherit a lock held by another thread and deadlock.
+    """
+
+    def __init__(self, max_workers=None, mp_context=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=mp_context)
+
+    def start(self):
+        """
+        start all the workers now instead of as figures are submitted
+        """
+        for _ in range(self.max_workers):
+            self._pool.submit(int)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+    def submit(self, spec, fpath=None):
+        """
+        schedule rendering a plot spec
+
+        Returns:
+            future (concurrent.futures.Future): future of the PNG bytes, or of
+                fpath once written if given
+        """
+        return self._pool.submit(render_ecms_plot, spec, fpath)
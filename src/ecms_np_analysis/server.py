@@ -0,0 +1,353 @@
+"""
+Resident analysis server. Merged and calibrated measurements are kept in
+shared memory in a memory-bounded LRU cache. Faradaic efficiency jobs are
+calculated in a pool of worker processes attached to the cached series, so
+a repeated job on a warm measurement costs only the FE calculation, not
+Python start up, importing ixdat or parsing the tsv and mpt files.
+
+Jobs are posted as JSON to a local HTTP server:
+
+    POST /fe
+    {"tsv_file": "data.tsv", "mpt_files_path_prefix": "03__02_CP",
+     "her_only_steps": [2, 3, 4], "ms_background_steps": [1], "time_averaged_over": 50}
+
+and the faradaic efficiencies and step averages tables are returned as JSON,
+or a table as Arrow (feather) with "format": "arrow". GET /status returns
+the cached measurements and cache statistics.
+
+    with AnalysisServer(port=8765) as server:
+        server.serve_forever()
+"""
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import resource_tracker
+
+from .export import available_table_formats, write_table
+from .session import ANALYSIS_PARAMETERS
+from .shared import SharedECMS, _shared_CO2RR_results
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_BYTES = 2 * 2**30
+
+# job parameters selecting the measurement, besides the analysis parameters
+MEASUREMENT_PARAMETERS = ("tsv_file", "mpt_files_path_prefix", "ca", "pH")
+OUTPUT_FORMATS = ("json", "arrow")
+OUTPUT_TABLES = ("CO2RR_faradaic_efficiencies", "step_averages")
+
+
+def measurement_key(tsv_file, mpt_files_path_prefix, ca=False, pH=None):
+    """
+    cache key of a measurement: its parameters and the path, size and
+    modification time of each file, so rewritten or appended files are read
+    again
+    """
+    from .utils.mpt_reader import mpt_file_list
+
+    files = [tsv_file] + mpt_file_list(mpt_files_path_prefix)
+    stats = []
+    for fpath in files:
+        stat = os.stat(fpath)
+        stats.append((os.path.abspath(fpath), stat.st_size, stat.st_mtime_ns))
+
+    return (tuple(stats), bool(ca), pH)
+
+
+def load_calibrated_ecms(tsv_file, mpt_files_path_prefix, ca=False, pH=None):
+    """
+    read, merge and calibrate a measurement as run_CO2RR_analysis does, vs
+    Ag/AgCl if pH is given and vs RHE otherwise
+    """
+    from .analysis import ELECTRODE_AREA, OHMIC_DROP, RE_VS_RHE, load_ecms
+    from .utils.reference_electrodes import silver_silver_chloride_to_RHE
+
+    ecms = load_ecms(tsv_file, mpt_files_path_prefix, ca=ca)
+    ecms.calibrate(
+        RE_vs_RHE=RE_VS_RHE if pH is None else silver_silver_chloride_to_RHE(pH),
+        A_el=ELECTRODE_AREA,
+        R_Ohm=OHMIC_DROP,
+    )
+
+    return ecms
+
+
+def _import_analysis():
+    # in each worker at start up rather than in its first job
+    from . import analysis
+
+
+class _CachedMeasurement():
+
+    def __init__(self, name):
+        self.name = name
+        self.shared = Future()
+        self.users = 0
+        self.evicted = False
+
+    @property
+    def nbytes(self):
+        if not self.shared.done() or self.shared.exception() is not None:
+            return 0
+        return self.shared.result().nbytes
+
+    def close_if_unused(self):
+        if self.evicted and self.users == 0 and self.nbytes:
+            self.shared.result().close()
+
+
+class MeasurementCache():
+    """
+    LRU cache of merged and calibrated measurements, each held in a
+    SharedECMS block so worker processes can attach to it. The least recently
+    used measurements are freed when the blocks take more than max_bytes, the
+    most recent is always kept. A measurement requested again while it is
+    being read is read once.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return sum(entry.nbytes for entry in self._entries.values())
+
+    def status(self):
+        """
+        cache statistics and the name and size of each cached measurement,
+        most recently used last
+        """
+        with self._lock:
+            return {
+                "max_bytes": self.max_bytes,
+                "nbytes": sum(entry.nbytes for entry in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "measurements": [
+                    {"name": entry.name, "nbytes": entry.nbytes, "loaded": entry.shared.done()}
+                    for entry in self._entries.values()
+                ],
+            }
+
+    @contextmanager
+    def measurement(self, tsv_file, mpt_files_path_prefix, ca=False, pH=None):
+        """
+        the shared series of a measurement, read and calibrated if not cached.
+        The block is not freed before the context exits.
+
+        Yields:
+            handle (shared.SharedECMSHandle)
+        """
+        key = measurement_key(tsv_file, mpt_files_path_prefix, ca=ca, pH=pH)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            load = entry is None
+            if load:
+                self.misses += 1
+                entry = self._entries[key] = _CachedMeasurement(os.path.basename(tsv_file)[:-4])
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            entry.users += 1
+
+        try:
+            if load:
+                try:
+                    ecms = load_calibrated_ecms(tsv_file, mpt_files_path_prefix, ca=ca, pH=pH)
+                    entry.shared.set_result(SharedECMS(ecms))
+                except BaseException as e:
+                    with self._lock:
+                        if self._entries.get(key) is entry:
+                            del self._entries[key]
+                    entry.shared.set_exception(e)
+                    raise
+                with self._lock:
+                    self._evict()
+
+            yield entry.shared.result().handle
+        finally:
+            with self._lock:
+                entry.users -= 1
+                entry.close_if_unused()
+
+    def _evict(self):
+        nbytes = sum(entry.nbytes for entry in self._entries.values())
+        while nbytes > self.max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            nbytes -= entry.nbytes
+            entry.evicted = True
+            entry.close_if_unused()
+
+    def clear(self):
+        """
+        free all cached measurements, those in use once they are released
+        """
+        with self._lock:
+            while self._entries:
+                _, entry = self._entries.popitem(last=False)
+                entry.evicted = True
+                entry.close_if_unused()
+
+
+class AnalysisServer():
+    """
+    HTTP server calculating CO2RR faradaic efficiencies of cached
+    measurements in a pool of worker processes. Requests are handled in
+    threads, so a job waiting for a measurement to be read does not hold up
+    jobs on cached measurements. Binds to localhost by default, the server
+    reads any file path it is sent.
+    """
+
+    def __init__(
+            self,
+            host=DEFAULT_HOST,
+            port=DEFAULT_PORT,
+            max_workers=None,
+            max_cache_bytes=DEFAULT_CACHE_BYTES,
+    ):
+        self.cache = MeasurementCache(max_cache_bytes)
+        # workers share the resource tracker of the server, one of their own
+        # would unlink the cached blocks when the worker exits
+        resource_tracker.ensure_running()
+        self._pool = ProcessPoolExecutor(max_workers=max_workers, initializer=_import_analysis)
+        # start the workers now, before there are request threads to fork
+        self._pool.submit(int).result()
+
+        self._httpd = ThreadingHTTPServer((host, port), _AnalysisRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.analysis_server = self
+
+    @property
+    def address(self):
+        return self._httpd.server_address
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def shutdown(self):
+        """
+        stop serve_forever, from another thread
+        """
+        self._httpd.shutdown()
+
+    def close(self):
+        """
+        close the socket, stop the workers and free the cached measurements
+        """
+        self._httpd.server_close()
+        self._pool.shutdown()
+        self.cache.clear()
+
+    def run_job(self, job):
+        """
+        calculate the faradaic efficiencies and step averages of a job
+
+        Args:
+            job (dict): the measurement parameters in MEASUREMENT_PARAMETERS,
+                tsv_file and mpt_files_path_prefix required, and keyword
+                arguments of analysis.calculate_CO2RR_results in
+                ANALYSIS_PARAMETERS
+
+        Returns:
+            data (pd.DataFrame): the faradaic efficiencies of all steps
+            step_averages (pd.DataFrame): the averages of each series of all steps
+        """
+        unknown = set(job) - set(MEASUREMENT_PARAMETERS) - set(ANALYSIS_PARAMETERS)
+        if unknown:
+            raise ValueError(
+                "unknown parameters {}, expected any of {}".format(
+                    sorted(unknown), MEASUREMENT_PARAMETERS + ANALYSIS_PARAMETERS,
+                )
+            )
+
+        parameters = {x: job[x] for x in ANALYSIS_PARAMETERS if x in job}
+
+        with self.cache.measurement(
+                job["tsv_file"],
+                job["mpt_files_path_prefix"],
+                ca=job.get("ca", False),
+                pH=job.get("pH"),
+        ) as handle:
+            return self._pool.submit(_shared_CO2RR_results, handle, parameters).result()
+
+
+def _json_tables(tables):
+    # full float precision, missing values as null
+    return json.dumps({
+        name: data.astype(object).where(data.notna(), None).to_dict(orient="split", index=False)
+        for name, data in tables.items()
+    }, allow_nan=False)
+
+
+class _AnalysisRequestHandler(BaseHTTPRequestHandler):
+
+    def _send(self, status, body, content_type="application/json"):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, e):
+        self._send(status, json.dumps({"error": "{}: {}".format(type(e).__name__, e)}))
+
+    def do_GET(self):
+        if self.path != "/status":
+            return self._send_error(404, LookupError("unknown path {}".format(self.path)))
+
+        self._send(200, json.dumps(self.server.analysis_server.cache.status()))
+
+    def do_POST(self):
+        if self.path != "/fe":
+            return self._send_error(404, LookupError("unknown path {}".format(self.path)))
+
+        try:
+            job = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            if not isinstance(job, dict):
+                raise ValueError("job must be a JSON object")
+            fmt = job.pop("format", "json")
+            table = job.pop("table", OUTPUT_TABLES[0])
+            if fmt not in OUTPUT_FORMATS:
+                raise ValueError(
+                    "unknown output format {}, expected one of {}".format(fmt, OUTPUT_FORMATS)
+                )
+            if table not in OUTPUT_TABLES:
+                raise ValueError(
+                    "unknown table {}, expected one of {}".format(table, OUTPUT_TABLES)
+                )
+            if fmt == "arrow" and "feather" not in available_table_formats():
+                raise ValueError("arrow output needs pyarrow")
+
+            tables = dict(zip(OUTPUT_TABLES, self.server.analysis_server.run_job(job)))
+        except FileNotFoundError as e:
+            return self._send_error(404, e)
+        except (ValueError, TypeError, KeyError) as e:
+            return self._send_error(400, e)
+        except Exception as e:
+            return self._send_error(500, e)
+
+        if fmt == "arrow":
+            with io.BytesIO() as f:
+                write_table(tables[table], f, "feather")
+                self._send(200, f.getvalue(), "application/vnd.apache.arrow.file")
+        else:
+            self._send(200, _json_tables(tables))
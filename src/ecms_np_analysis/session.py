@@ -0,0 +1,250 @@
+"""
+Analysis sessions: the series of a merged and calibrated ECMS measurement,
+the analysis parameters and the results saved to one uncompressed numpy
+.npz file, with the parameters and layout stored as JSON inside it. A saved
+session loads without reading, merging or calibrating the raw tsv/mpt files
+again, and only the faradaic efficiency stage is recalculated when the
+parameters change.
+
+    save_session("exp1.npz", ecms, parameters, results)
+
+    session = load_session("exp1.npz")
+    data, step_averages = session.analyze(time_averaged_over=50)
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+from .faradaic_efficiency import FaradaicEfficiencyECMS
+
+SESSION_VERSION = 1
+
+# EC series saved in addition to the MS signal of each mass
+SESSION_EC_SERIES = ["raw_potential", "raw_current", "potential", "current", "selector"]
+
+# parameters of calculate_CO2RR_results
+ANALYSIS_PARAMETERS = (
+    "her_only_steps",
+    "ms_background_steps",
+    "step_length",
+    "time_averaged_over",
+    "start_time",
+    "measured_steps",
+    "bootstrap",
+    "background_model",
+)
+
+
+class SessionECMS():
+    """
+    time and value arrays of the series of a saved ECMS measurement, with the
+    grab interface used by FaradaicEfficiencyECMS and StepIndex. Times are in
+    seconds from tstamp.
+    """
+
+    def __init__(self, series, tstamp, name=None):
+        self.series = series
+        self.tstamp = tstamp
+        self.name = name
+
+    @property
+    def series_names(self):
+        return list(self.series)
+
+    @property
+    def mass_list(self):
+        return [name[:-4] for name in self.series if name.startswith("M") and name.endswith(" [A]")]
+
+    def grab(self, item, tspan=None):
+        """
+        time and values of a series, within tspan if given, as views of the
+        saved arrays
+        """
+        try:
+            t, v = self.series[item]
+        except KeyError:
+            raise KeyError(
+                "no series {} in session, series are {}".format(item, self.series_names)
+            )
+
+        if tspan is None:
+            return t, v
+
+        lo = np.searchsorted(t, tspan[0], side="left")
+        hi = np.searchsorted(t, tspan[-1], side="right")
+
+        return t[lo:hi], v[lo:hi]
+
+
+def grab_series_arrays(ecms, series=None):
+    """
+    grab the time and value arrays of the series of a measurement, keeping
+    one copy of time arrays shared by several series, e.g. the MS signals
+
+    Args:
+        ecms: measurement with a grab method
+        series (list[str]): series to grab, default the EC series in
+            SESSION_EC_SERIES and the MS signal of each mass
+
+    Returns:
+        times (list[np.ndarray]): the distinct time arrays
+        values (list[np.ndarray]): the value array of each series
+        layout (list[list]): name and index in times of each series
+    """
+    if series is None:
+        series = SESSION_EC_SERIES + [mass + " [A]" for mass in ecms.mass_list]
+
+    times, values, layout = [], [], []
+    for item in series:
+        t, v = ecms.grab(item)
+        t = np.asarray(t, dtype=float)
+        for i, saved in enumerate(times):
+            if len(saved) == len(t) and np.array_equal(saved, t):
+                break
+        else:
+            i = len(times)
+            times.append(t)
+
+        values.append(np.asarray(v))
+        layout.append([item, i])
+
+    return times, values, layout
+
+
+def save_session(fpath, ecms, parameters=None, results=None, series=None):
+    """
+    save the series of a merged and calibrated ECMS measurement with the
+    analysis parameters and results. Series sharing a time array, e.g. the
+    MS signals, store it once.
+
+    Args:
+        fpath (str or file object): file to write, e.g. "exp1.npz"
+        ecms (ixdat.techniques.ec_ms.ECMSMeasurement): the measurement
+        parameters (dict): JSON serializable analysis parameters, e.g. those
+            of run_CO2RR_analysis
+        results (dict[str, pd.DataFrame]): result tables by name
+        series (list[str]): series to save, default the EC series in
+            SESSION_EC_SERIES and the MS signal of each mass
+    """
+    times, values, layout = grab_series_arrays(ecms, series)
+
+    arrays = {"t{}".format(i): t for i, t in enumerate(times)}
+    arrays.update({"v{}".format(j): v for j, v in enumerate(values)})
+
+    tables = {}
+    for name, data in (results or {}).items():
+        tables[name] = [str(column) for column in data.columns]
+        for j, column in enumerate(data.columns):
+            values = np.asarray(data[column])
+            arrays["r/{}/{}".format(name, j)] = values.astype(str) if values.dtype == object else values
+
+    metadata = {
+        "version": SESSION_VERSION,
+        "name": getattr(ecms, "name", None),
+        "tstamp": ecms.tstamp,
+        "series": layout,
+        "parameters": parameters or {},
+        "results": tables,
+    }
+    arrays["metadata"] = np.array(json.dumps(metadata))
+
+    np.savez(fpath, **arrays)
+
+
+class Session():
+    """
+    a loaded analysis session. The series of the measurement and their
+    cumulative sums are kept by one FaradaicEfficiencyECMS, so changing the
+    parameters only recalculates the faradaic efficiencies.
+    """
+
+    def __init__(self, ecms, parameters=None, results=None):
+        self.ecms = ecms
+        self.parameters = dict(parameters or {})
+        self.results = dict(results or {})
+        self._FE_calculator = None
+
+    @property
+    def FE_calculator(self):
+        if self._FE_calculator is None:
+            self._FE_calculator = FaradaicEfficiencyECMS(
+                self.ecms,
+                start_time=self.parameters.get("start_time", 0),
+                step_duration=self.parameters.get("step_length", 300),
+                duration_averaged=self.parameters.get("time_averaged_over", 100),
+            )
+
+        return self._FE_calculator
+
+    def analyze(self, **parameters):
+        """
+        faradaic efficiencies and step averages with the saved parameters
+        updated by any of ANALYSIS_PARAMETERS given. The saved results are
+        returned if the parameters are unchanged.
+
+        Returns:
+            data (pd.DataFrame): the faradaic efficiencies of all steps
+            step_averages (pd.DataFrame): the averages of each series of all steps
+        """
+        from .analysis import calculate_CO2RR_results
+
+        unknown = set(parameters) - set(ANALYSIS_PARAMETERS)
+        if unknown:
+            raise ValueError(
+                "unknown parameters {}, expected any of {}".format(sorted(unknown), ANALYSIS_PARAMETERS)
+            )
+
+        updated = {**self.parameters, **parameters}
+        cached = all(updated.get(x) == self.parameters.get(x) for x in ANALYSIS_PARAMETERS)
+
+        if cached and {"CO2RR_faradaic_efficiencies", "step_averages"} <= set(self.results):
+            return self.results["CO2RR_faradaic_efficiencies"], self.results["step_averages"]
+
+        data, step_averages = calculate_CO2RR_results(
+            self.ecms,
+            FE_calculator=self.FE_calculator,
+            **{x: updated[x] for x in ANALYSIS_PARAMETERS if x in updated},
+        )
+
+        self.parameters = updated
+        self.results["CO2RR_faradaic_efficiencies"] = data
+        self.results["step_averages"] = step_averages
+
+        return data, step_averages
+
+    def save(self, fpath):
+        """
+        save the session with its current parameters and results
+        """
+        save_session(fpath, self.ecms, self.parameters, self.results, series=self.ecms.series_names)
+
+
+def load_session(fpath):
+    """
+    load a session saved by save_session
+
+    Returns:
+        session (Session)
+    """
+    with np.load(fpath, allow_pickle=False) as f:
+        metadata = json.loads(f["metadata"][()])
+        if metadata["version"] > SESSION_VERSION:
+            raise ValueError(
+                "session version {} is newer than supported {}".format(metadata["version"], SESSION_VERSION)
+            )
+
+        series = {
+            item: (f["t{}".format(i)], f["v{}".format(j)])
+            for j, (item, i) in enumerate(metadata["series"])
+        }
+        results = {
+            name: pd.DataFrame({
+                column: f["r/{}/{}".format(name, j)] for j, column in enumerate(columns)
+            })
+            for name, columns in metadata["results"].items()
+        }
+
+    ecms = SessionECMS(series, metadata["tstamp"], name=metadata["name"])
+
+    return Session(ecms, metadata["parameters"], results)
@@ -0,0 +1,180 @@
+"""
+ECMS series in shared memory for analysis across worker processes. The
+owner publishes the time and value arrays of a merged measurement into one
+multiprocessing.shared_memory block, and sends workers a small picklable
+handle. Workers attach to the block and analyse numpy views of it, so the
+arrays are never pickled or copied.
+
+    with SharedECMS(ecms) as shared:
+        with ProcessPoolExecutor() as executor:
+            results = list(executor.map(work, itertools.repeat(shared.handle), parameter_sets))
+
+    def work(handle, parameters):
+        with handle.attach() as ecms:
+            FE_calculator = FaradaicEfficiencyECMS(ecms, ...)
+"""
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .session import SessionECMS, grab_series_arrays
+
+# offsets of the arrays in the block are aligned to cache lines
+ALIGNMENT = 64
+
+
+def _attach_shared_memory(name):
+    try:
+        # python >= 3.13, the owner unlinks the block
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedECMSHandle():
+    """
+    picklable description of a SharedECMS block: its name and the dtype,
+    length and offset of each array
+    """
+
+    def __init__(self, name, arrays, layout, tstamp, measurement_name=None):
+        self.name = name
+        self.arrays = arrays
+        self.layout = layout
+        self.tstamp = tstamp
+        self.measurement_name = measurement_name
+
+    def attach(self):
+        """
+        attach to the shared block
+
+        Returns:
+            ecms (AttachedECMS): views of the shared arrays with the grab
+                interface of FaradaicEfficiencyECMS. Close it when done,
+                e.g. by using it as a context manager.
+        """
+        shm = _attach_shared_memory(self.name)
+        arrays = [
+            np.ndarray((length,), dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+            for dtype, length, offset in self.arrays
+        ]
+        for array in arrays:
+            array.flags.writeable = False
+
+        series = {
+            item: (arrays[i], arrays[j]) for item, i, j in self.layout
+        }
+
+        return AttachedECMS(series, self.tstamp, shm, name=self.measurement_name)
+
+
+class AttachedECMS(SessionECMS):
+    """
+    series of an ECMS measurement viewing a shared memory block
+    """
+
+    def __init__(self, series, tstamp, shm, name=None):
+        super().__init__(series, tstamp, name=name)
+        self._shm = shm
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        detach from the shared block, the views can no longer be used
+        """
+        self.series = {}
+        if self._shm is not None:
+            self._shm.close()
+            self._shm = None
+
+
+class SharedECMS():
+    """
+    Owner of a shared memory block holding the series of a merged ECMS
+    measurement. Series sharing a time array store it once. The block is
+    freed when the owner is closed, after the workers are done with it.
+    """
+
+    def __init__(self, ecms, series=None):
+        times, values, layout = grab_series_arrays(ecms, series)
+        arrays = times + values
+
+        offsets, size = [], 0
+        for array in arrays:
+            offsets.append(size)
+            size += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+        self._shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        try:
+            for array, offset in zip(arrays, offsets):
+                np.ndarray(array.shape, dtype=array.dtype, buffer=self._shm.buf, offset=offset)[:] = array
+        except Exception:
+            self.close()
+            raise
+
+        self.handle = SharedECMSHandle(
+            self._shm.name,
+            [(array.dtype.str, len(array), offset) for array, offset in zip(arrays, offsets)],
+            [(item, i, len(times) + j) for j, (item, i) in enumerate(layout)],
+            ecms.tstamp,
+            measurement_name=getattr(ecms, "name", None),
+        )
+
+    @property
+    def nbytes(self):
+        return self._shm.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        free the shared block
+        """
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+
+def _shared_CO2RR_results(handle, parameters):
+    from .analysis import calculate_CO2RR_results
+
+    with handle.attach() as ecms:
+        data, step_averages = calculate_CO2RR_results(ecms, **parameters)
+
+    return data, step_averages
+
+
+def parallel_CO2RR_results(ecms, parameter_sets, max_workers=None):
+    """
+    calculate the CO2RR faradaic efficiencies and step averages of a
+    measurement for each of several parameter sets across a process pool,
+    with the series published once in shared memory.
+
+    Args:
+        ecms (ixdat.techniques.ec_ms.ECMSMeasurement): calibrated measurement
+        parameter_sets (list[dict]): keyword arguments of
+            analysis.calculate_CO2RR_results, e.g.
+            [{"her_only_steps": [2, 3, 4], "ms_background_steps": [1], "time_averaged_over": 50}]
+        max_workers (int): number of worker processes, default number of CPUs
+
+    Returns:
+        results (list[tuple]): faradaic efficiencies and step averages tables
+            of each parameter set, in order
+    """
+    with SharedECMS(ecms) as shared:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(
+                _shared_CO2RR_results, itertools.repeat(shared.handle), parameter_sets,
+            ))
@@ -1,14 +1,28 @@
 import streamlit as st
 import os
 from ixdat import Measurement
-from faradaic_efficiency import FaradaicEfficiencyECMS
-
-import zipfile
-import io
+from ecms_np_analysis import profiling
+from ecms_np_analysis.faradaic_efficiency import FaradaicEfficiencyECMS
+
+from ecms_np_analysis.alignment import timezone_offset
+from ecms_np_analysis.analysis import all_step_numbers, combine_ec_ms
+from ecms_np_analysis.export import ResultsArchive, available_table_formats
+from ecms_np_analysis.loading import ConcurrentLoader
+from ecms_np_analysis.rendering import FigureRenderer, ecms_plot_spec
+from ecms_np_analysis.utils.mpt_reader import mpt_measurement
+from ecms_np_analysis.utils.reference_electrodes import silver_silver_chloride_to_RHE
+from ecms_np_analysis.utils.tsv_cache import ms_measurement
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+import hashlib
+import json
+import multiprocessing
+import sys
+import threading
 import tempfile
+import types
 # import datetime
-from datetime import datetime, timezone
-from zoneinfo import ZoneInfo
+from datetime import datetime
 st.write(datetime.now().astimezone().tzname())
 
 ##############################################
@@ -32,116 +46,257 @@ def validate_form():
 
     return valid
 
-@st.cache_data
-def get_ms_data(ms_uploadedfile):
+def upload_digest(uploadedfile):
+    """
+    content hash of an uploaded file, used as its cache key. Hashed once per
+    upload and kept in the session state.
+    """
+    digests = st.session_state.setdefault("upload_digests", {})
+    if uploadedfile.file_id not in digests:
+        digests[uploadedfile.file_id] = hashlib.sha256(uploadedfile.getvalue()).hexdigest()
+
+    return digests[uploadedfile.file_id]
+
+
+def read_uploaded_measurement(uploadedfile, suffix, read=Measurement.read, **kwargs):
     try:
-        MS_data = ms_uploadedfile.read()
-    except:
-        ValueError("Cannot read uploaded MS data")
-    # st.write(ms_datafile.name)
-    tmp = tempfile.NamedTemporaryFile()
-    tmp.write(MS_data)
-    ms = Measurement.read(
-        tmp.name,
+        data = uploadedfile.getvalue()
+    except Exception as e:
+        raise ValueError("Cannot read uploaded data: {}".format(e))
+
+    with tempfile.NamedTemporaryFile(suffix=suffix) as tmp:
+        tmp.write(data)
+        tmp.flush()
+        measurement = read(tmp.name, **kwargs)
+
+    return measurement
+
+
+@st.cache_resource(max_entries=4)
+def get_ms_data(ms_digest, tsv_cache, _ms_uploadedfile):
+    """
+    parse uploaded MS data, cached on the content digest of the upload. With
+    tsv_cache the parsed data is also kept in the on-disk cache, under the
+    digest as the temporary copy of the upload has a new path each time.
+    """
+    if tsv_cache:
+        return read_uploaded_measurement(_ms_uploadedfile, ".tsv", read=ms_measurement, key=ms_digest)
+
+    return read_uploaded_measurement(
+        _ms_uploadedfile,
+        ".tsv",
         reader="zilien",
-        technique="MS"
+        technique="MS",
     )
-    tmp.close()
 
-    return ms
 
-@st.cache_data
 def get_ec_data(ec_uploadedfile):
-    try:
-        EC_data = ec_uploadedfile.read()
-    except:
-        ValueError("Cannot read uploaded EC data")
-    # st.write(ms_datafile.name)
-    tmp = tempfile.NamedTemporaryFile()
-    tmp.write(EC_data)
-    ec = Measurement.read(
-        tmp.name,
-        reader="biologic",
-        technique="EC",
-        # suffix=".mpt"
+    return read_uploaded_measurement(
+        ec_uploadedfile,
+        ".mpt",
+        read=mpt_measurement,
+        name=ec_uploadedfile.name,
     )
-    tmp.close()
-
-    return ec
-
-def plot_ecms_data(ecms, name, **kwargs):
-
-    mass_to_species = {
-        "M2": "H$_{2}$",
-        "M4": "He",
-        "M15": "CH$_{4}$",
-        "M18": "H$_{2}$O",
-        "M26": "C$_{2}$H$_{4}$",
-        "M28": "CO/N$_{2}$",
-        "M32": "O$_{2}$",
-        "M40": "Ar",
-        "M44": "CO$_{2}$",
-    }
-
-    axes = ecms.plot()
-    fig = axes[0].get_figure()
-    fig.set_size_inches(
-        st.session_state.get("plot_width", 7), 
-        st.session_state.get("plot_height", 8),
+
+
+def script_run_loader():
+    """
+    ConcurrentLoader whose threads can use streamlit and its caches
+    """
+    ctx = get_script_run_ctx()
+
+    return ConcurrentLoader(
+        initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx),
     )
-    fig.suptitle(name)
 
-    _, labels = axes[0].get_legend_handles_labels()
-    new_labels = [ mass_to_species[x] for x in labels]
 
-    axes[0].legend(
-        loc=(
+@st.cache_resource(max_entries=8)
+def get_ecms_data(ms_digest, ec_digest, ca, tsv_cache, _ms_uploadedfile, _ec_uploadedfile):
+    """
+    combined ECMS measurement of the uploaded MS and EC data and the time taken
+    to read each file, cached on the content digests of the uploads. The MS
+    and EC data are read concurrently. The EC data is parsed for each
+    combination as the timezone shift below modifies it in place.
+
+    The cached measurement is shared by all sessions, so it is not modified
+    once returned, calibrated_ecms calibrates a copy.
+    """
+    with script_run_loader() as loader:
+        ms = loader.submit(_ms_uploadedfile.name, get_ms_data, ms_digest, tsv_cache, _ms_uploadedfile)
+        ec = loader.submit(_ec_uploadedfile.name, get_ec_data, _ec_uploadedfile)
+
+        ms, ec = ms.result(), ec.result()
+
+    if datetime.now().astimezone().tzname() == "UTC":
+        ec["time/s"]._data -= timezone_offset("Europe/Copenhagen")
+
+    return combine_ec_ms(ec, ms, ca=ca), loader.timings
+
+
+def calibration_parameters():
+    """
+    calibration options from the form as a hashable tuple
+    """
+    try:
+        RE_vs_RHE = silver_silver_chloride_to_RHE(float(st.session_state["Ag_AgCl_pH"]))
+        A_el = float(st.session_state["electrode_area"])
+        R_Ohm = float(st.session_state["ohmic_drop"])
+    except Exception as e:
+        raise ValueError("cannot pass options: {}".format(e))
+
+    return (RE_vs_RHE, A_el, R_Ohm)
+
+
+def calibrated_ecms(ecms, calibration):
+    """
+    calibrated copy of a cached ECMS measurement. The copy shares the series
+    of the cached measurement, only its calibration is its own.
+    """
+    RE_vs_RHE, A_el, R_Ohm = calibration
+
+    with profiling.span("calibrate"):
+        ecms = ecms.copy()
+        ecms.calibrate(RE_vs_RHE=RE_vs_RHE, A_el=A_el, R_Ohm=R_Ohm)
+
+    return ecms
+
+
+@st.cache_resource
+def figure_renderer():
+    """
+    worker processes rendering the figures, shared by all sessions. They are
+    spawned, forking the multi-threaded streamlit server can deadlock them.
+    A spawned process runs the __main__ module of its parent again, which
+    is this script while streamlit runs it, so the workers are all started
+    at once with a plain __main__ module in its place.
+    """
+    renderer = FigureRenderer(max_workers=2, mp_context=multiprocessing.get_context("spawn"))
+
+    script_main = sys.modules["__main__"]
+    sys.modules["__main__"] = types.ModuleType("__main__")
+    try:
+        renderer.start()
+    finally:
+        sys.modules["__main__"] = script_main
+
+    return renderer
+
+
+def plot_options():
+    """
+    plot options of the sidebar as a hashable tuple
+    """
+    return (
+        st.session_state.get("plot_width", 7),
+        st.session_state.get("plot_height", 8),
+        (
             st.session_state.get("legend_x", 1.05),
             st.session_state.get("legend_y", 0.50),
         ),
-        labels=new_labels,
     )
 
-    return fig, axes
 
+def rendered_or_rendering(future):
+    """
+    a figure future is kept in the cache unless its rendering failed
+    """
+    return not future.done() or future.exception() is None
+
+
+@st.cache_resource(max_entries=16, validate=rendered_or_rendering)
+def plot_ecms_data(ecms_key, name, options, _ecms):
+    """
+    schedule rendering the ECMS plot, cached on the ECMS upload digests and
+    calibration, the title and the plot options, so a rerun with the same
+    data and options reuses the figure instead of rendering it again. The
+    masses are labelled with MASS_TO_SPECIES_PLOT.
+
+    Returns:
+        future (concurrent.futures.Future): future of the PNG bytes
+    """
+    width, height, legend_position = options
+
+    with profiling.span("plot spec"):
+        spec = ecms_plot_spec(
+            _ecms,
+            title=name,
+            width=width,
+            height=height,
+            legend_position=legend_position,
+            dpi=300,
+        )
 
-# @st.cache_data
-def calc_faradaic_efficiencies(
-    ecms,
-):
-    
+    return figure_renderer().submit(spec)
+
+
+def faradaic_efficiency_parameters():
+    """
+    faradaic efficiency options from the form as a hashable tuple
+    """
     try:
         start_time = float(st.session_state["start_time"])
         duration_averaged = float(st.session_state["duration_averaged"])
         step_duration = float(st.session_state["step_duration"])
-        HER_only_step_nums = [int(x) for x in st.session_state["HER_only_steps"].split()]
+        HER_only_step_nums = tuple(int(x) for x in st.session_state["HER_only_steps"].split())
+
+        if st.session_state["HER_background_current"] != "":
+            HER_background_current = float(st.session_state["HER_background_current"])
+            HER_background_steps = ()
+        else:
+            HER_background_current = None
+            HER_background_steps = tuple(
+                int(x) for x in st.session_state["HER_background_steps"].split()
+            )
     except Exception as e:
         raise ValueError("cannot pass options: {}".format(e))
 
-    HER_background_current = st.session_state["HER_background_current"]
-    HER_background_steps = st.session_state["HER_background_steps"]
+    return (
+        start_time,
+        duration_averaged,
+        step_duration,
+        HER_only_step_nums,
+        HER_background_current,
+        HER_background_steps,
+    )
+
+
+@st.cache_data(max_entries=32)
+def calc_faradaic_efficiencies(ecms_key, parameters, _ecms):
+    """
+    faradaic efficiencies of all steps, cached on the ECMS upload digests and
+    calibration and the faradaic efficiency options. Each session gets its
+    own copy of the cached table.
+    """
+    (
+        start_time,
+        duration_averaged,
+        step_duration,
+        HER_only_step_nums,
+        HER_background_current,
+        HER_background_steps,
+    ) = parameters
 
     FE_calculator = FaradaicEfficiencyECMS(
-        ecms_data=ecms,
+        ecms_data=_ecms,
         start_time=start_time,
         step_duration=step_duration,
         duration_averaged=duration_averaged
     )
 
-    if HER_background_current != "":
-        HER_background = float(HER_background_current)
+    if HER_background_current is not None:
+        HER_background = HER_background_current
     else:
         HER_background = FE_calculator.calc_HER_background_current(
-            [int(x) for x in HER_background_steps.split()]
+            list(HER_background_steps)
         )
 
     coefs = FE_calculator.linear_fit_HER_MS_to_cell_current_conversion(
-        step_nums=HER_only_step_nums,
+        step_nums=list(HER_only_step_nums),
         background_current=HER_background,
     )
 
     data = FE_calculator.calculate_CO2RR_faradaic_efficiencies(
-        [x+1 for x in range(ecms.selector._data[-1] + 1)], # all intervals
+        all_step_numbers(_ecms),
         coefs,
         HER_background,
     )
@@ -149,6 +304,41 @@ def calc_faradaic_efficiencies(
     return data
 
 
+@st.cache_data(max_entries=32)
+def calc_step_averages(ecms_key, parameters, _ecms):
+    """
+    averages of the potential, current and MS signals over the averaged
+    interval of all steps, cached like calc_faradaic_efficiencies.
+    """
+    start_time, duration_averaged, step_duration = parameters[:3]
+
+    FE_calculator = FaradaicEfficiencyECMS(
+        ecms_data=_ecms,
+        start_time=start_time,
+        step_duration=step_duration,
+        duration_averaged=duration_averaged
+    )
+
+    return FE_calculator.step_averages(all_step_numbers(_ecms))
+
+
+def results_archive(table_formats):
+    """
+    lazily built archive of the processed results of this run
+    """
+    archive = ResultsArchive(table_formats=table_formats)
+    if ecms_cp_fig is not None:
+        archive.add_png(name + "_cp_ecms_plot", ecms_cp_fig.result())
+        archive.add_table(name + "_cp_ecms_fe", ecms_cp_data)
+        archive.add_table(name + "_cp_ecms_step_averages", ecms_cp_averages)
+    if ecms_ca_fig is not None:
+        archive.add_png(name + "_ca_ecms_plot", ecms_ca_fig.result())
+        archive.add_table(name + "_ca_ecms_fe", ecms_ca_data)
+        archive.add_table(name + "_ca_ecms_step_averages", ecms_ca_averages)
+
+    return archive
+
+
 
 ##############################################
 ################## SIDEBAR ###################
@@ -179,6 +369,18 @@ with st.sidebar.expander("Plot Options"):
         "legend vertical", -0.5, 1.5, 0.50, key="legend_y",
     )
 
+with st.sidebar.expander("Profiling"):
+    profile = st.checkbox(
+        "record profiling spans", value=False, key="profile",
+        help="cached steps are not rerun and so not recorded",
+    )
+
+with st.sidebar.expander("Caching"):
+    tsv_cache = st.checkbox(
+        "keep parsed MS data on disk", value=False, key="tsv_cache",
+        help="an MS file uploaded again, also after a restart, is memory-mapped instead of parsed",
+    )
+
 
 
 ##############################################
@@ -233,42 +435,70 @@ ecms_ca_fig = ecms_cp_fig = None
 
 with col1:
     if st.button("process data") and validate_form():
-            name = ms_datafile.name[:-4]
-            st.write(HER_background_current)
-            ms = get_ms_data(ms_datafile)
-            ec_cp = get_ec_data(ec_cp_datafile) if ec_cp_datafile is not None else None
-            ec_ca = get_ec_data(ec_ca_datafile) if ec_ca_datafile is not None else None
-
-            if ec_cp is not None:
-                if datetime.now().astimezone().tzname() == "UTC":
-                    utc_now = datetime.now(timezone.utc)
-                    copenhagen_now = datetime.now(ZoneInfo("Europe/Copenhagen"))
-                    ec_cp["time/s"]._data -= (copenhagen_now.utcoffset() - utc_now.utcoffset()).total_seconds()
-                ecms_cp = ec_cp + ms
-                ecms_cp["raw_potential"]._data = ecms_cp["<Ewe/V>"]._data # quick fix: for some reason raw_potential is not correct
-                ecms_cp.tstamp += ecms_cp.t[0] - 1
-
-                ecms_cp_fig, ecms_cp_axes = plot_ecms_data(ecms_cp, name + " CP")
-                # st.write(ecms_cp_fig)
-
-                ecms_cp_data = calc_faradaic_efficiencies(ecms_cp)
-
-
-            if ec_ca is not None:
-                if datetime.now().astimezone().tzname() == "UTC":
-                    utc_now = datetime.now(timezone.utc)
-                    copenhagen_now = datetime.now(ZoneInfo("Europe/Copenhagen"))
-                    ec_ca["time/s"]._data -= (copenhagen_now.utcoffset() - utc_now.utcoffset()).total_seconds()
-                ecms_ca = ec_ca + ms
-                ecms_ca["raw_potential"]._data = ecms_ca["Ewe/V"]._data
-                ecms_ca.tstamp += ecms_ca.t[0] - 1
-
-                ecms_ca_fig, ecms_ca_axes = plot_ecms_data(ecms_ca, name + " CA")
-                # st.write(ecms_ca_fig)
-
-                ecms_ca_data = calc_faradaic_efficiencies(ecms_ca)
-            
-            st.session_state["data_processed"] = True
+        st.session_state["data_processed"] = True
+
+if st.session_state.get("data_processed", False) and validate_form():
+    name = ms_datafile.name[:-4]
+    st.write(HER_background_current)
+    ms_digest = upload_digest(ms_datafile)
+    fe_parameters = faradaic_efficiency_parameters()
+    calibration = calibration_parameters()
+
+    profiling.enable(profile)
+    profiling.reset()
+
+    # CP and CA data are loaded and merged concurrently
+    with script_run_loader() as loader:
+        if ec_cp_datafile is not None:
+            ec_cp_digest = upload_digest(ec_cp_datafile)
+            ecms_cp_future = loader.submit(
+                "CP ECMS", get_ecms_data, ms_digest, ec_cp_digest, False, tsv_cache, ms_datafile, ec_cp_datafile,
+            )
+        if ec_ca_datafile is not None:
+            ec_ca_digest = upload_digest(ec_ca_datafile)
+            ecms_ca_future = loader.submit(
+                "CA ECMS", get_ecms_data, ms_digest, ec_ca_digest, True, tsv_cache, ms_datafile, ec_ca_datafile,
+            )
+    load_timings = {}
+
+    if ec_cp_datafile is not None:
+        ecms_cp, timings = ecms_cp_future.result()
+        load_timings.update(timings)
+        ecms_cp = calibrated_ecms(ecms_cp, calibration)
+        ecms_cp_key = (ms_digest, ec_cp_digest, False, calibration)
+
+        ecms_cp_fig = plot_ecms_data(ecms_cp_key, name + " CP", plot_options(), ecms_cp)
+
+        ecms_cp_data = calc_faradaic_efficiencies(ecms_cp_key, fe_parameters, ecms_cp)
+        ecms_cp_averages = calc_step_averages(ecms_cp_key, fe_parameters, ecms_cp)
+
+    if ec_ca_datafile is not None:
+        ecms_ca, timings = ecms_ca_future.result()
+        load_timings.update(timings)
+        ecms_ca = calibrated_ecms(ecms_ca, calibration)
+        ecms_ca_key = (ms_digest, ec_ca_digest, True, calibration)
+
+        ecms_ca_fig = plot_ecms_data(ecms_ca_key, name + " CA", plot_options(), ecms_ca)
+
+        ecms_ca_data = calc_faradaic_efficiencies(ecms_ca_key, fe_parameters, ecms_ca)
+        ecms_ca_averages = calc_step_averages(ecms_ca_key, fe_parameters, ecms_ca)
+
+    load_timings.update(loader.timings)
+    with st.expander("load timings"):
+        st.table({
+            "file": list(load_timings),
+            "seconds": [round(x, 3) for x in load_timings.values()],
+        })
+
+    if profile:
+        with st.expander("profiling"):
+            st.dataframe(profiling.summary())
+            st.download_button(
+                label="download Chrome trace",
+                data=json.dumps(profiling.chrome_trace(), default=str),
+                file_name="trace.json",
+                mime="application/json",
+            )
 
 
 ##############################################
@@ -277,25 +507,26 @@ with col1:
 
 
 if st.session_state.get("data_processed", False):
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, mode="w") as zf:
-        if ecms_cp_fig is not None:
-            buf = io.BytesIO()
-            ecms_cp_fig.savefig(buf, dpi=300)
-            zf.writestr(name + "_cp_ecms_plot.png", buf.getvalue())
-            zf.writestr(name + "_cp_ecms_fe.csv", ecms_cp_data.to_csv())
-        if ecms_ca_fig is not None:
-            buf = io.BytesIO()
-            ecms_ca_fig.savefig(buf, dpi=300)
-            zf.writestr(name + "_ca_ecms_plot.png", buf.getvalue())
-            zf.writestr(name + "_ca_ecms_fe.csv", ecms_ca_data.to_csv())
-
     with col2:
-        st.download_button(
-            label="download results",
-            data=zip_buffer,
-            file_name="results.zip",
+        table_formats = st.multiselect(
+            "table formats",
+            available_table_formats(),
+            default=["csv"],
+            key="table_formats",
         )
+        # the archive is only rendered when requested, not on every rerun
+        if st.button("prepare results download"):
+            # the archive is written to disk and handed over as a reader.
+            # streamlit reads it into memory once for its media store, it
+            # has no way to stream a download from a file
+            with tempfile.TemporaryFile() as archive_file:
+                results_archive(table_formats).write(archive_file)
+                with open(archive_file.fileno(), "rb", closefd=False) as reader:
+                    st.download_button(
+                        label="download results",
+                        data=reader,
+                        file_name="results.zip",
+                    )
 
 
 ##############################################
@@ -306,15 +537,16 @@ tab1, tab2 = st.tabs(["ECMS CP Results", "ECMS CA Results"],)
 
 with tab1:
     if ecms_cp_fig is not None:
-        st.write(ecms_cp_fig)
+        # the table is shown while the figure is still rendering
         st.dataframe(ecms_cp_data.style.format("{:.4g}"))
+        st.image(ecms_cp_fig.result())
     else:
         st.write("upload CP data and press process")
 
 with tab2:
     if ecms_ca_fig is not None:
-        st.write(ecms_ca_fig)
         st.dataframe(ecms_ca_data)
+        st.image(ecms_ca_fig.result())
     else:
         st.write("upload CA data and press process")
 
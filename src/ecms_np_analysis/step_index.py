@@ -0,0 +1,161 @@
+import numpy as np
+
+from .utils.intervals import interval_bounds
+
+
+class StepIndex():
+    """
+    Start and end times of each step of an ECMS measurement (steps start from
+    1), built once per measurement, and the sample index boundaries of each
+    step in the time array it was built from so a step can be sliced without
+    searching the time array. Steps may have any length, each step ends at its
+    last sample, so a window ending at the end of a step has no samples of
+    the next step.
+    """
+
+    def __init__(self, starts, ends, lo=None, hi=None):
+        self.starts = np.asarray(starts, dtype=float)
+        self.ends = np.asarray(ends, dtype=float)
+        self.lo = None if lo is None else np.asarray(lo, dtype=int)
+        self.hi = None if hi is None else np.asarray(hi, dtype=int)
+
+        if self.starts.shape != self.ends.shape:
+            raise ValueError("starts and ends must have the same length")
+
+    @classmethod
+    def from_boundaries(cls, t, boundaries):
+        """
+        build the step index of a sorted time array from the sample indices at
+        which each step after the first starts
+        """
+        t = np.asarray(t, dtype=float)
+        boundaries = np.asarray(boundaries, dtype=int)
+
+        lo = np.concatenate(([0], boundaries))
+        hi = np.concatenate((boundaries, [len(t)]))
+        starts = t[lo]
+        ends = t[hi - 1]
+
+        return cls(starts, ends, lo, hi)
+
+    @classmethod
+    def from_selector(cls, ecms):
+        """
+        build the step index from the selector series of an ixdat measurement,
+        which counts the changes of the cycle, step and file number series.
+        """
+        t, selector = ecms.grab("selector")
+        boundaries = np.flatnonzero(np.diff(selector)) + 1
+
+        return cls.from_boundaries(t, boundaries)
+
+    @classmethod
+    def from_changes(cls, t, v, threshold=None, min_duration=0.0):
+        """
+        build the step index by detecting steps in a controlled current or
+        potential series, for data without usable step number columns.
+
+        Args:
+            t (np.ndarray): sorted time values
+            v (np.ndarray): current or potential values corresponding to t
+            threshold (float): smallest change between consecutive samples that
+                starts a new step, default 5% of the range of v
+            min_duration (float): changes less than this time after the start
+                of a step are treated as part of the same step change, e.g.
+                for a potentiostat settling over a few samples
+
+        Returns:
+            step_index (StepIndex)
+        """
+        t = np.asarray(t, dtype=float)
+        v = np.asarray(v, dtype=float)
+
+        if threshold is None:
+            threshold = 0.05 * (np.nanmax(v) - np.nanmin(v))
+
+        changes = np.flatnonzero(np.abs(np.diff(v)) > threshold) + 1
+
+        boundaries = []
+        last = t[0]
+        for i in changes:
+            if t[i] - last >= min_duration:
+                boundaries.append(i)
+                last = t[i]
+
+        return cls.from_boundaries(t, boundaries)
+
+    @classmethod
+    def from_step_duration(cls, start_time, step_duration, n_steps):
+        """
+        build a step index of n_steps steps of equal length from start_time,
+        the step sequence assumed by FaradaicEfficiencyECMS without a step index.
+        Has no sample index boundaries.
+        """
+        starts = start_time + step_duration * np.arange(n_steps)
+
+        return cls(starts, starts + step_duration)
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def step_numbers(self):
+        """
+        step numbers of all steps (steps start from 1)
+        """
+        return list(range(1, len(self) + 1))
+
+    @property
+    def durations(self):
+        return self.ends - self.starts
+
+    def _index(self, steps):
+        steps = np.asarray(steps, dtype=int)
+        if np.any(steps < 1) or np.any(steps > len(self)):
+            raise IndexError(
+                "step numbers must be between 1 and {}".format(len(self))
+            )
+
+        return steps - 1
+
+    def interval(self, step):
+        """
+        (start, end) time of a step
+        """
+        i = self._index(step)
+
+        return self.starts[i], self.ends[i]
+
+    def sample_slice(self, step):
+        """
+        slice of the samples of a step in the time array the index was built from
+        """
+        if self.lo is None:
+            raise ValueError("step index has no sample index boundaries")
+        i = self._index(step)
+
+        return slice(self.lo[i], self.hi[i])
+
+    def sample_bounds(self, t):
+        """
+        sample index boundaries (lo, hi) of each step in another sorted time
+        array, e.g. of an MS series, to be kept for slicing its steps
+        """
+        return interval_bounds(t, np.column_stack((self.starts, self.ends)))
+
+    def averaging_intervals(self, steps, duration_averaged):
+        """
+        (start, end) times of the last duration_averaged seconds of each step,
+        the intervals faradaic efficiencies are calculated from
+        """
+        ends = self.ends[self._index(steps)]
+
+        return [(end - duration_averaged, end) for end in ends]
+
+    def window_bounds(self, t, duration_averaged):
+        """
+        sample index boundaries (lo, hi) of the averaging window of every step
+        in a sorted time array, found once so the window of a step is then
+        t[lo[i]:hi[i]] without searching t again
+        """
+        return interval_bounds(t, self.averaging_intervals(self.step_numbers, duration_averaged))
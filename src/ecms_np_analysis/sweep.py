@@ -0,0 +1,135 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from . import profiling
+from .analysis import all_step_numbers
+from .faradaic_efficiency import CO2RR_faradaic_efficiency_columns, linear_fits
+from .utils.intervals import IntervalAverager
+
+SWEEP_PARAMETER_COLUMNS = [
+    "start time (s)",
+    "step duration (s)",
+    "duration averaged (s)",
+    "HER only steps",
+    "background steps",
+]
+
+
+def format_steps(steps):
+    """
+    step numbers as the space separated string used in the sweep table
+    """
+    return " ".join(str(x) for x in steps)
+
+
+@profiling.profiled("sweep")
+def sweep_faradaic_efficiencies(
+        ecms,
+        start_times,
+        step_durations,
+        durations_averaged,
+        HER_only_step_sets,
+        background_step_sets,
+        step_nums=None,
+):
+    """
+    calculate the CO2RR faradaic efficiencies of every combination of the
+    parameters of FaradaicEfficiencyECMS from a single ECMS measurement.
+
+    The raw_current and M2 series are grabbed once and the means of all steps
+    of all (start time, step duration, duration averaged) combinations are
+    found in one searchsorted pass over their cumulative sums. The background,
+    HER fit and faradaic efficiencies are then calculated for all those
+    combinations at once for each pair of HER only and background step sets.
+    Combinations averaging over longer than the step duration are skipped.
+
+    Args:
+        ecms (ixdat.techniques.ec_ms.ECMSMeasurement): combined ECMS measurement
+        start_times (list[float]): t=0 of the step sequence
+        step_durations (list[float]): lengths of steps
+        durations_averaged (list[float]): time durations to average currents over
+        HER_only_step_sets (list[list[int]]): sets of HER only step numbers
+        background_step_sets (list[list[int]]): sets of steps for the HER MS
+            background current
+        step_nums (list[int]): steps to calculate faradaic efficiencies of,
+            default all steps of the measurement
+
+    Returns:
+        data (pd.DataFrame): long form table with the parameter columns, the
+            HER MS background and fit coefficients, a "step" column and the
+            columns of FaradaicEfficiencyECMS.calculate_CO2RR_faradaic_efficiencies,
+            one row per step per parameter set
+    """
+    if step_nums is None:
+        step_nums = all_step_numbers(ecms)
+
+    HER_only_step_sets = [tuple(x) for x in HER_only_step_sets]
+    background_step_sets = [tuple(x) for x in background_step_sets]
+
+    grid = np.array(
+        [
+            (start, duration, averaged)
+            for start, duration, averaged in itertools.product(
+                start_times, step_durations, durations_averaged,
+            )
+            if averaged <= duration
+        ],
+        dtype=float,
+    ).reshape(-1, 3)
+    if grid.size == 0:
+        raise ValueError("duration averaged cannot be longer than the step duration")
+
+    # every step needed by any parameter set, the means of each are found once
+    steps = np.unique(np.concatenate(
+        [step_nums, *HER_only_step_sets, *background_step_sets]
+    ).astype(int))
+    column = {step: i for i, step in enumerate(steps)}
+
+    ends = grid[:, [0]] + grid[:, [1]] * steps
+    intervals = np.stack([ends - grid[:, [2]], ends], axis=-1)
+
+    with profiling.span("sweep interval means", rows=intervals.shape[0] * intervals.shape[1]):
+        raw_currents = IntervalAverager(*ecms.grab("raw_current")).means(intervals)
+        MS_currents = IntervalAverager(*ecms.grab("M2 [A]")).means(intervals)
+
+    output = [column[x] for x in step_nums]
+    tables = []
+
+    for HER_only_steps, background_steps in itertools.product(
+            HER_only_step_sets, background_step_sets,
+    ):
+        background = MS_currents[:, [column[x] for x in background_steps]].mean(axis=1)
+
+        HER_columns = [column[x] for x in HER_only_steps]
+        m, b = linear_fits(
+            MS_currents[:, HER_columns] - background[:, None],
+            raw_currents[:, HER_columns],
+        )
+
+        FE_columns = CO2RR_faradaic_efficiency_columns(
+            raw_currents[:, output],
+            MS_currents[:, output],
+            (m[:, None], b[:, None]),
+            background[:, None],
+        )
+
+        repeat = lambda x: np.repeat(x, len(output))
+        tables.append(pd.DataFrame({
+            "start time (s)": repeat(grid[:, 0]),
+            "step duration (s)": repeat(grid[:, 1]),
+            "duration averaged (s)": repeat(grid[:, 2]),
+            "HER only steps": format_steps(HER_only_steps),
+            "background steps": format_steps(background_steps),
+            "HER background MS current (A)": repeat(background),
+            "fit slope": repeat(m),
+            "fit intercept": repeat(b),
+            "step": np.tile(step_nums, len(grid)),
+            "start (s)": intervals[:, output, 0].ravel(),
+            "end (s)": intervals[:, output, 1].ravel(),
+            **{name: values.ravel() for name, values in FE_columns.items()},
+        }))
+
+    return pd.concat(tables, ignore_index=True)
+
@@ -1,5 +1,3 @@
-from ixdat.constants import FARADAY_CONSTANT
-
 def convert_HER_current_by_calibration_factor(HER_calibration_factor, raw_current):
     """
     estimates the total MS current from the applied raw current using the HER
@@ -14,4 +12,28 @@ def convert_HER_current_by_calibration_factor(HER_calibration_factor, raw_curren
     hence
     total_MS_current = calibration_factor * (raw_current/zF)
     """
-    return HER_calibration_factor*(raw_current/(2*FARADAY_CONSTANT))
+    return convert_current_by_calibration_factor(HER_calibration_factor, raw_current, n_el=2)
+
+
+def convert_current_by_calibration_factor(calibration_factor, raw_current, n_el):
+    """
+    estimates the MS current of a species from the current producing it using
+    its calibration factor (C/mol), as convert_HER_current_by_calibration_factor
+    for a species with n_el electrons per molecule. With ixdat calibration
+    factors n_el is negative for reduction products, and raw_current in A.
+    Arguments may be arrays and are broadcast.
+    """
+    from ixdat.constants import FARADAY_CONSTANT
+
+    return calibration_factor*(raw_current/(n_el*FARADAY_CONSTANT))
+
+
+def convert_MS_current_by_calibration_factor(calibration_factor, MS_current, n_el):
+    """
+    estimates the current producing a species from its (background subtracted)
+    MS current, the inverse of convert_current_by_calibration_factor.
+    Arguments may be arrays and are broadcast.
+    """
+    from ixdat.constants import FARADAY_CONSTANT
+
+    return MS_current*n_el*FARADAY_CONSTANT/calibration_factor
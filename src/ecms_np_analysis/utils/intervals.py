@@ -0,0 +1,177 @@
+import numpy as np
+
+
+def interval_bounds(t, intervals):
+    """
+    find the sample index boundaries of each interval in a sorted time array
+
+    Args:
+        t (np.ndarray): sorted time values
+        intervals (list[tuple[float, float]]): (start, end) times of each interval
+
+    Returns:
+        lo, hi (np.ndarray, np.ndarray): for each interval, samples lo[i] up to
+            (but not including) hi[i] have start <= t <= end, the same
+            samples selected by ixdat's Measurement.grab with a tspan
+    """
+    intervals = np.asarray(intervals, dtype=float).reshape(-1, 2)
+    lo = np.searchsorted(t, intervals[:, 0], side="left")
+    hi = np.searchsorted(t, intervals[:, 1], side="right")
+
+    return lo, np.maximum(hi, lo)
+
+
+def interval_means(t, v, intervals):
+    """
+    calculate the mean of v within each of the time intervals in a single pass,
+    using searchsorted boundaries and a cumulative sum of the values.
+
+    Args:
+        t (np.ndarray): time values
+        v (np.ndarray): values corresponding to t
+        intervals (list[tuple[float, float]]): (start, end) times of each interval
+
+    Returns:
+        means (np.ndarray): mean of v in each interval, nan for intervals
+            containing no samples
+    """
+    return IntervalAverager(t, v).means(intervals)
+
+
+class IntervalAverager():
+    """
+    Keeps the sorted times and cumulative sum of a series so the mean over
+    any number of time intervals costs two searchsorted lookups per interval,
+    regardless of the number of samples. Samples with nan values are ignored,
+    as by IntervalMeanAccumulator, rather than making every mean nan.
+    """
+
+    def __init__(self, t, v):
+        t = np.asarray(t, dtype=float)
+        v = np.asarray(v, dtype=float)
+
+        valid = ~(np.isnan(t) | np.isnan(v))
+        if not valid.all():
+            t, v = t[valid], v[valid]
+
+        if t.size > 1 and np.any(t[1:] < t[:-1]):
+            order = np.argsort(t, kind="stable")
+            t, v = t[order], v[order]
+
+        # centre values before summing to limit cancellation error in the
+        # differences of the cumulative sum
+        self.offset = v.mean() if v.size else 0.0
+        self.t = t
+        self.v = v
+        self.cumsum = np.concatenate(([0.0], np.cumsum(v - self.offset)))
+
+    def means(self, intervals):
+        """
+        mean of the series in each interval, nan for intervals containing no
+        samples. intervals may be any array of (start, end) pairs with shape
+        (..., 2), the result has the shape of the leading dimensions.
+        """
+        intervals = np.asarray(intervals, dtype=float)
+        shape = intervals.shape[:-1]
+
+        return self.bounded_means(*interval_bounds(self.t, intervals)).reshape(shape)
+
+    def bounded_means(self, lo, hi):
+        """
+        mean of samples lo[i] up to (but not including) hi[i] of the series
+        for each i, nan where there are no samples. For sample boundaries
+        found once, e.g. by StepIndex.window_bounds, so no time search is done.
+        """
+        lo = np.asarray(lo, dtype=int)
+        hi = np.asarray(hi, dtype=int)
+
+        counts = hi - lo
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = (self.cumsum[hi] - self.cumsum[lo]) / counts + self.offset
+        means[counts == 0] = np.nan
+
+        return means
+
+    def bootstrap_means(self, intervals, n_boot, rng=None, max_elements=2**23):
+        """
+        bootstrap replicates of the mean of the series in each interval, each
+        the mean of samples drawn with replacement from the samples in the
+        interval. Replicates are drawn for all intervals at once, in chunks of
+        at most max_elements drawn samples.
+
+        Args:
+            intervals (list[tuple[float, float]]): (start, end) times of each interval
+            n_boot (int): number of bootstrap replicates
+            rng (np.random.Generator): random number generator
+            max_elements (int): largest number of samples drawn per chunk
+
+        Returns:
+            means (np.ndarray): array of shape (n_boot, intervals), nan for
+                intervals containing no samples
+        """
+        rng = rng or np.random.default_rng()
+        lo, hi = interval_bounds(self.t, intervals)
+        counts = hi - lo
+
+        means = np.full((n_boot, len(counts)), np.nan)
+        filled = np.flatnonzero(counts)
+        if filled.size == 0:
+            return means
+
+        lo, counts = lo[filled], counts[filled]
+        first = np.repeat(lo, counts)
+        size = np.repeat(counts, counts)
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+        chunk = max(1, max_elements // len(first))
+        for start in range(0, n_boot, chunk):
+            n = min(chunk, n_boot - start)
+            idx = first + (rng.random((n, len(first))) * size).astype(np.int64)
+            means[start:start + n, filled] = np.add.reduceat(self.v[idx], offsets, axis=1) / counts
+
+        return means
+
+
+class IntervalMeanAccumulator():
+    """
+    Accumulates the mean of a series within fixed time intervals from
+    consecutive chunks of data, so only one chunk needs to be in memory at
+    a time. Samples with nan values are ignored.
+    """
+
+    def __init__(self, intervals):
+        self.intervals = np.asarray(intervals, dtype=float).reshape(-1, 2)
+        self.sums = np.zeros(len(self.intervals))
+        self.counts = np.zeros(len(self.intervals), dtype=np.int64)
+
+    def update(self, t, v):
+        """
+        add the samples of a chunk to the interval sums and counts
+        """
+        t = np.asarray(t, dtype=float)
+        v = np.asarray(v, dtype=float)
+
+        valid = ~(np.isnan(t) | np.isnan(v))
+        t, v = t[valid], v[valid]
+        if t.size == 0:
+            return
+
+        if np.any(t[1:] < t[:-1]):
+            order = np.argsort(t, kind="stable")
+            t, v = t[order], v[order]
+
+        lo, hi = interval_bounds(t, self.intervals)
+        cumsum = np.concatenate(([0.0], np.cumsum(v)))
+        self.sums += cumsum[hi] - cumsum[lo]
+        self.counts += hi - lo
+
+    @property
+    def means(self):
+        """
+        mean of the samples in each interval so far, nan for empty intervals
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = self.sums / self.counts
+        means[self.counts == 0] = np.nan
+
+        return means
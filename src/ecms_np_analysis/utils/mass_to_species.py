@@ -20,4 +20,13 @@ MASS_TO_SPECIES = {
     "M32": "O2",
     "M40": "Ar",
     "M44": "CO2",
-}
\ No newline at end of file
+}
+
+# CO2RR products with the mass they are quantified at and the electrons per
+# molecule, negative for reduction as in ixdat's ecms_calibration_curve
+PRODUCTS = {
+    "H2": ("M2", -2),
+    "CO": ("M28", -2),
+    "CH4": ("M15", -8),
+    "C2H4": ("M26", -12),
+}
@@ -0,0 +1,246 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from ixdat.data_series import ConstantValue, TimeSeries, ValueSeries
+from ixdat.readers.biologic import (
+    BIOLOGIC_ALIASES,
+    BIOLOGIC_TIMESTAMP_FORMS,
+    get_column_unit_name,
+)
+from ixdat.readers.reading_tools import get_file_list, timestamp_string_to_tstamp
+from ixdat.techniques import TECHNIQUE_CLASSES
+
+from .. import profiling
+
+MPT_ENCODING = "ISO-8859-1"
+N_HEADER_LINES_RE = re.compile(r"Nb header lines : (\d+)")
+TIMESTAMP_RE = re.compile(r"Acquisition started on : (.+)")
+LOOP_RE = re.compile(r"Loop ([0-9]+) from point number ([0-9]+) to ([0-9]+)")
+
+# columns needed by the CP/CA workflows: time, potential, current, the step
+# and cycle numbers of the selector and the control value
+MPT_COLUMNS = (
+    "time/s",
+    "Ewe/V", "<Ewe/V>", "<Ewe>/V",
+    "I/mA", "<I>/mA",
+    "control/V", "control/mA",
+    "cycle number", "Ns",
+)
+T_COLUMN = "time/s"
+
+
+def parse_mpt_header(file_obj, sep: str = '\t'):
+    """
+    parse the header lines of a BioLogic EC-Lab .mpt file using file handler object
+
+    Args:
+        file_obj: open text file object positioned at the start of the file
+        sep (str): separator character for file, default '\t'
+
+    Returns:
+        metadata (dict): num_header_lines, technique, timestamp_string and
+            tstamp (unix time of t=0) of the file, and loops, the
+            (loop number, first point, last point) of any loops
+        col_names (list[str]): names of the data columns
+    """
+    metadata = {}
+
+    try:
+        lines = [next(file_obj) for _ in range(2)]
+        match = N_HEADER_LINES_RE.search(lines[1])
+        if match is None:
+            raise ValueError("no 'Nb header lines' line")
+        metadata["num_header_lines"] = int(match.group(1))
+
+        lines += [next(file_obj) for _ in range(metadata["num_header_lines"] - 2)]
+    except Exception as e:
+        raise ValueError("unable to parse header lines of mpt file: {}".format(e))
+
+    metadata["technique"] = lines[3].strip() if len(lines) > 4 else ""
+
+    metadata["loops"] = []
+    for line in lines[2:-1]:
+        match = TIMESTAMP_RE.search(line)
+        if match and "tstamp" not in metadata:
+            metadata["timestamp_string"] = match.group(1).strip()
+            metadata["tstamp"] = timestamp_string_to_tstamp(
+                metadata["timestamp_string"], forms=BIOLOGIC_TIMESTAMP_FORMS,
+            )
+            continue
+
+        match = LOOP_RE.search(line)
+        if match:
+            metadata["loops"].append(tuple(int(x) for x in match.groups()))
+
+    col_names = lines[-1].rstrip("\r\n").rstrip(sep).split(sep)
+
+    return metadata, col_names
+
+
+def read_mpt(fpath, columns=MPT_COLUMNS, sep: str = '\t'):
+    """
+    read a BioLogic EC-Lab .mpt file with the pandas C parser, detecting the
+    decimal separator of the locale the file was written on and parsing only
+    the requested columns.
+
+    Args:
+        fpath (str): path of .mpt file
+        columns (list[str]): names of columns to read if present, None for all
+        sep (str): separator character for file, default '\t'
+
+    Returns:
+        metadata (dict): metadata of the file as from parse_mpt_header
+        data (pd.DataFrame): data of the requested columns
+    """
+    with open(fpath, encoding=MPT_ENCODING) as f:
+        metadata, col_names = parse_mpt_header(f, sep=sep)
+        first_row = f.readline()
+
+    # EC-Lab writes the decimal separator of the acquisition computer's locale
+    decimal = "," if "," in first_row else "."
+
+    usecols = None
+    if columns is not None:
+        usecols = [col for col in col_names if col in columns]
+        if T_COLUMN not in usecols:
+            raise ValueError("no '{}' column in {}".format(T_COLUMN, fpath))
+
+    with profiling.span("read mpt", file=str(fpath)) as span:
+        data = pd.read_csv(
+            fpath,
+            sep=sep,
+            skiprows=metadata["num_header_lines"],
+            header=None,
+            names=col_names,
+            usecols=usecols,
+            index_col=False,
+            decimal=decimal,
+            encoding=MPT_ENCODING,
+            dtype=float,
+            engine="c",
+        )
+        span.rows = len(data)
+
+    return metadata, data
+
+
+def mpt_measurement(fpath, columns=MPT_COLUMNS, sep: str = '\t', name=None):
+    """
+    read a BioLogic EC-Lab .mpt file with read_mpt into an ixdat ECMeasurement
+    with the same series names and aliases as ixdat's biologic reader.
+
+    Args:
+        fpath (str): path of .mpt file
+        columns (list[str]): names of columns to read if present, None for all
+        sep (str): separator character for file, default '\t'
+        name (str): name of the measurement, default the file name
+
+    Returns:
+        measurement (ixdat.techniques.ec.ECMeasurement)
+    """
+    metadata, data = read_mpt(fpath, columns=columns, sep=sep)
+    tstamp = metadata.get("tstamp")
+
+    tseries = TimeSeries(
+        name=T_COLUMN,
+        unit_name="s",
+        data=data[T_COLUMN].to_numpy(),
+        tstamp=tstamp,
+    )
+    series_list = [tseries]
+    for col in data.columns:
+        if col == T_COLUMN:
+            continue
+        series_list.append(ValueSeries(
+            name=col,
+            unit_name=get_column_unit_name(col),
+            data=data[col].to_numpy(),
+            tseries=tseries,
+        ))
+
+    loops = metadata["loops"]
+    if loops and sum(end - start + 1 for _, start, end in loops) == len(data):
+        series_list.append(ValueSeries(
+            name="loop_number",
+            unit_name="",
+            data=np.concatenate([
+                np.full(end - start + 1, n, dtype=float) for n, start, end in loops
+            ]),
+            tseries=tseries,
+        ))
+
+    aliases = {}
+    for series in series_list:
+        for alias, names in BIOLOGIC_ALIASES.items():
+            if series.name in names:
+                aliases.setdefault(alias, []).append(series.name)
+                break
+
+    ECMeasurement = TECHNIQUE_CLASSES["EC"]
+    series_names = [series.name for series in series_list]
+    for essential in set(ECMeasurement.essential_series_names).union({"cycle number", "Ns"}):
+        if essential not in series_names and essential not in aliases:
+            # the biologic reader's placeholder for series missing from the file
+            series_list.append(ConstantValue(
+                name=essential + "=0", unit_name="", data=0, tseries=tseries,
+            ))
+            aliases[essential] = [essential + "=0"]
+
+    return ECMeasurement.from_dict(dict(
+        name=name or os.path.basename(fpath),
+        technique="EC",
+        series_list=series_list,
+        tstamp=tstamp,
+        ec_technique=metadata["technique"],
+        aliases=aliases,
+    ))
+
+
+def mpt_file_list(path_to_file_start):
+    """
+    paths of the .mpt files starting with path_to_file_start, or of all .mpt
+    files if path_to_file_start is a folder, in the order of ixdat's
+    get_file_list. Measurement.read_set appends the files in this order, so
+    the appended measurement gets the tstamp, and so t=0, of the first one.
+    """
+    file_list = [str(f) for f in get_file_list(path_to_file_start, suffix=".mpt")]
+    if not file_list:
+        raise FileNotFoundError(
+            "no .mpt files starting with {}".format(path_to_file_start)
+        )
+
+    return file_list
+
+
+def read_mpt_set(path_to_file_start, columns=MPT_COLUMNS, sep: str = '\t', max_workers=None):
+    """
+    read the .mpt files starting with path_to_file_start concurrently with
+    mpt_measurement and append them in the order of mpt_file_list, like
+    ixdat's Measurement.read_set, so the tstamp is that of read_set.
+
+    Args:
+        path_to_file_start (str): path to the files including the shared start
+            of the file names, e.g. .../03__02_CP, or a folder of .mpt files
+        columns (list[str]): names of columns to read if present, None for all
+        sep (str): separator character for file, default '\t'
+        max_workers (int): number of reading threads, default one per file
+
+    Returns:
+        measurement (ixdat.techniques.ec.ECMeasurement)
+    """
+    file_list = mpt_file_list(path_to_file_start)
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(file_list)) as pool:
+        measurements = list(pool.map(
+            profiling.with_context(lambda fpath: mpt_measurement(fpath, columns=columns, sep=sep)),
+            file_list,
+        ))
+
+    measurement = measurements[0]
+    for meas in measurements[1:]:
+        measurement = measurement + meas
+
+    return measurement
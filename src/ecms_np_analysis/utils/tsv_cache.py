@@ -0,0 +1,351 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from ixdat.data_series import TimeSeries, ValueSeries
+from ixdat.readers.reading_tools import timestamp_string_to_tstamp
+from ixdat.readers.zilien import ZILIEN_TIMESTAMP_FORM, ZilienTSVReader
+from ixdat.techniques import TECHNIQUE_CLASSES
+
+from .tsv_reader import read_tsv
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "ECMS_NP_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "ecms_np_analysis", "tsv"),
+)
+CACHE_FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+HASH_BLOCK_SIZE = 1 << 20
+# the least recently used files are removed when the cache takes more than
+# DEFAULT_MAX_CACHE_BYTES, and files not used for DEFAULT_MAX_CACHE_AGE seconds
+DEFAULT_MAX_CACHE_BYTES = 4 * 2**30
+DEFAULT_MAX_CACHE_AGE = 30 * 24 * 3600
+# unfinished writes older than this are left over from a killed process
+TMP_MAX_AGE = 3600
+# series of a Zilien file that ixdat does not read into an MS measurement
+EC_SERIES = ("pot", "EC-lab")
+
+
+def content_hash(fpath: str, block_size: int = HASH_BLOCK_SIZE):
+    """
+    hash of the first and last blocks of a file. Together with the size and
+    mtime in the cache key this detects rewritten or appended files without
+    reading the whole file on every load.
+
+    Args:
+        fpath (str): path to file
+        block_size (int): number of bytes hashed at each end of the file
+
+    Returns:
+        digest (str): hex digest of the sampled content
+    """
+    h = hashlib.blake2b(digest_size=16)
+    with open(fpath, "rb") as f:
+        h.update(f.read(block_size))
+        size = os.fstat(f.fileno()).st_size
+        if size > block_size:
+            f.seek(max(block_size, size - block_size))
+            h.update(f.read(block_size))
+
+    return h.hexdigest()
+
+
+def cache_key(fpath: str, sep: str = '\t'):
+    """
+    cache key for a tsv file from its path, size, mtime and content hash
+
+    Args:
+        fpath (str): path to tsv file
+        sep (str): separator character for file, default '\t'
+
+    Returns:
+        key (str): hex digest identifying the parsed file
+    """
+    stat = os.stat(fpath)
+    h = hashlib.blake2b(digest_size=16)
+    for part in (
+        CACHE_FORMAT_VERSION,
+        os.path.abspath(fpath),
+        stat.st_size,
+        stat.st_mtime_ns,
+        content_hash(fpath),
+        sep,
+    ):
+        h.update(repr(part).encode())
+
+    return h.hexdigest()
+
+
+def write_cache(cache_path: str, metadata: dict, data: pd.DataFrame):
+    """
+    write metadata and data columns to a cache directory, one .npy file per
+    column so each can be memory-mapped independently. The directory is
+    written to a temporary location first and moved into place.
+
+    Args:
+        cache_path (str): cache directory for the file
+        metadata (dict): parsed metadata header
+        data (pd.DataFrame): parsed data
+    """
+    parent = os.path.dirname(cache_path)
+    os.makedirs(parent, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(dir=parent, prefix=".tmp-")
+
+    try:
+        columns = []
+        for i, col_name in enumerate(data.columns):
+            values = data[col_name].to_numpy()
+            if values.dtype == object:
+                values = values.astype(str)
+            fname = "col_{:05d}.npy".format(i)
+            np.save(os.path.join(tmp_path, fname), values, allow_pickle=False)
+            columns.append({"name": col_name, "file": fname})
+
+        with open(os.path.join(tmp_path, MANIFEST_NAME), "w") as f:
+            json.dump(
+                {
+                    "version": CACHE_FORMAT_VERSION,
+                    "metadata": metadata,
+                    "columns": columns,
+                },
+                f,
+            )
+
+        try:
+            os.rename(tmp_path, cache_path)
+        except OSError:
+            # another process cached the same file first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+
+def read_cache(cache_path: str, mmap_mode: str = "r"):
+    """
+    read metadata and memory-mapped data columns from a cache directory
+
+    Args:
+        cache_path (str): cache directory for the file
+        mmap_mode (str): numpy memory-map mode, default read only
+
+    Returns:
+        metadata (dict), data (pd.DataFrame): the data columns are views of
+            the memory-mapped cache files
+    """
+    with open(os.path.join(cache_path, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+
+    if manifest.get("version") != CACHE_FORMAT_VERSION:
+        raise ValueError("unsupported cache format version: {}".format(manifest.get("version")))
+
+    data = pd.DataFrame(
+        {
+            col["name"]: np.load(
+                os.path.join(cache_path, col["file"]),
+                mmap_mode=mmap_mode,
+                allow_pickle=False,
+            )
+            for col in manifest["columns"]
+        },
+        copy=False,
+    )
+
+    return manifest["metadata"], data
+
+
+def read_tsv_cached(
+        fpath: str,
+        cache_dir: str = None,
+        sep: str = '\t',
+        key: str = None,
+        max_bytes: int = DEFAULT_MAX_CACHE_BYTES,
+        max_age: float = DEFAULT_MAX_CACHE_AGE,
+):
+    """
+    parse a tsv file, using the on-disk columnar cache if the file has been
+    parsed before and is unchanged. Otherwise the file is parsed and cached,
+    and the cache is pruned with prune_cache.
+
+    Args:
+        fpath (str): path to tsv file
+        cache_dir (str): cache directory, default ECMS_NP_CACHE_DIR environment
+            variable or ~/.cache/ecms_np_analysis/tsv
+        sep (str): separator character for file, default '\t'
+        key (str): cache key of the file, default from cache_key, e.g. a
+            content digest for temporary copies of a file
+        max_bytes (int): size in bytes the cache is pruned to
+        max_age (float): seconds after their last use cached files are removed
+
+    Returns:
+        metadata (dict), data (pd.DataFrame)
+    """
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    cache_path = os.path.join(cache_dir, key or cache_key(fpath, sep=sep))
+    manifest_path = os.path.join(cache_path, MANIFEST_NAME)
+
+    if os.path.isfile(manifest_path):
+        try:
+            cached = read_cache(cache_path)
+            # the manifest modification time records the last use
+            os.utime(manifest_path)
+            return cached
+        except (OSError, ValueError):
+            shutil.rmtree(cache_path, ignore_errors=True)
+
+    metadata, data = read_tsv(fpath, sep=sep)
+    write_cache(cache_path, metadata, data)
+    prune_cache(cache_dir, max_bytes=max_bytes, max_age=max_age)
+
+    return read_cache(cache_path)
+
+
+def prune_cache(
+        cache_dir: str = None,
+        max_bytes: int = DEFAULT_MAX_CACHE_BYTES,
+        max_age: float = DEFAULT_MAX_CACHE_AGE,
+):
+    """
+    remove cached files not used for max_age seconds, then the least recently
+    used until the cache takes at most max_bytes. The most recently used file
+    is always kept. Files memory-mapped by a running analysis stay readable
+    until it closes them.
+
+    Args:
+        cache_dir (str): cache directory, default ECMS_NP_CACHE_DIR environment
+            variable or ~/.cache/ecms_np_analysis/tsv
+        max_bytes (int): size in bytes to prune the cache to, None for no limit
+        max_age (float): seconds after their last use cached files are
+            removed, None for no limit
+
+    Returns:
+        removed (int): number of cached files removed
+    """
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    now = time.time()
+
+    try:
+        names = os.listdir(cache_dir)
+    except FileNotFoundError:
+        return 0
+
+    entries = []
+    for name in names:
+        path = os.path.join(cache_dir, name)
+        try:
+            if name.startswith(".tmp-"):
+                if now - os.stat(path).st_mtime > TMP_MAX_AGE:
+                    shutil.rmtree(path, ignore_errors=True)
+                continue
+            last_used = os.stat(os.path.join(path, MANIFEST_NAME)).st_mtime
+            nbytes = sum(entry.stat().st_size for entry in os.scandir(path))
+        except OSError:
+            continue
+        entries.append((last_used, nbytes, path))
+
+    # least recently used first
+    entries.sort()
+    nbytes = sum(entry[1] for entry in entries)
+
+    removed = 0
+    for last_used, size, path in entries[:-1]:
+        too_old = max_age is not None and now - last_used > max_age
+        too_big = max_bytes is not None and nbytes > max_bytes
+        if not (too_old or too_big):
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        nbytes -= size
+        removed += 1
+
+    return removed
+
+
+def ms_measurement(fpath, cache_dir: str = None, sep: str = '\t', name=None, key: str = None):
+    """
+    read a Zilien tsv file through the cache with read_tsv_cached into an
+    ixdat MSMeasurement with the same series names and aliases as ixdat's
+    zilien reader with technique="MS". The series are views of the
+    memory-mapped cache files.
+
+    Args:
+        fpath (str): path to tsv file
+        cache_dir (str): cache directory, default ECMS_NP_CACHE_DIR environment
+            variable or ~/.cache/ecms_np_analysis/tsv
+        sep (str): separator character for file, default '\t'
+        name (str): name of the measurement, default the file name without
+            extension
+        key (str): cache key of the file, see read_tsv_cached
+
+    Returns:
+        measurement (ixdat.techniques.ms.MSMeasurement)
+    """
+    metadata, data = read_tsv_cached(fpath, cache_dir=cache_dir, sep=sep, key=key)
+    file_stem = Path(fpath).stem
+
+    if "start_time_unix" in metadata:
+        tstamp = float(metadata["start_time_unix"])
+    else:
+        tstamp = timestamp_string_to_tstamp(
+            " ".join(file_stem.split(" ")[:2]), form=ZILIEN_TIMESTAMP_FORM,
+        )
+
+    # the series metadata is nested under the series header, and the single
+    # line column names are the series header and column header
+    series_headers = sorted(
+        (x for x, value in metadata.items() if isinstance(value, dict)), key=len, reverse=True,
+    )
+
+    series_list = []
+    aliases = {}
+    tseries = None
+    for col_name in data.columns:
+        series_header = next((x for x in series_headers if col_name.startswith(x + " ")), None)
+        if series_header is None or series_header in EC_SERIES:
+            continue
+
+        column_header = col_name[len(series_header) + 1:]
+        count = int(metadata[series_header][series_header + "_count"])
+        values = data[col_name].to_numpy()[:count]
+        if np.isnan(values).all():
+            continue
+
+        series_name, unit, standard_name = ZilienTSVReader._form_names_and_unit(
+            series_header, column_header,
+        )
+        if column_header in ("Time [s]", "time/s"):
+            tseries = TimeSeries(name=series_name, unit_name=unit, data=values, tstamp=tstamp)
+            series_list.append(tseries)
+        else:
+            if tseries is None:
+                raise ValueError("time column must be first in series {}".format(series_header))
+            series_list.append(
+                ValueSeries(name=series_name, unit_name=unit, data=values, tseries=tseries)
+            )
+        if standard_name:
+            aliases.setdefault(standard_name, []).append(series_name)
+
+    return TECHNIQUE_CLASSES["MS"](
+        name=name or file_stem,
+        series_list=series_list,
+        aliases=aliases,
+        tstamp=tstamp,
+        metadata=metadata,
+        technique="MS",
+    )
+
+
+def clear_cache(cache_dir: str = None):
+    """
+    remove all cached files
+
+    Args:
+        cache_dir (str): cache directory, default ECMS_NP_CACHE_DIR environment
+            variable or ~/.cache/ecms_np_analysis/tsv
+    """
+    shutil.rmtree(cache_dir or DEFAULT_CACHE_DIR, ignore_errors=True)
@@ -1,6 +1,12 @@
 from collections import OrderedDict, defaultdict
 import pandas as pd
 import itertools
+import io
+import os
+import re
+from contextlib import contextmanager
+
+from .. import profiling
 
 
 def parse_metadata_header_from_fpath(fpath: str, sep: str = '\t'):
@@ -143,7 +149,14 @@ def parse_data_header(file_obj, num_metadata_lines: int, num_data_header_lines:
     return col_names
 
 
-def parse_tsv_data(f, data_start_line: int, col_names: list[str], sep: str = '\t'):
+def parse_tsv_data(
+        f,
+        data_start_line: int,
+        col_names: list[str],
+        sep: str = '\t',
+        usecols: list[str] = None,
+        dtype=None,
+):
     """
     Read the tsv data
 
@@ -152,6 +165,9 @@ def parse_tsv_data(f, data_start_line: int, col_names: list[str], sep: str = '\t
         data_start_line (int): the line number where the data starts
         col_names: the names of the columns for the data
         separator character for file, default '\t'
+        usecols (list[str]): names of the columns to read, default all
+        dtype: data type of the read columns, e.g. np.float32, default
+            inferred by pandas
     """
     return pd.read_csv(
         f,
@@ -159,5 +175,166 @@ def parse_tsv_data(f, data_start_line: int, col_names: list[str], sep: str = '\t
         skiprows=data_start_line,
         names=col_names,
         index_col=False,
+        usecols=usecols,
+        dtype=dtype,
     )
 
+
+def read_tsv(f, sep: str = '\t', columns: list[str] = None, masses: list[str] = None, dtype=None):
+    """
+    Read the metadata header, data header and data of a tsv file in a single
+    pass over one file handle. The handle is only read forwards, so
+    non-seekable streams such as upload buffers or stdin can be parsed
+    without first writing them to a temporary file.
+
+    Args:
+        f (str, text or binary file object): path to tsv file or open file
+            object positioned at the start of the file
+        sep (str): separator character for file, default '\t'
+        columns (list[str]): single line names of columns to read
+        masses (list[str]): masses to read, e.g. ["M2", "M44"], resolved to
+            the time and value columns of each mass
+        dtype: data type of the read columns, e.g. np.float32 to halve
+            memory use, default inferred by pandas
+
+    If neither columns nor masses are given all columns are read.
+
+    Returns:
+        metadata (dict): the parsed metadata header
+        data (pd.DataFrame): the data with single line column names
+    """
+    with profiling.span("read tsv", file=str(getattr(f, "name", f))) as span:
+        with _text_handle(f) as file_obj:
+            metadata, col_names = _read_tsv_header(file_obj, sep=sep)
+            data = parse_tsv_data(
+                file_obj, 0, col_names, sep=sep,
+                usecols=select_columns(col_names, columns=columns, masses=masses),
+                dtype=dtype,
+            )
+        span.rows = len(data)
+
+    return metadata, data
+
+
+def iter_tsv_chunks(
+        f,
+        masses: list[str] = None,
+        chunksize: int = 100_000,
+        sep: str = '\t',
+        columns: list[str] = None,
+        dtype=None,
+):
+    """
+    Iterate over the data of a tsv file in chunks of rows, so files larger
+    than memory can be reduced incrementally (e.g. with
+    intervals.IntervalMeanAccumulator).
+
+    Args:
+        f (str, text or binary file object): path to tsv file or open file
+            object positioned at the start of the file
+        masses (list[str]): masses to read, e.g. ["M2", "M44"]. Only the time
+            and value columns of these masses are read. Default all columns.
+        chunksize (int): number of rows in each chunk
+        sep (str): separator character for file, default '\t'
+        columns (list[str]): single line names of further columns to read
+        dtype: data type of the read columns, e.g. np.float32
+
+    Yields:
+        chunk (pd.DataFrame): the next chunksize rows of the selected columns
+    """
+    with _text_handle(f) as file_obj:
+        _, col_names = _read_tsv_header(file_obj, sep=sep)
+        with pd.read_csv(
+            file_obj,
+            sep=sep,
+            names=col_names,
+            usecols=select_columns(col_names, columns=columns, masses=masses),
+            index_col=False,
+            dtype=dtype,
+            chunksize=chunksize,
+        ) as reader:
+            yield from reader
+
+
+def mass_columns(col_names: list[str], masses: list[str]):
+    """
+    resolve masses to the time and value column names of their MS channel
+    series, e.g. "M2" to ["C0M2 Time [s]", "C0M2 M2 [A]"]
+
+    Args:
+        col_names (list[str]): single line column names from parse_data_header
+        masses (list[str]): masses to resolve, e.g. ["M2", "M44"]
+
+    Returns:
+        columns (list[str]): the column names of each mass in order
+    """
+    columns = []
+    for mass in masses:
+        pattern = re.compile(r"^C[0-9]+{} ".format(re.escape(mass)))
+        mass_cols = [col for col in col_names if pattern.match(col)]
+        if not mass_cols:
+            raise ValueError("mass {} not found in data header".format(mass))
+        columns += mass_cols
+
+    return columns
+
+
+def select_columns(col_names: list[str], columns: list[str] = None, masses: list[str] = None):
+    """
+    resolve a column and mass selection against the data header
+
+    Args:
+        col_names (list[str]): single line column names from parse_data_header
+        columns (list[str]): single line names of columns to select
+        masses (list[str]): masses to select, e.g. ["M2", "M44"]
+
+    Returns:
+        usecols (list[str]): selected column names in file order, or None if
+            nothing was selected (read all columns)
+    """
+    if columns is None and masses is None:
+        return None
+
+    selected = set(mass_columns(col_names, masses or []))
+    for col in columns or []:
+        if col not in col_names:
+            raise ValueError("column {} not found in data header".format(col))
+        selected.add(col)
+
+    return [col for col in col_names if col in selected]
+
+
+@contextmanager
+def _text_handle(f):
+    """
+    yield a text file object for a path, text or binary file object. Binary
+    streams are decoded without closing the caller's buffer.
+    """
+    if isinstance(f, (str, os.PathLike)):
+        with open(f) as file_obj:
+            yield file_obj
+    elif isinstance(f, io.TextIOBase):
+        yield f
+    else:
+        text_obj = io.TextIOWrapper(f, encoding="utf-8")
+        try:
+            yield text_obj
+        finally:
+            text_obj.detach()
+
+
+def _read_tsv_header(file_obj, sep: str = '\t'):
+    """
+    parse metadata and data header lines and leave file_obj at the data start
+    """
+    metadata = parse_metadata_header(file_obj, sep=sep)
+    num_data_header_lines = int(metadata["num_data_header_lines"])
+
+    # the handle is already positioned after the metadata header
+    col_names = parse_data_header(file_obj, 0, num_data_header_lines, sep=sep)
+
+    lines_read = int(metadata["num_header_lines"]) + num_data_header_lines
+    for _ in range(int(metadata.get("data_start", lines_read)) - lines_read):
+        next(file_obj)
+
+    return metadata, col_names
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from ixdat import Measurement
+
+from benchmarks.synthetic import DEFAULT_TSTAMP, write_biologic_mpt, write_zilien_tsv
+from ecms_np_analysis.alignment import align_ec_ms, cross_correlation_offset
+from ecms_np_analysis.utils.mpt_reader import mpt_measurement
+
+
+def test_cross_correlation_finds_the_shift():
+    t = np.arange(0, 3000, 0.5)
+    current = -np.floor(t / 300)
+    # the MS signal follows the current 37 s later
+    offset = cross_correlation_offset(t, current, t + 37, np.abs(current) + 0.5, dt=1.0, max_lag=600)
+
+    assert offset == pytest.approx(37, abs=1)
+
+
+def test_xcorr_alignment_corrects_the_ec_clock(tmp_path):
+    write_zilien_tsv(str(tmp_path / "ms.tsv"), n_rows=3000, n_steps=10)
+    # the EC clock is 40 s early
+    write_biologic_mpt(str(tmp_path / "ec.mpt"), n_rows=3000, n_steps=10, tstamp=DEFAULT_TSTAMP - 40)
+    ec = mpt_measurement(str(tmp_path / "ec.mpt"))
+    ms = Measurement.read(str(tmp_path / "ms.tsv"), reader="zilien", technique="MS")
+
+    assert align_ec_ms(ec, ms).offset == 0
+    aligned = align_ec_ms(ec, ms, method="xcorr", dt=1.0)
+
+    assert aligned.offset == pytest.approx(40, abs=1)
+    # the steps of the EC selector now start with those of the M2 signal
+    t, selector = aligned.grab("selector")
+    t_change = t[np.flatnonzero(np.diff(selector))[0] + 1] + aligned.tstamp
+    assert t_change == pytest.approx(DEFAULT_TSTAMP + 300, abs=2)
+
+    with pytest.raises(ValueError, match="unknown alignment method"):
+        align_ec_ms(ec, ms, method="clock")
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import step_profile, write_biologic_mpt, write_zilien_tsv
+from ecms_np_analysis.analysis import run_CO2RR_analysis
+
+HER_ONLY_STEPS = (2, 3, 4)
+
+
+@pytest.mark.parametrize(
+    "alignment, measured_steps", [(None, False), ("metadata", False), ("metadata", True)],
+)
+def test_synthetic_faradaic_efficiencies_are_recovered(tmp_path, alignment, measured_steps):
+    tsv_file = str(tmp_path / "ms.tsv")
+    write_zilien_tsv(tsv_file, n_rows=20_000, n_steps=6, HER_only_steps=HER_ONLY_STEPS)
+    write_biologic_mpt(str(tmp_path / "ec_CP_C01.mpt"), n_rows=20_000, n_steps=6, HER_only_steps=HER_ONLY_STEPS)
+    _, H2_efficiencies = step_profile(6, HER_ONLY_STEPS)
+
+    data = run_CO2RR_analysis(
+        tsv_file,
+        str(tmp_path / "ec_CP"),
+        her_only_steps=list(HER_ONLY_STEPS),
+        ms_background_steps=[1],
+        output_dir=str(tmp_path / "out"),
+        table_formats=[],
+        measured_steps=measured_steps,
+        alignment=alignment,
+        session=str(tmp_path / "session.npz"),
+    )
+
+    # CO2RR is the part of the current not producing H2
+    np.testing.assert_allclose(data["Faradaic Efficiency (%)"][4:], 100 * (1 - H2_efficiencies[4:]), atol=1)
+    np.testing.assert_allclose(data["Faradaic Efficiency (%)"][1:4], 0, atol=1)
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from ecms_np_analysis.background import HERBackground
+from ecms_np_analysis.faradaic_efficiency import FaradaicEfficiencyECMS
+from ecms_np_analysis.session import SessionECMS
+
+
+def test_background_is_interpolated_between_segments():
+    t = np.arange(1000, dtype=float)
+    v = 1e-11 + 1e-14 * t
+
+    background = HERBackground.from_intervals(t, v, [(500, 600), (100, 200)])
+
+    np.testing.assert_allclose(background.times, [150, 550])
+    # held constant before the first and after the last segment
+    np.testing.assert_allclose(
+        background([0, 150, 350, 550, 1000]), 1e-11 + 1e-14 * np.array([150, 150, 350, 550, 550]), rtol=1e-3,
+    )
+
+    # the median of a segment ignores a spike
+    v[150] = 1.0
+    median = HERBackground.from_intervals(t, v, [(100, 200)], method="median")
+    np.testing.assert_allclose(median([0, 1000]), 1e-11 + 1.5e-12, rtol=1e-3)
+
+    with pytest.raises(ValueError, match="unknown background method"):
+        HERBackground.from_intervals(t, v, [(100, 200)], method="mode")
+
+
+def test_interpolated_background_follows_a_drifting_baseline():
+    # open circuit steps 1, 4 and 7 around HER only steps 2 and 3 and CO2RR
+    # steps 5 and 6, with an M2 baseline drifting over the run
+    currents = np.array([0.0, -1.0, -2.0, 0.0, -1.0, -2.0, 0.0])
+    efficiencies = np.array([0.0, 1.0, 1.0, 0.0, 0.5, 0.25, 0.0])
+    t = np.arange(7 * 300, dtype=float)
+    step = (t // 300).astype(int)
+    signal = 1e-11 + 1e-12 * t - 1e-8 * currents[step] * efficiencies[step]
+    ecms = SessionECMS({"raw_current": (t, currents[step]), "M2 [A]": (t, signal)}, tstamp=0)
+    FE_calculator = FaradaicEfficiencyECMS(ecms, start_time=-1, step_duration=300, duration_averaged=100)
+
+    background = FE_calculator.calc_HER_background_model([1, 4, 7])
+    coefs = FE_calculator.linear_fit_HER_MS_to_cell_current_conversion([2, 3], background)
+    data = FE_calculator.calculate_CO2RR_faradaic_efficiencies([5, 6], coefs, background)
+
+    np.testing.assert_allclose(data["Faradaic Efficiency (%)"], [50, 75], atol=0.5)
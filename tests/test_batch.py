@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+from ecms_np_analysis.batch import read_manifest, run_batch
+
+MANIFEST = """name,tsv_file,mpt_files_path_prefix,her_only_steps,ms_background_steps
+{},exp1.tsv,exp1_CP,2 3 4,1
+{},exp2.tsv,exp2_CP,2 3 4,1
+"""
+
+
+@pytest.mark.parametrize("names, error", [
+    (("../escaped", "exp2"), "single path component"),
+    (("exp1", os.path.abspath("absolute")), "single path component"),
+    (("sub/exp1", "exp2"), "single path component"),
+    (("exp1", "exp1"), "duplicate"),
+])
+def test_manifest_names_must_be_distinct_directories(tmp_path, names, error):
+    fpath = tmp_path / "manifest.csv"
+    fpath.write_text(MANIFEST.format(*names))
+
+    with pytest.raises(ValueError, match=error):
+        read_manifest(str(fpath))
+
+
+def test_run_batch_checks_names_before_running(tmp_path):
+    experiments = [{"name": "..", "tsv_file": "exp1.tsv"}]
+
+    with pytest.raises(ValueError, match="single path component"):
+        run_batch(experiments, output_dir=str(tmp_path / "out"))
+    assert not os.path.exists(tmp_path / "out")
@@ -0,0 +1,26 @@
+import pytest
+
+from benchmarks import benchmarks
+
+
+@pytest.mark.parametrize("suite", [benchmarks.Parsing, benchmarks.ECMS])
+def test_benchmarks_run_on_the_smallest_files(tmp_path, monkeypatch, suite):
+    monkeypatch.setattr(benchmarks, "DATA_DIR", str(tmp_path))
+    n_rows = min(suite.params)
+    methods = [x for x in dir(suite) if x.startswith(("time_", "peakmem_"))]
+
+    for method in methods:
+        bench = suite()
+        bench.setup(n_rows)
+        try:
+            getattr(bench, method)(n_rows)
+        finally:
+            bench.teardown(n_rows)
+
+
+def test_sizes_above_max_rows_are_skipped(monkeypatch):
+    monkeypatch.setattr(benchmarks, "MAX_ROWS", 10**4)
+
+    # asv reports a benchmark whose setup raises NotImplementedError as skipped
+    with pytest.raises(NotImplementedError):
+        benchmarks.synthetic_files(10**5)
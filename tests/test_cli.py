@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from ecms_np_analysis.cli import COMMANDS
+
+HEAVY_MODULES = ("numpy", "pandas", "ixdat", "matplotlib")
+
+# print the heavy modules imported by running the command line interface
+# with the arguments, and its exit code
+CHECK_IMPORTS = """
+import contextlib, io, sys
+from ecms_np_analysis.cli import main
+try:
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        main(sys.argv[1:])
+except SystemExit as e:
+    code = e.code
+print(code, sorted(x for x in {} if x in sys.modules))
+""".format(HEAVY_MODULES)
+
+
+def imported_modules(*args):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    out = subprocess.run(
+        [sys.executable, "-c", CHECK_IMPORTS, *args], capture_output=True, text=True, env=env, check=True,
+    ).stdout
+
+    return out.strip()
+
+
+@pytest.mark.parametrize("args", [["--help"], *[[x, "--help"] for x in COMMANDS], ["fe", "data.tsv"]])
+def test_parsing_arguments_imports_no_heavy_modules(args):
+    # help exits 0 and missing arguments exit 2, before anything is read
+    assert imported_modules(*args) == "{} []".format(2 if args == ["fe", "data.tsv"] else 0)
+
+
+def test_package_names_are_imported_on_first_use():
+    import ecms_np_analysis
+
+    assert ecms_np_analysis.FaradaicEfficiencyECMS.__name__ == "FaradaicEfficiencyECMS"
+    assert ecms_np_analysis.step_index.StepIndex is ecms_np_analysis.StepIndex
+    with pytest.raises(AttributeError):
+        ecms_np_analysis.not_a_module
@@ -0,0 +1,21 @@
+import io
+import zipfile
+
+import pandas as pd
+
+from ecms_np_analysis.export import ResultsArchive
+
+
+def test_archive_holds_figures_and_tables():
+    data = pd.DataFrame({"step": [1, 2], "Faradaic Efficiency (%)": [0.0, 42.5]})
+    archive = ResultsArchive(table_formats=["csv"])
+    archive.add_png("exp1_ecms_plot", b"\x89PNG")
+    archive.add_table("exp1_fe", data)
+
+    f = io.BytesIO()
+    archive.write(f)
+
+    with zipfile.ZipFile(f) as zf:
+        assert zf.namelist() == archive.names == ["exp1_ecms_plot.png", "exp1_fe.csv"]
+        assert zf.read("exp1_ecms_plot.png") == b"\x89PNG"
+        pd.testing.assert_frame_equal(pd.read_csv(zf.open("exp1_fe.csv")), data)
@@ -0,0 +1,104 @@
+import numpy as np
+
+from ecms_np_analysis.faradaic_efficiency import FaradaicEfficiencyECMS
+from ecms_np_analysis.session import SessionECMS
+
+
+def synthetic_products(step_currents, step_signals, step_duration=300):
+    """
+    1 Hz data with a constant raw current and MS signal of each mass in each
+    step
+    """
+    t = np.arange(len(step_currents) * step_duration, dtype=float)
+    step = (t // step_duration).astype(int)
+    series = {"raw_current": (t, np.asarray(step_currents, dtype=float)[step])}
+    for mass, signals in step_signals.items():
+        series[mass + " [A]"] = (t, np.asarray(signals, dtype=float)[step])
+
+    return SessionECMS(series, tstamp=0)
+
+
+def test_product_faradaic_efficiencies_run():
+    ecms = synthetic_products([0.0, -1.0, -2.0], {"M2": [1e-11, 2e-11, 3e-11], "M28": [2e-10, 3e-10, 4e-10]})
+    FE_calculator = FaradaicEfficiencyECMS(ecms, start_time=0, step_duration=300, duration_averaged=100)
+
+    data = FE_calculator.calculate_product_faradaic_efficiencies(
+        [2, 3], {"H2": 1.0, "CO": 2.0}, background_steps=[1],
+    )
+
+    assert len(data) == 2
+    assert np.isfinite(data["total Faradaic Efficiency (%)"]).all()
+
+
+def test_product_faradaic_efficiencies_are_recovered():
+    from ecms_np_analysis.utils.calibration_factor import convert_current_by_calibration_factor
+
+    # raw current (mA) and faradaic efficiency of each product in each step,
+    # the first step at open circuit for the background
+    currents = np.array([0.0, -1.0, -2.5, -4.0])
+    efficiencies = {"H2": [0, 0.6, 0.3, 0.5], "CO": [0, 0.3, 0.6, 0.2], "CH4": [0, 0.05, 0.1, 0.2]}
+    calibration_factors = {"H2": 1.5, "CO": 0.8, "CH4": 0.3}
+    masses = {"H2": "M2", "CO": "M28", "CH4": "M15"}
+    n_el = {"H2": -2, "CO": -2, "CH4": -8}
+    baseline = 1e-10
+
+    ecms = synthetic_products(currents, {
+        masses[product]: baseline + convert_current_by_calibration_factor(
+            calibration_factors[product], 1e-3 * currents * np.array(FE), n_el[product],
+        )
+        for product, FE in efficiencies.items()
+    })
+    # windows ending on the last sample of each step
+    FE_calculator = FaradaicEfficiencyECMS(ecms, start_time=-1, step_duration=300, duration_averaged=100)
+
+    data = FE_calculator.calculate_product_faradaic_efficiencies([2, 3, 4], calibration_factors, background_steps=[1])
+
+    np.testing.assert_allclose(data["total cell current (A)"], 1e-3 * currents[1:])
+    for product, FE in efficiencies.items():
+        np.testing.assert_allclose(data[product + " Faradaic Efficiency (%)"], 100 * np.array(FE[1:]), rtol=1e-6)
+        np.testing.assert_allclose(
+            data[product + " cell current (A)"], 1e-3 * currents[1:] * np.array(FE[1:]), rtol=1e-6,
+        )
+    np.testing.assert_allclose(
+        data["total Faradaic Efficiency (%)"], 100 * sum(np.array(FE[1:]) for FE in efficiencies.values()), rtol=1e-6,
+    )
+
+
+def test_batched_and_per_interval_means_agree_with_nan_samples():
+    ecms = synthetic_products([0.0, -1.0, -2.0], {"M2": [1e-11, 2e-11, 3e-11]})
+    ecms.series["M2 [A]"][1][550] = np.nan
+
+    tables = []
+    for batched in (True, False):
+        FE_calculator = FaradaicEfficiencyECMS(
+            ecms, start_time=0, step_duration=300, duration_averaged=100, batched=batched,
+        )
+        tables.append(FE_calculator.calculate_CO2RR_faradaic_efficiencies([2, 3], (1e8, 0.0), 1e-11))
+
+    assert not tables[0].isna().any().any()
+    np.testing.assert_allclose(tables[0], tables[1])
+    # integer step times give integer interval columns
+    assert tables[0]["start (s)"].dtype == tables[0]["end (s)"].dtype == np.int64
+
+
+def test_bootstrap_interval_holds_the_faradaic_efficiency():
+    rng = np.random.default_rng(0)
+    currents = np.array([0.0, -1.0, -2.0, -3.0, -4.0])
+    efficiencies = np.array([0.0, 1.0, 1.0, 0.6, 0.3])
+    ecms = synthetic_products(currents, {"M2": 1e-11 - 1e-8 * currents * efficiencies})
+    FE_calculator = FaradaicEfficiencyECMS(ecms, start_time=-1, step_duration=300, duration_averaged=100)
+
+    # without noise every replicate is the same
+    data = FE_calculator.bootstrap_CO2RR_faradaic_efficiencies([4, 5], [2, 3], background_steps=[1], n_boot=50, seed=0)
+    np.testing.assert_allclose(data["FE mean (%)"], data["Faradaic Efficiency (%)"])
+    np.testing.assert_allclose(data["FE std (%)"], 0, atol=1e-9)
+
+    for _, v in ecms.series.values():
+        v += 0.01 * np.abs(v).max() * rng.standard_normal(v.size)
+    FE_calculator.clear_series_cache()
+    data = FE_calculator.bootstrap_CO2RR_faradaic_efficiencies([4, 5], [2, 3], background_steps=[1], n_boot=500, seed=0)
+
+    assert (data["FE std (%)"] > 0).all()
+    assert (data["FE CI low (%)"] < data["Faradaic Efficiency (%)"]).all()
+    assert (data["Faradaic Efficiency (%)"] < data["FE CI high (%)"]).all()
+    np.testing.assert_allclose(data["Faradaic Efficiency (%)"], 100 * (1 - efficiencies[3:]), atol=1)
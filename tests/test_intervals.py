@@ -0,0 +1,36 @@
+import numpy as np
+
+from ecms_np_analysis.utils.intervals import IntervalAverager, IntervalMeanAccumulator, interval_means
+
+
+def test_nan_sample_only_drops_itself():
+    t = np.arange(100, dtype=float)
+    v = np.ones(100)
+    v[5] = np.nan
+    intervals = [(0, 10), (50, 60), (80, 90)]
+
+    accumulator = IntervalMeanAccumulator(intervals)
+    accumulator.update(t, v)
+
+    np.testing.assert_allclose(interval_means(t, v, intervals), [1, 1, 1])
+    np.testing.assert_allclose(interval_means(t, v, intervals), accumulator.means)
+    assert not np.isnan(IntervalAverager(t, v).bootstrap_means(intervals, 10)).any()
+
+
+def test_bootstrap_means_are_drawn_in_chunks_from_each_interval():
+    rng = np.random.default_rng(0)
+    t = np.arange(1000, dtype=float)
+    v = rng.standard_normal(1000)
+    intervals = [(0, 100), (500, 900), (2000, 2100)]
+    averager = IntervalAverager(t, v)
+
+    means = averager.bootstrap_means(intervals, 2000, np.random.default_rng(1))
+
+    # drawing in chunks uses the same random numbers
+    np.testing.assert_array_equal(
+        averager.bootstrap_means(intervals, 2000, np.random.default_rng(1), max_elements=5000), means,
+    )
+    assert means.shape == (2000, 3)
+    assert np.isnan(means[:, 2]).all()
+    np.testing.assert_allclose(means[:, :2].mean(axis=0), averager.means(intervals[:2]), atol=0.01)
+    np.testing.assert_allclose(means[:, :2].std(axis=0), [np.std(v[:100]) / 10, np.std(v[500:900]) / 20], rtol=0.1)
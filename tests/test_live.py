@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import write_biologic_mpt, write_zilien_tsv
+from ecms_np_analysis.live import MPTFollower, TSVFollower
+from ecms_np_analysis.utils.mpt_reader import read_mpt
+from ecms_np_analysis.utils.tsv_reader import read_tsv
+
+
+@pytest.mark.parametrize("follower, decimal", [(TSVFollower, "."), (MPTFollower, "."), (MPTFollower, ",")])
+def test_follower_parses_a_file_as_it_is_written(tmp_path, follower, decimal):
+    fpath = str(tmp_path / "data")
+    if follower is TSVFollower:
+        write_zilien_tsv(fpath, n_rows=200)
+        _, expected = read_tsv(fpath)
+    else:
+        write_biologic_mpt(fpath, n_rows=200, decimal=decimal)
+        _, expected = read_mpt(fpath, columns=None)
+    with open(fpath, "rb") as f:
+        content = f.read()
+
+    # written in chunks that split the header and the rows
+    follower = follower(str(tmp_path / "growing"))
+    chunks = []
+    for end in range(0, len(content) + 97, 97):
+        with open(tmp_path / "growing", "wb") as f:
+            f.write(content[:end])
+        data = follower.poll()
+        if data is not None:
+            chunks.append(data)
+
+    data = pd.concat(chunks, ignore_index=True)
+    assert list(data.columns) == list(expected.columns)
+    np.testing.assert_allclose(data.to_numpy(dtype=float), expected.to_numpy(dtype=float))
@@ -0,0 +1,35 @@
+import threading
+
+import numpy as np
+from ixdat import Measurement
+
+from benchmarks.synthetic import DEFAULT_TSTAMP, write_biologic_mpt, write_zilien_tsv
+from ecms_np_analysis.loading import ConcurrentLoader, load_ec_ms
+
+
+def test_reads_run_side_by_side():
+    # each read waits for the other, so they only finish if run concurrently
+    both_reading = threading.Barrier(2, timeout=10)
+
+    with ConcurrentLoader(max_workers=2) as loader:
+        futures = [loader.submit(key, both_reading.wait) for key in ("ms", "ec")]
+
+        assert sorted(future.result() for future in futures) == [0, 1]
+    assert sorted(loader.timings) == ["ec", "ms"]
+
+
+def test_load_ec_ms_matches_ixdat(tmp_path):
+    tsv_file = str(tmp_path / "ms.tsv")
+    write_zilien_tsv(tsv_file, n_rows=200)
+    for i in (1, 2):
+        write_biologic_mpt(str(tmp_path / "ec_CP_C0{}.mpt".format(i)), n_rows=100, tstamp=DEFAULT_TSTAMP + 3000 * (i - 1))
+
+    ec, ms, timings = load_ec_ms(tsv_file, str(tmp_path / "ec_CP"))
+
+    ixdat_ms = Measurement.read(tsv_file, reader="zilien", technique="MS")
+    ixdat_ec = Measurement.read_set(str(tmp_path / "ec_CP"), suffix=".mpt", reader="biologic")
+    assert len(timings) == 3
+    assert (ec.tstamp, ms.tstamp) == (ixdat_ec.tstamp, ixdat_ms.tstamp)
+    for meas, reference, item in ((ec, ixdat_ec, "<Ewe/V>"), (ms, ixdat_ms, "M2 [A]")):
+        for read, ixdat_read in zip(meas.grab(item), reference.grab(item)):
+            np.testing.assert_allclose(read, ixdat_read)
@@ -0,0 +1,21 @@
+import numpy as np
+from ixdat import Measurement
+
+from benchmarks.synthetic import DEFAULT_TSTAMP, write_biologic_mpt
+from ecms_np_analysis.utils.mpt_reader import read_mpt_set
+
+
+def test_read_mpt_set_matches_ixdat_read_set(tmp_path):
+    # the second file name starts first, so the tstamp depends on the file order
+    write_biologic_mpt(str(tmp_path / "exp_C01.mpt"), n_rows=50, n_steps=5, tstamp=DEFAULT_TSTAMP + 5000)
+    write_biologic_mpt(str(tmp_path / "exp_C02.mpt"), n_rows=50, n_steps=5, seed=1)
+    (tmp_path / "exp_C03.txt").write_text("not an mpt file\n")
+    reference = Measurement.read_set(str(tmp_path / "exp_"), suffix=".mpt", reader="biologic")
+
+    ec = read_mpt_set(str(tmp_path / "exp_"))
+
+    assert ec.tstamp == reference.tstamp
+    assert ec.name == reference.name
+    for item in ("<Ewe/V>", "I/mA"):
+        for read, ixdat_read in zip(ec.grab(item), reference.grab(item)):
+            np.testing.assert_allclose(read, ixdat_read)
@@ -0,0 +1,28 @@
+import numpy as np
+
+from ecms_np_analysis.plotting import decimate_minmax
+
+
+def test_decimated_line_keeps_the_extremes_of_each_bucket():
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 100, 10_000)
+    y = rng.standard_normal(x.size)
+    y[1234] = 50.0
+    n_buckets = 100
+
+    xd, yd = decimate_minmax(x, y, n_buckets)
+
+    assert xd.size <= 2 * n_buckets + 2
+    assert (xd[0], xd[-1]) == (x[0], x[-1])
+    assert np.all(np.diff(xd) > 0)
+    assert yd.max() == 50.0
+
+    bucket = np.minimum((x * n_buckets / 100).astype(int), n_buckets - 1)
+    bucket_d = np.minimum((xd * n_buckets / 100).astype(int), n_buckets - 1)
+    for b in range(n_buckets):
+        assert yd[bucket_d == b].min() == y[bucket == b].min()
+        assert yd[bucket_d == b].max() == y[bucket == b].max()
+
+    # lines already within the pixel width are not decimated
+    xs, ys = decimate_minmax(x[:300], y[:300], n_buckets)
+    assert xs.size == 300
@@ -0,0 +1,30 @@
+import threading
+
+from ecms_np_analysis import profiling
+from ecms_np_analysis.loading import ConcurrentLoader
+
+
+def test_each_thread_records_its_own_spans():
+    results = {}
+    started = threading.Barrier(3)
+
+    def run(name, enabled):
+        profiling.enable(enabled)
+        started.wait()
+        with profiling.span(name):
+            with ConcurrentLoader(max_workers=1) as loader:
+                loader.submit("file", lambda: None).result()
+        results[name] = [x["name"] for x in profiling.spans()]
+
+    threads = [
+        threading.Thread(target=run, args=(name, enabled))
+        for name, enabled in (("a", True), ("b", True), ("c", False))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # the load span of the loader thread goes to the profile of its caller
+    assert results == {"a": ["load", "a"], "b": ["load", "b"], "c": []}
+    assert not profiling.is_enabled()
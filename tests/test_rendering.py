@@ -0,0 +1,27 @@
+import matplotlib
+import pytest
+
+from benchmarks.synthetic import write_biologic_mpt, write_zilien_tsv
+from ecms_np_analysis.analysis import ELECTRODE_AREA, OHMIC_DROP, RE_VS_RHE, load_ecms
+from ecms_np_analysis.rendering import ecms_plot_spec, render_ecms_plot
+
+matplotlib.use("Agg")
+
+
+@pytest.mark.parametrize("calibrated", [False, True])
+def test_plot_spec_is_labelled_as_the_ixdat_plot(tmp_path, calibrated):
+    write_zilien_tsv(str(tmp_path / "ms.tsv"), n_rows=2000, n_steps=4)
+    write_biologic_mpt(str(tmp_path / "ec_CP_C01.mpt"), n_rows=2000, n_steps=4)
+    ecms = load_ecms(str(tmp_path / "ms.tsv"), str(tmp_path / "ec_CP"))
+    if calibrated:
+        ecms.calibrate(RE_vs_RHE=RE_VS_RHE, A_el=ELECTRODE_AREA, R_Ohm=OHMIC_DROP)
+
+    spec = ecms_plot_spec(ecms, use_species=False, dpi=20)
+    ax_ms, ax_u, _, ax_j = ecms.plot()
+
+    assert [(label, color) for label, color, _, _ in spec["ms"]] == [
+        (line.get_label(), line.get_color()) for line in ax_ms.get_lines()
+    ]
+    assert spec["potential"][0] == ax_u.get_ylabel()
+    assert spec["current"][0] == ax_j.get_ylabel()
+    assert render_ecms_plot(spec).startswith(b"\x89PNG")
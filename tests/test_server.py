@@ -0,0 +1,70 @@
+import io
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import write_biologic_mpt, write_zilien_tsv
+from ecms_np_analysis.analysis import calculate_CO2RR_results
+from ecms_np_analysis.export import available_table_formats
+from ecms_np_analysis.server import AnalysisServer, load_calibrated_ecms
+
+
+@pytest.fixture
+def server():
+    with AnalysisServer(port=0, max_workers=1) as server:
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server
+        server.shutdown()
+
+
+def request(server, path, job=None):
+    url = "http://{}:{}{}".format(*server.address, path)
+    data = None if job is None else json.dumps(job).encode()
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data)) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def test_jobs_are_calculated_from_the_cached_measurement(tmp_path, server):
+    tsv_file = str(tmp_path / "ms.tsv")
+    write_zilien_tsv(tsv_file, n_rows=3000, n_steps=6)
+    write_biologic_mpt(str(tmp_path / "ec_CP_C01.mpt"), n_rows=3000, n_steps=6)
+    job = {
+        "tsv_file": tsv_file,
+        "mpt_files_path_prefix": str(tmp_path / "ec_CP"),
+        "her_only_steps": [2, 3, 4],
+        "ms_background_steps": [1],
+    }
+    ecms = load_calibrated_ecms(tsv_file, str(tmp_path / "ec_CP"))
+
+    for time_averaged_over in (50, 100):
+        status, body = request(server, "/fe", dict(job, time_averaged_over=time_averaged_over))
+        data, step_averages = calculate_CO2RR_results(ecms, [2, 3, 4], [1], time_averaged_over=time_averaged_over)
+
+        assert status == 200
+        tables = json.loads(body)
+        for table, expected in zip(tables.values(), (data, step_averages)):
+            received = pd.DataFrame(table["data"], columns=table["columns"])
+            pd.testing.assert_frame_equal(received, expected.reset_index(drop=True), check_dtype=False)
+
+    status = json.loads(request(server, "/status")[1])
+    assert (status["hits"], status["misses"], len(status["measurements"])) == (1, 1, 1)
+
+    if "feather" in available_table_formats():
+        status, body = request(server, "/fe", dict(job, format="arrow", table="step_averages"))
+        assert status == 200
+        pd.testing.assert_frame_equal(pd.read_feather(io.BytesIO(body)), step_averages.reset_index(drop=True))
+
+    for bad_job, expected_status in (
+            (dict(job, step_duration=200), 400),
+            (dict(job, format="xml"), 400),
+            (dict(job, tsv_file=str(tmp_path / "missing.tsv")), 404),
+    ):
+        assert request(server, "/fe", bad_job)[0] == expected_status
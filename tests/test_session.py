@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import write_biologic_mpt, write_zilien_tsv
+from ecms_np_analysis.analysis import run_CO2RR_analysis
+from ecms_np_analysis.session import load_session
+
+
+def test_session_recalculates_without_the_raw_files(tmp_path):
+    tsv_file = str(tmp_path / "ms.tsv")
+    write_zilien_tsv(tsv_file, n_rows=5000, n_steps=6)
+    write_biologic_mpt(str(tmp_path / "ec_CP_C01.mpt"), n_rows=5000, n_steps=6)
+
+    def analysis(time_averaged_over, session=None):
+        return run_CO2RR_analysis(
+            tsv_file,
+            str(tmp_path / "ec_CP"),
+            her_only_steps=[2, 3, 4],
+            ms_background_steps=[1],
+            output_dir=str(tmp_path / "out"),
+            time_averaged_over=time_averaged_over,
+            table_formats=[],
+            session=session,
+        )
+
+    data = analysis(100, session=str(tmp_path / "session.npz"))
+    data_50 = analysis(50)
+
+    session = load_session(str(tmp_path / "session.npz"))
+    pd.testing.assert_frame_equal(session.analyze()[0], data, check_dtype=False)
+    pd.testing.assert_frame_equal(session.analyze(time_averaged_over=50)[0], data_50, check_dtype=False)
+
+    # the new parameters and results are saved with the session
+    session.save(str(tmp_path / "session_50.npz"))
+    session = load_session(str(tmp_path / "session_50.npz"))
+    assert session.parameters["time_averaged_over"] == 50
+    pd.testing.assert_frame_equal(session.results["CO2RR_faradaic_efficiencies"], data_50, check_dtype=False)
+
+    with pytest.raises(ValueError, match="unknown parameters"):
+        session.analyze(step_duration=200)
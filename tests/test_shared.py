@@ -0,0 +1,36 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import write_biologic_mpt, write_zilien_tsv
+from ecms_np_analysis.analysis import ELECTRODE_AREA, OHMIC_DROP, RE_VS_RHE, calculate_CO2RR_results, load_ecms
+from ecms_np_analysis.shared import SharedECMS, parallel_CO2RR_results
+
+
+def test_workers_analyse_the_shared_series(tmp_path):
+    write_zilien_tsv(str(tmp_path / "ms.tsv"), n_rows=3000, n_steps=6)
+    write_biologic_mpt(str(tmp_path / "ec_CP_C01.mpt"), n_rows=3000, n_steps=6)
+    ecms = load_ecms(str(tmp_path / "ms.tsv"), str(tmp_path / "ec_CP"))
+    ecms.calibrate(RE_vs_RHE=RE_VS_RHE, A_el=ELECTRODE_AREA, R_Ohm=OHMIC_DROP)
+
+    with SharedECMS(ecms) as shared:
+        with pickle.loads(pickle.dumps(shared.handle)).attach() as attached:
+            for item in attached.series_names:
+                t, v = attached.grab(item)
+                assert not t.flags.writeable and not v.flags.writeable
+                for shared_array, array in zip((t, v), ecms.grab(item)):
+                    np.testing.assert_array_equal(shared_array, array)
+            # the EC series share one time array
+            assert np.shares_memory(attached.grab("raw_current")[0], attached.grab("raw_potential")[0])
+            assert not np.shares_memory(attached.grab("raw_current")[0], attached.grab("M2 [A]")[0])
+
+    parameter_sets = [
+        {"her_only_steps": [2, 3, 4], "ms_background_steps": [1], "time_averaged_over": x} for x in (50, 100)
+    ]
+    results = parallel_CO2RR_results(ecms, parameter_sets, max_workers=2)
+
+    for (data, step_averages), parameters in zip(results, parameter_sets):
+        expected_data, expected_step_averages = calculate_CO2RR_results(ecms, **parameters)
+        pd.testing.assert_frame_equal(data, expected_data, check_dtype=False)
+        pd.testing.assert_frame_equal(step_averages, expected_step_averages, check_dtype=False)
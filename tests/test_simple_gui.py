@@ -0,0 +1,80 @@
+from datetime import datetime
+
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.synthetic import DEFAULT_TSTAMP, write_biologic_mpt, write_zilien_tsv
+from ecms_np_analysis.alignment import timezone_offset
+from ecms_np_analysis.utils.reference_electrodes import silver_silver_chloride_to_RHE
+
+
+def gui(data_dir):
+    # the simple_gui script with the CP upload of files in data_dir, recording
+    # the calibrations of the cached and the analysed ECMS measurements and
+    # then modifying the faradaic efficiency table of the run
+    import importlib.util
+    import os
+    import runpy
+
+    import streamlit as st
+
+    class Upload():
+
+        def __init__(self, name):
+            self.name = self.file_id = name
+
+        def getvalue(self):
+            with open(os.path.join(data_dir, self.name), "rb") as f:
+                return f.read()
+
+    uploads = {
+        "ms_datafile": Upload("exp.tsv"),
+        "ec_cp_datafile": Upload("exp_CP_C01.mpt"),
+        "ec_ca_datafile": None,
+    }
+
+    def file_uploader(label, key=None, **kwargs):
+        st.session_state[key] = uploads[key]
+        return uploads[key]
+
+    st.file_uploader = file_uploader
+    st.session_state["data_processed"] = True
+
+    script = runpy.run_path(
+        importlib.util.find_spec("ecms_np_analysis.simple_gui").origin, run_name="__main__",
+    )
+
+    cached, _ = script["get_ecms_data"](
+        script["ms_digest"], script["ec_cp_digest"], False, False,
+        uploads["ms_datafile"], uploads["ec_cp_datafile"],
+    )
+    st.session_state["calibrations"] = (
+        len(cached.calibration_list), len(script["ecms_cp"].calibration_list),
+        script["ecms_cp"].calibration_list[0].RE_vs_RHE,
+    )
+    st.session_state["first_fe"] = script["ecms_cp_data"].iloc[0, 2]
+    script["ecms_cp_data"].iloc[0, 2] = 0.0
+
+
+def test_gui_calibrates_a_copy_of_the_cached_ecms(tmp_path):
+    # on a server in UTC the GUI takes the EC file to be written in Copenhagen
+    tstamp = DEFAULT_TSTAMP
+    if datetime.now().astimezone().tzname() == "UTC":
+        tstamp += timezone_offset("Europe/Copenhagen")
+    write_zilien_tsv(str(tmp_path / "exp.tsv"), n_rows=2000)
+    write_biologic_mpt(str(tmp_path / "exp_CP_C01.mpt"), n_rows=2000, tstamp=tstamp)
+
+    at = AppTest.from_function(gui, args=(str(tmp_path),), default_timeout=120)
+    at.run()
+    assert not at.exception
+    first_fe = at.session_state["first_fe"]
+    assert first_fe != 0.0
+    assert at.session_state["calibrations"] == (0, 1, silver_silver_chloride_to_RHE(6.8))
+
+    # the cached table is not modified by the previous run
+    at.run()
+    assert at.session_state["first_fe"] == first_fe
+
+    # a new calibration is applied to a new copy
+    at.text_input(key="Ag_AgCl_pH").set_value("7.5").run()
+    assert not at.exception
+    assert at.session_state["calibrations"] == (0, 1, silver_silver_chloride_to_RHE(7.5))
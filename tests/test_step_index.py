@@ -0,0 +1,87 @@
+import numpy as np
+
+from ecms_np_analysis.faradaic_efficiency import FaradaicEfficiencyECMS
+from ecms_np_analysis.session import SessionECMS
+from ecms_np_analysis.step_index import StepIndex
+
+
+def synthetic_cp(step_currents, step_duration=300):
+    """
+    1 Hz CP data with a constant current in each step
+    """
+    t = np.arange(len(step_currents) * step_duration, dtype=float)
+    step = (t // step_duration).astype(int)
+    current = np.asarray(step_currents)[step]
+
+    return SessionECMS(
+        {"raw_current": (t, current), "selector": (t, step.astype(float))},
+        tstamp=0,
+    )
+
+
+def test_step_ends_at_its_last_sample():
+    ecms = synthetic_cp([-2.8e-5, -1.0, -2.8e-5])
+    step_index = StepIndex.from_selector(ecms)
+
+    np.testing.assert_array_equal(step_index.starts, [0, 300, 600])
+    np.testing.assert_array_equal(step_index.ends, [299, 599, 899])
+
+
+def test_measured_step_averages_exclude_next_step():
+    ecms = synthetic_cp([-2.8e-5, -1.0, -2.8e-5])
+    step_index = StepIndex.from_selector(ecms)
+
+    for batched in (True, False):
+        FE_calculator = FaradaicEfficiencyECMS(
+            ecms,
+            start_time=0,
+            step_duration=300,
+            duration_averaged=100,
+            batched=batched,
+            step_index=step_index,
+        )
+        intervals = FE_calculator.interval_times_from_step_numbers([1, 2, 3])
+        means = FE_calculator.interval_means("raw_current", intervals)
+
+        np.testing.assert_allclose(means, [-2.8e-5, -1.0, -2.8e-5], rtol=1e-8)
+
+
+def test_steps_are_sliced_by_their_sample_boundaries():
+    t = np.arange(900, dtype=float)
+    # potential steps with a few samples of settling after each change
+    potential = np.repeat([-0.5, -1.0, -0.5], 300)
+    potential[300:303] = [-0.6, -0.8, -0.9]
+    step_index = StepIndex.from_changes(t, potential, min_duration=10)
+
+    assert len(step_index) == 3
+    assert step_index.sample_slice(2) == slice(300, 600)
+    np.testing.assert_array_equal(step_index.sample_bounds(t[::2]), ([0, 150, 300], [150, 300, 450]))
+
+    fixed = StepIndex.from_step_duration(-1, 300, 3)
+    np.testing.assert_array_equal(fixed.ends, [299, 599, 899])
+    with np.testing.assert_raises(ValueError):
+        fixed.sample_slice(1)
+
+
+def test_step_means_use_window_bounds_found_once():
+    ecms = synthetic_cp([-2.8e-5, -1.0, -2.8e-5])
+    FE_calculator = FaradaicEfficiencyECMS(
+        ecms,
+        start_time=0,
+        step_duration=300,
+        duration_averaged=100,
+        step_index=StepIndex.from_selector(ecms),
+    )
+    intervals = FE_calculator.interval_times_from_step_numbers([3, 1])
+
+    np.testing.assert_allclose(
+        FE_calculator.step_means("raw_current", [3, 1]),
+        FE_calculator.interval_means("raw_current", intervals),
+    )
+    bounds = FE_calculator.window_bounds("raw_current")
+    np.testing.assert_array_equal(bounds, ([199, 499, 799], [300, 600, 900]))
+
+    # kept until the averaged duration changes
+    assert FE_calculator.window_bounds("raw_current") is bounds
+    FE_calculator.duration_averaged = 50
+    np.testing.assert_array_equal(FE_calculator.window_bounds("raw_current")[0], [249, 549, 849])
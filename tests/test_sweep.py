@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from ecms_np_analysis.faradaic_efficiency import FaradaicEfficiencyECMS
+from ecms_np_analysis.session import SessionECMS
+from ecms_np_analysis.sweep import sweep_faradaic_efficiencies
+
+STEPS = [1, 2, 3, 4]
+
+
+def test_sweep_matches_each_parameter_set():
+    rng = np.random.default_rng(0)
+    t = np.arange(1200, dtype=float)
+    step = (t // 300).astype(int)
+    current = np.array([0.0, -1.0, -2.0, -3.0])[step] + 0.01 * rng.standard_normal(t.size)
+    signal = 1e-11 - 1e-8 * np.array([0.0, 1.0, 1.0, 0.5])[step] * current + 1e-13 * rng.standard_normal(t.size)
+    ecms = SessionECMS({"raw_current": (t, current), "M2 [A]": (t + 0.5, signal)}, tstamp=0)
+
+    data = sweep_faradaic_efficiencies(
+        ecms, [0, 5], [300], [50, 100, 400], [(2, 3)], [(1,)], step_nums=STEPS,
+    )
+
+    # averaging over longer than a step is skipped
+    assert len(data) == 4 * len(STEPS)
+    for (start_time, duration_averaged), rows in data.groupby(["start time (s)", "duration averaged (s)"]):
+        FE_calculator = FaradaicEfficiencyECMS(
+            ecms, start_time=start_time, step_duration=300, duration_averaged=duration_averaged,
+        )
+        background = FE_calculator.calc_HER_background_current([1])
+        coefs = FE_calculator.linear_fit_HER_MS_to_cell_current_conversion([2, 3], background)
+        expected = FE_calculator.calculate_CO2RR_faradaic_efficiencies(STEPS, coefs, background)
+
+        np.testing.assert_allclose(rows["HER background MS current (A)"], background)
+        pd.testing.assert_frame_equal(
+            rows[expected.columns].reset_index(drop=True), expected, check_dtype=False,
+        )
@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+from ixdat import Measurement
+
+from benchmarks.synthetic import write_zilien_tsv
+from ecms_np_analysis.utils.tsv_cache import ms_measurement, prune_cache, read_tsv_cached
+
+
+def test_cached_ms_measurement_matches_zilien_reader(tmp_path):
+    fpath = str(tmp_path / "ms.tsv")
+    # the M28 series shorter than the others
+    write_zilien_tsv(fpath, n_rows=20, masses=("M2", "M28"), mass_rows={"M28": 15})
+    reference = Measurement.read(fpath, reader="zilien", technique="MS")
+
+    # parsed the first time, memory-mapped from the cache the second
+    for _ in range(2):
+        ms = ms_measurement(fpath, cache_dir=str(tmp_path / "cache"))
+
+        assert type(ms) is type(reference)
+        assert ms.tstamp == reference.tstamp
+        assert ms.aliases == reference.aliases
+        assert [s.name for s in ms.series_list] == [s.name for s in reference.series_list]
+        for mass in ("M2", "M28"):
+            for cached, read in zip(ms.grab(mass), reference.grab(mass)):
+                np.testing.assert_array_equal(cached, read)
+
+
+def test_prune_removes_least_recently_used(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    fpaths = []
+    for i in range(3):
+        fpaths.append(str(tmp_path / "ms{}.tsv".format(i)))
+        write_zilien_tsv(fpaths[-1], n_rows=20, seed=i)
+        read_tsv_cached(fpaths[-1], cache_dir=cache_dir, max_bytes=None)
+
+    entries = sorted(os.listdir(cache_dir))
+    sizes = {x: sum(f.stat().st_size for f in os.scandir(os.path.join(cache_dir, x))) for x in entries}
+    # last used in the order written, 1000 s apart
+    for i, entry in enumerate(entries):
+        os.utime(os.path.join(cache_dir, entry, "manifest.json"), (1000 * i, 1000 * i))
+
+    assert prune_cache(cache_dir, max_bytes=None, max_age=None) == 0
+    assert prune_cache(cache_dir, max_bytes=sizes[entries[1]] + sizes[entries[2]], max_age=None) == 1
+    assert sorted(os.listdir(cache_dir)) == entries[1:]
+
+    # the most recently used entry is kept even if too old
+    assert prune_cache(cache_dir, max_bytes=None, max_age=1) == 1
+    assert os.listdir(cache_dir) == entries[2:]
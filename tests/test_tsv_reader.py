@@ -0,0 +1,81 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import write_zilien_tsv
+from ecms_np_analysis.utils.intervals import IntervalMeanAccumulator, interval_means
+from ecms_np_analysis.utils.tsv_reader import (
+    iter_tsv_chunks,
+    parse_data_header_from_fpath,
+    parse_metadata_header_from_fpath,
+    parse_tsv_data,
+    read_tsv,
+)
+
+
+class Stream(io.RawIOBase):
+    # a non-seekable binary stream, as stdin or an upload buffer
+
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        return self._data.readinto(b)
+
+
+def test_read_tsv_parses_a_stream_in_one_pass(tmp_path):
+    fpath = str(tmp_path / "ms.tsv")
+    write_zilien_tsv(fpath, n_rows=50)
+    metadata = parse_metadata_header_from_fpath(fpath)
+    col_names = parse_data_header_from_fpath(
+        fpath, metadata["num_header_lines"], metadata["num_data_header_lines"],
+    )
+    data = parse_tsv_data(fpath, metadata["data_start"], col_names)
+
+    with open(fpath, "rb") as f:
+        stream = io.BufferedReader(Stream(f.read()))
+
+    for f in (fpath, stream):
+        read_metadata, read_data = read_tsv(f)
+
+        assert read_metadata == metadata
+        pd.testing.assert_frame_equal(read_data, data)
+
+
+def test_chunked_interval_means_match_whole_file(tmp_path):
+    fpath = str(tmp_path / "ms.tsv")
+    write_zilien_tsv(fpath, n_rows=100, n_steps=4, step_duration=10.0)
+    _, data = read_tsv(fpath)
+    t, v = data["C0M2 Time [s]"], data["C0M2 M2 [A]"]
+    intervals = [(5, 10), (15, 20), (25, 30), (35, 40)]
+
+    chunks = list(iter_tsv_chunks(fpath, masses=["M2"], chunksize=7))
+    accumulator = IntervalMeanAccumulator(intervals)
+    for chunk in chunks:
+        accumulator.update(chunk["C0M2 Time [s]"], chunk["C0M2 M2 [A]"])
+
+    assert [len(chunk) for chunk in chunks] == [7] * 14 + [2]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), data[["C0M2 Time [s]", "C0M2 M2 [A]"]])
+    np.testing.assert_allclose(accumulator.means, interval_means(t, v, intervals))
+
+
+def test_read_tsv_projects_masses_and_columns(tmp_path):
+    fpath = str(tmp_path / "ms.tsv")
+    write_zilien_tsv(fpath, n_rows=50, masses=("M2", "M28", "M44"))
+    _, data = read_tsv(fpath)
+
+    _, projected = read_tsv(fpath, columns=["iongauge value Pressure [mbar]"], masses=["M44"], dtype=np.float32)
+
+    assert list(projected.columns) == [
+        "iongauge value Pressure [mbar]", "C0M44 Time [s]", "C0M44 M44 [A]",
+    ]
+    assert (projected.dtypes == np.float32).all()
+    np.testing.assert_allclose(projected["C0M44 M44 [A]"], data["C0M44 M44 [A]"], rtol=1e-6)
+
+    with pytest.raises(ValueError, match="mass M32 not found"):
+        read_tsv(fpath, masses=["M32"])